@@ -0,0 +1,181 @@
+"""Load test of the fetch path against the local stand-in of the API.
+
+Starts a caishen_stonks.standin.StandInServer, or targets the server at --url, and runs --users concurrent users
+for --duration seconds. Every user repeatedly fetches --tickers-per-fetch random tickers of a universe of --universe
+tickers with one of the fetch strategies:
+
+- client: StockHistoryClient.fetch, which requests batches of 10 tickers concurrently
+- single: one request per ticker, the way a caller without batching would fetch
+- singleflight: one SingleFlightClient shared by all users, which requests tickers in flight for another user once
+
+The report gives the throughput in fetches, tickers and HTTP requests per second, and the latency percentiles of the
+fetches and of the single HTTP requests, together with the status codes of the responses. The latency, failures and
+rate limit of the stand-in are set with --latency, --jitter, --error-rate and --rate-limit.
+
+Usage:
+    python benchmarks/load_test.py --users 16 --duration 10 --latency 0.05 --jitter 0.05
+    python benchmarks/load_test.py --strategy single --rate-limit 50 --output load.json
+    python benchmarks/load_test.py --url http://localhost:8080/v8/finance/spark --users 4
+"""
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+# load test the source tree this script belongs to, also when the package is not installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caishen_stonks.client import StockHistoryClient  # noqa: E402
+from caishen_stonks.constants import DateRange, StockInterval  # noqa: E402
+from caishen_stonks.errors import StockDataFetchError  # noqa: E402
+from caishen_stonks.singleflight import SingleFlightClient  # noqa: E402
+from caishen_stonks.standin import StandInServer  # noqa: E402
+
+STRATEGIES = ("client", "single", "singleflight")
+PERCENTILES = (50, 90, 99)
+
+
+def percentiles(latencies: List[float], points=PERCENTILES) -> Dict[str, float]:
+    """Returns the nearest-rank percentiles, the mean and the maximum of "latencies" in milliseconds"""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    summary = {f"p{point}": 1000.0 * ordered[max(0, -(-point * len(ordered) // 100) - 1)] for point in points}
+    summary["mean"] = 1000.0 * sum(ordered) / len(ordered)
+    summary["max"] = 1000.0 * ordered[-1]
+    return summary
+
+
+def run(url: str, strategy: str, users: int, duration: float, fetches: Optional[int], universe: int,
+        tickers_per_fetch: int, date_range: DateRange, interval: StockInterval, retries: int, backoff: float,
+        seed: int = 0) -> Dict[str, Any]:
+    """Runs the load test and returns its report
+
+    Every user stops after "duration" seconds, or after "fetches" fetches if that is given.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError("The strategy has to be one of " + ", ".join(STRATEGIES) + ", but it is " + strategy)
+    os.environ.setdefault("RAPIDAPI_HOST", "localhost")
+    os.environ.setdefault("RAPIDAPI_ENDPOINT", "v8/finance/spark")
+    os.environ.setdefault("RAPID_API_TOKEN", "load-test")
+    symbols = [f"T{index}" for index in range(universe)]
+    responses: List[tuple] = []
+    fetch_latencies: List[float] = []
+    failures: List[str] = []
+
+    def record(response, *args, **kwargs):
+        # list.append is atomic, so the users record into shared lists
+        responses.append((response.status_code, response.elapsed.total_seconds()))
+
+    def client() -> StockHistoryClient:
+        created = StockHistoryClient(max_workers=8, retries=retries, backoff=backoff, url=url)
+        created.session.hooks["response"].append(record)
+        return created
+
+    shared = SingleFlightClient(client()) if strategy == "singleflight" else None
+    fetchers: Dict[str, Callable[[Any, List[str]], Any]] = {
+        "client": lambda own, tickers: own.fetch(tickers, date_range, interval),
+        "single": lambda own, tickers: [own.fetch([ticker], date_range, interval) for ticker in tickers],
+        "singleflight": lambda own, tickers: shared.fetch(tickers, date_range, interval),
+    }
+    fetch = fetchers[strategy]
+    deadline = time.perf_counter() + duration
+
+    def user(number: int):
+        generator = random.Random(seed * 1000 + number)
+        with client() as own:
+            done = 0
+            while time.perf_counter() < deadline and (fetches is None or done < fetches):
+                tickers = generator.sample(symbols, min(tickers_per_fetch, universe))
+                start = time.perf_counter()
+                try:
+                    fetch(own, tickers)
+                except StockDataFetchError as error:
+                    failures.append(str(error))
+                else:
+                    fetch_latencies.append(time.perf_counter() - start)
+                done += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(number,)) for number in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if shared is not None:
+        shared.client.close()
+
+    statuses: Dict[str, int] = {}
+    for status, _ in responses:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "strategy": strategy, "users": users, "seconds": elapsed, "fetches": len(fetch_latencies),
+        "failed_fetches": len(failures), "requests": len(responses), "statuses": statuses,
+        "throughput": {"fetches/s": len(fetch_latencies) / elapsed,
+                       "tickers/s": len(fetch_latencies) * min(tickers_per_fetch, universe) / elapsed,
+                       "requests/s": len(responses) / elapsed},
+        "fetch_latency_ms": percentiles(fetch_latencies),
+        "request_latency_ms": percentiles([latency for _, latency in responses]),
+        "errors": sorted(set(failures))[:10],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="load test this endpoint instead of starting a stand-in server")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="client", help="how the users fetch")
+    parser.add_argument("--users", type=int, default=8, help="concurrent users")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run for")
+    parser.add_argument("--fetches", type=int, help="stop every user after this many fetches")
+    parser.add_argument("--universe", type=int, default=500, help="tickers the users pick from")
+    parser.add_argument("--tickers-per-fetch", type=int, default=25, help="tickers requested by every fetch")
+    parser.add_argument("--range", dest="date_range", choices=[item.value for item in DateRange], default="1y")
+    parser.add_argument("--interval", choices=[item.value for item in StockInterval], default="1d")
+    parser.add_argument("--retries", type=int, default=3, help="retries of a failed request")
+    parser.add_argument("--backoff", type=float, default=0.1, help="seconds before the first retry")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stand-in delays every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="most seconds added to the latency at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of the requests that fail")
+    parser.add_argument("--rate-limit", type=float, help="requests per second the stand-in allows")
+    parser.add_argument("--burst", type=int, help="requests allowed at once before the rate limit applies")
+    parser.add_argument("--seed", type=int, default=0, help="seeds the tickers, latencies and failures")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = StandInServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                               rate_limit=args.rate_limit, burst=args.burst, seed=args.seed).start()
+        url = server.url
+    try:
+        report = run(url, args.strategy, args.users, args.duration, args.fetches, args.universe,
+                     args.tickers_per_fetch, DateRange(args.date_range), StockInterval(args.interval), args.retries,
+                     args.backoff, args.seed)
+    finally:
+        if server is not None:
+            server.stop()
+    if server is not None:
+        report["server_statuses"] = {str(status): count for status, count in sorted(server.statistics.items())}
+
+    throughput = report["throughput"]
+    print(f"{report['strategy']}: {report['users']} users, {report['seconds']:.1f} s, {report['fetches']} fetches "
+          f"({report['failed_fetches']} failed), {report['requests']} requests {report['statuses']}")
+    print(f"  throughput    {throughput['fetches/s']:10.1f} fetches/s {throughput['tickers/s']:10.1f} tickers/s "
+          f"{throughput['requests/s']:10.1f} requests/s")
+    for name in ("fetch_latency_ms", "request_latency_ms"):
+        summary = report[name]
+        print(f"  {name[:-11]:<7} latency " + "  ".join(f"{key} {value:.1f} ms" for key, value in summary.items()))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Benchmarks for the technical indicators and the fetch path.
+
+Every indicator of caishen_stonks.technical_indicators is timed with lists and, if NumPy is installed, with numpy
+arrays, at several sizes and lookbacks. The fetch scenario times StockHistoryClient.fetch against mocked HTTP
+responses, so it measures the client itself: batching, retries bookkeeping, JSON decoding and merging.
+
+Each benchmark reports the best of several runs as a throughput (points or tickers per second). The results are
+written as JSON. When a baseline is given, the run fails if any throughput dropped by more than the threshold.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.2
+    python benchmarks/run_benchmarks.py --sizes 1000 --filter RSI
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+
+# benchmark the source tree this script belongs to, also when the package is not installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caishen_stonks import technical_indicators as TI  # noqa: E402
+from caishen_stonks.pack import indicator_pack  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+SIZES = [1000, 100000, 1000000]
+LOOKBACKS = [5, 20, 200]
+MULTI_LOOKBACKS = [5, 10, 20, 50, 100, 200]
+FETCH_TICKERS = 500
+
+
+def random_walk(length: int, seed: int = 0) -> List[float]:
+    """Prices of a geometric random walk starting at 100"""
+    generator = random.Random(seed)
+    price = 100.0
+    values = []
+    for _ in range(length):
+        price *= math.exp(generator.gauss(0.0, 0.01))
+        values.append(price)
+    return values
+
+
+def indicator_cases(sizes: List[int]) -> Iterator[Tuple[str, int, Callable[[], Any]]]:
+    """Yields (name, points, function to time) for every indicator, backend, size and lookback"""
+    backends = [("list", lambda values: values)]
+    if np is not None:
+        backends.append(("array", np.array))
+    for size in sizes:
+        close = random_walk(size)
+        high = [value * 1.01 for value in close]
+        low = [value * 0.99 for value in close]
+        for backend, convert in backends:
+            c, h, lo = convert(close), convert(high), convert(low)
+            prefix = f"{backend}/{size}/"
+            for lookback in LOOKBACKS:
+                yield prefix + f"SMA({lookback})", size, lambda c=c, k=lookback: TI.SMA(c, k)
+                yield prefix + f"EMA({lookback})", size, lambda c=c, k=lookback: TI.EMA(c, k)
+                yield prefix + f"bollinger_bands({lookback})", size, lambda c=c, k=lookback: TI.bollinger_bands(c, k)
+                yield prefix + f"RSI({lookback})", size, lambda c=c, k=lookback: TI.RSI(c, k)
+            for K_lookback in (5, 14):
+                yield (prefix + f"SO({K_lookback}, 3)", size,
+                       lambda c=c, h=h, lo=lo, k=K_lookback: TI.SO(h, lo, c, k, 3))
+            for MACD_lookback, signal_lookback in (((12, 26), 9), ((5, 35), 5)):
+                yield (prefix + f"MACD({MACD_lookback}, {signal_lookback})", size,
+                       lambda c=c, m=MACD_lookback, s=signal_lookback: TI.MACD(c, m, signal_lookback=s))
+            yield prefix + f"SMA_multi({len(MULTI_LOOKBACKS)})", size, lambda c=c: TI.SMA_multi(c, MULTI_LOOKBACKS)
+            yield prefix + f"EMA_multi({len(MULTI_LOOKBACKS)})", size, lambda c=c: TI.EMA_multi(c, MULTI_LOOKBACKS)
+            yield prefix + "indicator_pack", size, lambda c=c: indicator_pack(c)
+            # the retracement levels do not depend on the series, so they are timed per call
+            if size == sizes[0]:
+                yield (f"{backend}/1/fibonacci_retractments", 1,
+                       lambda c=c: TI.fibonacci_retractments(float(c[0]), float(c[-1])))
+
+
+def fetch_case(tickers: int) -> Tuple[str, int, Callable[[], Any]]:
+    """Returns (name, tickers, function to time) for a batch fetch served by mocked HTTP responses"""
+    import requests_mock
+    from caishen_stonks.client import StockHistoryClient
+    from caishen_stonks.constants import DateRange, StockInterval
+
+    os.environ.setdefault("RAPIDAPI_HOST", "yahoo-finance-low-latency.p.rapidapi.com")
+    os.environ.setdefault("RAPIDAPI_ENDPOINT", "v8/finance/spark")
+    os.environ.setdefault("RAPID_API_TOKEN", "benchmark")
+    timestamps = list(range(1588305600, 1588305600 + 252 * 86400, 86400))
+    close = random_walk(len(timestamps))
+    body = {symbol: json.dumps({"symbol": symbol, "timestamp": timestamps, "close": close})
+            for symbol in (f"T{index}" for index in range(tickers))}
+
+    def spark(request, context):
+        return "{" + ",".join(f'"{symbol}":{body[symbol]}' for symbol in request.qs["symbols"][0].upper().split(",")) + "}"
+
+    symbols = list(body)
+
+    def run():
+        with requests_mock.Mocker() as mock, StockHistoryClient(max_workers=8) as client:
+            mock.get(requests_mock.ANY, text=spark)
+            return client.fetch(symbols, DateRange.oneYear, StockInterval.oneDay)
+
+    return f"fetch/{tickers}/StockHistoryClient.fetch", tickers, run
+
+
+def measure(function: Callable[[], Any], repeat: int, min_time: float) -> float:
+    """Returns the best time of "repeat" runs in seconds, each run looping until it takes at least min_time"""
+    best = math.inf
+    for _ in range(repeat):
+        loops = 0
+        start = time.perf_counter()
+        while True:
+            function()
+            loops += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / loops)
+    return best
+
+
+def run(sizes: List[int], repeat: int, min_time: float, fetch_tickers: int,
+        name_filter: Optional[str] = None) -> Dict[str, Any]:
+    """Runs the benchmarks and returns their results, keyed by benchmark name"""
+    cases = list(indicator_cases(sizes))
+    if fetch_tickers > 0:
+        cases.append(fetch_case(fetch_tickers))
+    results = {}
+    for name, points, function in cases:
+        if name_filter is not None and name_filter not in name:
+            continue
+        seconds = measure(function, repeat, min_time)
+        unit = "tickers/s" if name.startswith("fetch/") else "points/s"
+        results[name] = {"seconds": seconds, "throughput": points / seconds, "unit": unit}
+        print(f"{name:<55} {seconds * 1000:12.3f} ms {points / seconds:16,.0f} {unit}", flush=True)
+    return results
+
+
+def regressions(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Returns a description of every benchmark whose throughput dropped by more than "threshold" (e.g. 0.2 = 20%)"""
+    failures = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]["throughput"]
+        if result["throughput"] < expected * (1.0 - threshold):
+            failures.append(f"{name}: {result['throughput']:,.0f} {result['unit']} is "
+                            f"{1.0 - result['throughput'] / expected:.0%} below the baseline of {expected:,.0f}")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="series lengths to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the best one is reported")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per run")
+    parser.add_argument("--fetch-tickers", type=int, default=FETCH_TICKERS,
+                        help="tickers of the mocked fetch scenario, 0 to skip it")
+    parser.add_argument("--filter", dest="name_filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="fail if the throughput regressed compared with this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fraction of the baseline throughput that may be lost, defaults to 0.2")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file to compare later runs with")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {"python": platform.python_version(), "numpy": None if np is None else np.__version__,
+                 "machine": platform.machine(), "platform": platform.platform(), "time": time.time()},
+        "results": run(args.sizes, args.repeat, args.min_time, args.fetch_tickers, args.name_filter),
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        failures = regressions(report["results"], baseline, args.threshold)
+        if failures:
+            print(f"{len(failures)} benchmarks regressed by more than {args.threshold:.0%}:", file=sys.stderr)
+            for failure in failures:
+                print("  " + failure, file=sys.stderr)
+            return 1
+        print(f"No benchmark regressed by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,442 @@
+"""NumPy implementations of the technical indicators.
+
+The functions in technical_indicators dispatch here when they are given a numpy.ndarray. The inputs have already
+been validated by then. Unlike the list implementations, every output is aligned with the input: it has one entry per
+input value, and the warm-up entries that have no real calculation are NaN instead of -1.
+
+The underscored kernels work along the first axis, so the batch module can run them over a (bars x tickers) matrix.
+Given "out" arrays, they write their results there instead of allocating them, and the intermediates of MACD and RSI
+are kept in the arrays of a Workspace.
+"""
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .errors import InvalidInputError
+from .workspace import Workspace, scratch_array, unpack
+
+# Rows of a sliding window view processed at once when a reduction needs a temporary copy of the windows
+_WINDOW_CHUNK_ELEMENTS = 1 << 20
+# Largest exponent allowed for the powers of the EMA decay within one block of the closed form recurrence
+_EMA_BLOCK_EXPONENT = 500.0
+
+
+def is_array(values) -> bool:
+    """Returns whether "values" should be handled by this backend"""
+    return isinstance(values, np.ndarray)
+
+
+def indicator_array(values: Union[List[float], np.ndarray]) -> np.ndarray:
+    """Converts an indicator output to a float ndarray, with NaN for its warm-up
+
+    Args:
+        values (Union[List[float], np.ndarray]): A list output of technical_indicators, whose leading -1 elements are
+            the warm-up, or an ndarray output, which already has NaN for the warm-up
+
+    Returns:
+        np.ndarray: The values as floats
+
+    Example:
+        >>> from caishen_stonks.array_backend import indicator_array
+        >>> indicator_array([-1, -1, 2.0, -1.0]).tolist()
+        [nan, nan, 2.0, -1.0]
+    """
+    if isinstance(values, np.ndarray):
+        return values.astype(float)
+    result = np.array(values, dtype=float)
+    warm_up = 0
+    # only the leading run is the warm-up, a later -1 is an actual value
+    while warm_up < len(result) and result[warm_up] == -1:
+        warm_up += 1
+    result[:warm_up] = np.nan
+    return result
+
+
+def SMA(values: np.ndarray, lookback: int = 14, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Calculates Simple Moving Average (SMA) for a given lookback from a single cumulative sum.
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.array_backend import SMA
+        >>> SMA(np.array([1.0, 2.0, 3.0, 4.0]), 3)
+        array([nan, nan,  2.,  3.])
+    """
+    return _SMA(_as_series(values), lookback, out)
+
+
+def EMA(values: np.ndarray, lookback: int = 12, smoothing: float = 2.0, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Calculates Exponential Moving Average (EMA) for a given lookback.
+
+    The EMA is seeded with the average of the first "lookback" values, like the list implementation.
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.array_backend import EMA
+        >>> EMA(np.array([1.0, 2.0, 3.0, 4.0, 5.0]), 4, 2.0)
+        array([nan, nan, nan, 2.5, 3.5])
+    """
+    return _EMA(_as_series(values), lookback, smoothing, out)
+
+
+def SMA_multi(values: np.ndarray, lookbacks: List[int]) -> np.ndarray:
+    """Calculates the SMA for several lookbacks from one cumulative sum.
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.array_backend import SMA_multi
+        >>> SMA_multi(np.array([1.0, 2.0, 3.0, 4.0]), [2, 3])
+        array([[nan, 1.5, 2.5, 3.5],
+               [nan, nan, 2. , 3. ]])
+    """
+    values = _as_series(values)
+    result = np.full((len(lookbacks), values.shape[0]), np.nan)
+    if values.shape[0] == 0:
+        return result
+    if not np.isfinite(values).all():
+        # the shared cumulative sum would carry a NaN into every later window, _SMA only affects its windows
+        for row, lookback in enumerate(lookbacks):
+            _SMA(values, lookback, out=result[row])
+        return result
+    shift = values[0]
+    totals = np.zeros(values.shape[0] + 1)
+    np.cumsum(values - shift, out=totals[1:])
+    for row, lookback in enumerate(lookbacks):
+        _check_window(lookback)
+        if values.shape[0] >= lookback:
+            means = result[row, lookback - 1:]
+            np.subtract(totals[lookback:], totals[:-lookback], out=means)
+            means /= lookback
+            means += shift
+    return result
+
+
+def EMA_multi(values: np.ndarray, lookbacks: List[int], smoothing: float = 2.0) -> np.ndarray:
+    """Calculates the EMA for several lookbacks, advancing all the recurrences in the same pass over "values".
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.array_backend import EMA_multi
+        >>> EMA_multi(np.array([1.0, 2.0, 3.0, 4.0, 5.0]), [2, 4])
+        array([[nan, 1.5, 2.5, 3.5, 4.5],
+               [nan, nan, nan, 2.5, 3.5]])
+    """
+    values = _as_series(values)
+    result = np.full((len(lookbacks), values.shape[0]), np.nan)
+    if len(lookbacks) == 0:
+        return result
+    longest = max(lookbacks)
+    # the EMAs are seeded one lookback at a time, which only touches the values up to the longest lookback
+    head = min(values.shape[0], longest)
+    for row, lookback in enumerate(lookbacks):
+        result[row, :head] = _EMA(values[:head], lookback, smoothing)
+    if values.shape[0] > longest:
+        multipliers = np.array([smoothing / (1.0 * (1 + lookback)) for lookback in lookbacks])
+        result[:, longest:] = _ema_recurrence(values[longest:, np.newaxis], result[:, longest - 1], multipliers).T
+    return result
+
+
+def bollinger_bands(values: np.ndarray, lookback: int = 20,
+                    out: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Calculates lower, middle and upper bollinger bands over sliding windows of "values".
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.array_backend import bollinger_bands
+        >>> bollinger_bands(np.array([1.0, 2.0, 3.0, 4.0, 5.0]), 2)
+        (array([nan, 0.5, 1.5, 2.5, 3.5]), array([nan, 1.5, 2.5, 3.5, 4.5]), array([nan, 2.5, 3.5, 4.5, 5.5]))
+    """
+    return _bollinger_bands(_as_series(values), lookback, out)
+
+
+def fibonacci_retractments(start_price: Union[float, np.ndarray], end_price: Union[float, np.ndarray],
+                           fibonacci_levels: Union[List[float], np.ndarray]) -> np.ndarray:
+    """Calculates Fibonacci retractment levels, broadcasting over arrays of start and end prices.
+
+    The levels are the last axis of the result, so start and end prices of shape (m,) give a result of shape (m, L).
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.array_backend import fibonacci_retractments
+        >>> fibonacci_retractments(np.array([10.0, 20.0]), np.array([20.0, 10.0]), np.array([0.236, 0.786]))
+        array([[17.64, 12.14],
+               [12.36, 17.86]])
+    """
+    start_price = np.asarray(start_price, dtype=float)[..., np.newaxis]
+    end_price = np.asarray(end_price, dtype=float)[..., np.newaxis]
+    fibonacci_levels = np.asarray(fibonacci_levels, dtype=float)
+    multiplier = np.where(end_price > start_price, -1.0, 1.0)
+    return end_price + multiplier * np.abs(end_price - start_price) * fibonacci_levels
+
+
+def SO(high_values: np.ndarray, low_values: np.ndarray, closing_values: np.ndarray, K_lookback: int = 5,
+       D_lookback: int = 3, out: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculates stochastic oscillator K and D scores.
+
+    Unlike the list implementation, the K scores are aligned with the input and start with "K_lookback - 1" NaNs.
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.array_backend import SO
+        >>> K_values, D_values = SO(np.array([3.0, 4.0, 5.0, 4.0]), np.array([1.0, 2.0, 3.0, 2.0]),
+        ...                         np.array([2.0, 4.0, 4.0, 2.0]), 2, 2)
+        >>> K_values
+        array([         nan, 100.        ,  66.66666667,   0.        ])
+        >>> D_values
+        array([        nan,         nan, 83.33333333, 33.33333333])
+    """
+    return _SO(_as_series(high_values), _as_series(low_values), _as_series(closing_values), K_lookback, D_lookback,
+               out)
+
+
+def MACD(values: np.ndarray, MACD_lookback: Tuple[int, int] = (12, 26), MACD_smoothing: Tuple[float, float] = (2.0, 2.0),
+         signal_lookback: int = 9, signal_smoothing: float = 2.0, out: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+         workspace: Optional[Workspace] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculates the MACD line and its signal line.
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.array_backend import MACD
+        >>> MACD(np.array([1.0, 2.0, 3.0, 4.0, 5.0]), (2, 3), signal_lookback=2)[0]
+        array([nan, nan, 0.5, 0.5, 0.5])
+    """
+    return _MACD(_as_series(values), MACD_lookback, MACD_smoothing, signal_lookback, signal_smoothing, out,
+                 workspace)
+
+
+def RSI(values: np.ndarray, lookback: int = 14, out: Optional[np.ndarray] = None,
+        workspace: Optional[Workspace] = None) -> np.ndarray:
+    """Calculates Relative Strength Index from the average gains and losses over the lookback.
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.array_backend import RSI
+        >>> RSI(np.array([1.0, 1.2, 1.4, 1.1, 0.9]), 3)
+        array([        nan,         nan,  0.        , 57.14285714, 28.57142857])
+    """
+    return _RSI(_as_series(values), lookback, out, workspace)
+
+
+def _SMA(values: np.ndarray, lookback: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    _check_window(lookback)
+    result = _output(out, values.shape)
+    if values.shape[0] >= lookback:
+        result[lookback - 1:] = _window_means(values, lookback)
+    return result
+
+
+def _EMA(values: np.ndarray, lookback: int, smoothing: float, out: Optional[np.ndarray] = None) -> np.ndarray:
+    _check_window(lookback)
+    result = _output(out, values.shape)
+    if values.shape[0] >= lookback:
+        seed = values[:lookback].mean(axis=0)
+        result[lookback - 1] = seed
+        multiplier = smoothing / (1.0 * (1 + lookback))
+        _ema_recurrence(values[lookback:], seed, multiplier, out=result[lookback:])
+    return result
+
+
+def _bollinger_bands(values: np.ndarray, lookback: int,
+                     out: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    _check_window(lookback)
+    lower_band, middle_band, upper_band = _outputs(out, 3, values.shape)
+    if values.shape[0] >= lookback:
+        average = middle_band[lookback - 1:]
+        average[...] = _window_means(values, lookback)
+        # the upper band holds twice the deviations until the bands are derived from them
+        deviations = _window_stdevs(values, lookback, out=upper_band[lookback - 1:])
+        deviations *= 2
+        np.subtract(average, deviations, out=lower_band[lookback - 1:])
+        np.add(average, deviations, out=deviations)
+    return lower_band, middle_band, upper_band
+
+
+def _SO(high_values: np.ndarray, low_values: np.ndarray, closing_values: np.ndarray, K_lookback: int,
+        D_lookback: int, out: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    _check_window(K_lookback)
+    _check_window(D_lookback)
+    K_values, D_values = _outputs(out, 2, closing_values.shape)
+    if closing_values.shape[0] >= K_lookback:
+        highest = _window_extremes(high_values, K_lookback, np.maximum)
+        lowest = _window_extremes(low_values, K_lookback, np.minimum)
+        price_range = highest - lowest
+        flat = price_range == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            K_score = 100.0 * (closing_values[K_lookback - 1:] - lowest) / price_range
+        K_values[K_lookback - 1:] = np.where(flat, 50.0, K_score)
+    _SMA(K_values[K_lookback - 1:], D_lookback, out=D_values[K_lookback - 1:])
+    return K_values, D_values
+
+
+def _MACD(values: np.ndarray, MACD_lookback: Tuple[int, int], MACD_smoothing: Tuple[float, float],
+          signal_lookback: int, signal_smoothing: float, out: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+          workspace: Optional[Workspace] = None) -> Tuple[np.ndarray, np.ndarray]:
+    MACD_out, signal_out = unpack(out, 2)
+    short_term = _EMA(values, MACD_lookback[0], MACD_smoothing[0], scratch_array(workspace, "short_term", values.shape))
+    long_term = _EMA(values, MACD_lookback[1], MACD_smoothing[1], scratch_array(workspace, "long_term", values.shape))
+    MACD_values = _MACD_line(short_term, long_term, MACD_out)
+    return MACD_values, _signal_line(MACD_values, MACD_lookback[1], signal_lookback, signal_smoothing, signal_out)
+
+
+def _MACD_line(short_term: np.ndarray, long_term: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return np.subtract(short_term, long_term, out=None if out is None else _output(out, long_term.shape))
+
+
+def _signal_line(MACD_values: np.ndarray, long_lookback: int, signal_lookback: int,
+                 signal_smoothing: float, out: Optional[np.ndarray] = None) -> np.ndarray:
+    signal_values = _output(out, MACD_values.shape)
+    start = long_lookback - 1
+    if MACD_values.shape[0] > start:
+        _EMA(MACD_values[start:], signal_lookback, signal_smoothing, out=signal_values[start:])
+    return signal_values
+
+
+def _RSI(values: np.ndarray, lookback: int, out: Optional[np.ndarray] = None,
+         workspace: Optional[Workspace] = None) -> np.ndarray:
+    gain, loss = _gains_losses(values, (scratch_array(workspace, "gain", values.shape),
+                                        scratch_array(workspace, "loss", values.shape)))
+    average_gain = _SMA(gain, lookback, scratch_array(workspace, "average_gain", values.shape))
+    average_loss = _SMA(loss, lookback, scratch_array(workspace, "average_loss", values.shape))
+    return _RSI_from_averages(average_gain, average_loss, out)
+
+
+def _gains_losses(values: np.ndarray, out: Optional[Tuple[np.ndarray, np.ndarray]] = None
+                  ) -> Tuple[np.ndarray, np.ndarray]:
+    gain, loss = (np.empty(values.shape) if buffer is None else buffer for buffer in unpack(out, 2))
+    # the gain buffer holds the changes until the losses are taken from them
+    gain[:1] = 0.0
+    np.subtract(values[1:], values[:-1], out=gain[1:])
+    np.negative(gain, out=loss)
+    np.maximum(gain, 0.0, out=gain)
+    np.maximum(loss, 0.0, out=loss)
+    return gain, loss
+
+
+def _RSI_from_averages(average_gain: np.ndarray, average_loss: np.ndarray,
+                       out: Optional[np.ndarray] = None) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        output = np.divide(average_gain, average_loss,
+                           out=None if out is None else _output(out, average_loss.shape))
+        output += 1
+        np.divide(100, output, out=output)
+        np.subtract(100, output, out=output)
+    output[average_loss == 0] = 0.0
+    return output
+
+
+def _as_series(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    if values.ndim != 1:
+        raise InvalidInputError("The values array is expected to be one dimensional, but it has "
+                                + str(values.ndim) + " dimensions")
+    return values
+
+
+def _output(out: Optional[np.ndarray], shape: Tuple[int, ...]) -> np.ndarray:
+    # the result array, NaN until the kernel fills in the values it calculates
+    if out is None:
+        return np.full(shape, np.nan)
+    if not isinstance(out, np.ndarray) or out.dtype != np.float64:
+        raise TypeError("The out buffer is expected to be a float64 numpy.ndarray, but it is " + str(type(out)))
+    if out.shape != shape:
+        raise InvalidInputError("The out array has the shape " + str(out.shape) + ", but " + str(shape)
+                                + " is expected")
+    out.fill(np.nan)
+    return out
+
+
+def _outputs(out: Optional[Tuple[np.ndarray, ...]], count: int, shape: Tuple[int, ...]) -> Tuple[np.ndarray, ...]:
+    return tuple(_output(buffer, shape) for buffer in unpack(out, count))
+
+
+def _check_window(window: int):
+    if window < 1:
+        raise ValueError("The window has to be a positive integer, but it is set to " + str(window))
+
+
+def _window_means(values: np.ndarray, window: int) -> np.ndarray:
+    finite = np.isfinite(values)
+    if not finite.all():
+        # a cumulative sum never recovers from a NaN or infinity, so it only runs over the finite values, and the
+        # windows containing the others are averaged from their slices
+        means = _window_means(np.where(finite, values, 0.0), window)
+        gaps = np.concatenate([np.zeros((1,) + values.shape[1:], dtype=int), np.cumsum(~finite, axis=0)])
+        affected = gaps[window:] > gaps[:-window]
+        means[affected] = sliding_window_view(values, window, axis=0)[affected].mean(axis=-1)
+        return means
+    # shifting by the first value keeps the running total small, which limits the error of long cumulative sums
+    shift = values[0]
+    totals = values - shift
+    np.cumsum(totals, axis=0, out=totals)
+    sums = totals[window - 1:].copy()
+    sums[1:] -= totals[:-window]
+    sums /= window
+    sums += shift
+    return sums
+
+
+def _window_stdevs(values: np.ndarray, window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    windows = sliding_window_view(values, window, axis=0)
+    result = np.empty(windows.shape[:-1]) if out is None else out
+    # np.std copies the windows it works on, so they are processed in chunks to bound the memory used
+    rows = max(1, _WINDOW_CHUNK_ELEMENTS // windows[:1].size)
+    for start in range(0, windows.shape[0], rows):
+        np.std(windows[start:start + rows], axis=-1, out=result[start:start + rows])
+    return result
+
+
+def _window_extremes(values: np.ndarray, window: int, combine: np.ufunc) -> np.ndarray:
+    # extremes over windows whose length is a power of two are built by doubling, and any window is then covered by
+    # two overlapping power of two windows, so only O(log window) vectorised passes are needed
+    extremes = values
+    span = 1
+    while span * 2 <= window:
+        extremes = combine(extremes[:-span], extremes[span:])
+        span *= 2
+    count = values.shape[0] - window + 1
+    return combine(extremes[:count], extremes[window - span:window - span + count])
+
+
+def _ema_recurrence(values: np.ndarray, previous: Union[float, np.ndarray], multiplier: Union[float, np.ndarray],
+                    out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Evaluates ema(t) = value(t) * multiplier + ema(t - 1) * (1 - multiplier) without a Python loop per value.
+
+    Within a block the recurrence has the closed form ema(s + t) = decay^t * (decay * ema(s - 1) + multiplier *
+    cumsum(value(s + j) * decay^-j)). The blocks are kept short enough that the powers of the decay stay far away
+    from overflow and underflow, so only one Python iteration is needed per block.
+
+    The recurrence runs along the first axis. The multiplier may be an array that broadcasts against the other
+    axes, which advances several recurrences with different multipliers in the same pass.
+    """
+    multiplier = np.asarray(multiplier, dtype=float)
+    decay = 1.0 - multiplier
+    result = np.empty(np.broadcast_shapes(values.shape, decay.shape)) if out is None else out
+    if result.shape[0] == 0:
+        return result
+    # a decay of 0 means every EMA value is just the weighted value, which is filled in at the end
+    direct = decay == 0.0
+    decay = np.where(direct, 1.0, decay)
+
+    log_decay = np.abs(np.log(np.abs(decay))).max()
+    block = result.shape[0]
+    if log_decay > 0.0:
+        block = int(min(block, max(1.0, _EMA_BLOCK_EXPONENT // log_decay)))
+    # the powers are broadcast along the first axis
+    steps = np.arange(block, dtype=float).reshape((block,) + (1,) * (result.ndim - 1))
+    growth = np.power(decay, -steps)
+    shrink = np.power(decay, steps)
+
+    for start in range(0, result.shape[0], block):
+        chunk = values[start:start + block]
+        size = chunk.shape[0]
+        accumulated = np.cumsum(chunk * growth[:size], axis=0)
+        accumulated *= multiplier
+        accumulated += decay * previous
+        accumulated *= shrink[:size]
+        result[start:start + size] = accumulated
+        previous = accumulated[-1]
+    if direct.any():
+        np.copyto(result, values * multiplier, where=direct)
+    return result
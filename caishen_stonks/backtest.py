@@ -0,0 +1,292 @@
+"""Vectorised backtests of strategies built from the technical indicators.
+
+A strategy is a pair of boolean entry and exit signals per bar, which positions turns into a position (1 when long, 0
+when flat) with array operations. The signals are evaluated at the close of a bar and the position is traded at that
+close, so it earns the returns from the next bar on, and there is no look-ahead. Every change of the position costs
+fee + slippage, as fractions of the traded value.
+
+Each column of a (bars x strategies) matrix of positions is a separate strategy, so a parameter sweep is backtested
+in one batched pass, e.g. by crossover_sweep, which computes every moving average once with SMA_multi or EMA_multi.
+
+The indicators of technical_indicators mark their warm-up with -1 in lists and NaN in ndarrays. signal_values turns
+both into NaN, and NaN never compares true, so a warm-up bar never generates a signal, nor does the first bar after
+it for a crossover.
+
+Example:
+    >>> import numpy as np
+    >>> from caishen_stonks import backtest
+    >>> from caishen_stonks import technical_indicators as TI
+    >>> prices = [10.0, 9.0, 8.0, 9.0, 10.0, 11.0, 10.0, 9.0]
+    >>> entries, exits = backtest.crossover_signals(TI.SMA(prices, 2), TI.SMA(prices, 3))
+    >>> position = backtest.positions(entries, exits)
+    >>> position.tolist()
+    [0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0, 0.0]
+    >>> round(float(backtest.backtest(prices, position).equity[-1, 0]), 4)
+    0.9
+"""
+from itertools import product
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import array_backend
+from . import technical_indicators as TI
+from .errors import InvalidInputError
+
+# Daily bars
+PERIODS_PER_YEAR = 252
+
+_Values = Union[Sequence[float], np.ndarray]
+
+
+class BacktestResult:
+    """The outcome of a batched backtest. Every array has one column per strategy.
+
+    Attributes:
+        positions (np.ndarray): The (bars x strategies) position held after the close of every bar
+        returns (np.ndarray): The (bars x strategies) returns of the strategies, net of costs
+        equity (np.ndarray): The (bars x strategies) equity curves, starting from 1.0
+        trades (np.ndarray): The number of position changes of every strategy
+        cagr (np.ndarray): The compound annual growth rate of every strategy
+        sharpe (np.ndarray): The annualised Sharpe ratio of every strategy, with a risk free rate of 0
+        max_drawdown (np.ndarray): The largest loss from a peak of the equity of every strategy, e.g. 0.25 for 25%
+        parameters (List[Any]): The parameters of every strategy, or None for each if they were not given
+    """
+
+    __slots__ = ("positions", "returns", "equity", "trades", "cagr", "sharpe", "max_drawdown", "parameters")
+
+    def __init__(self, positions: np.ndarray, returns: np.ndarray, equity: np.ndarray, trades: np.ndarray,
+                 cagr: np.ndarray, sharpe: np.ndarray, max_drawdown: np.ndarray, parameters: List[Any]):
+        self.positions = positions
+        self.returns = returns
+        self.equity = equity
+        self.trades = trades
+        self.cagr = cagr
+        self.sharpe = sharpe
+        self.max_drawdown = max_drawdown
+        self.parameters = parameters
+
+    def best(self, metric: str = "sharpe") -> Tuple[Any, float]:
+        """Returns the parameters of the strategy with the highest "metric", and its value
+
+        "max_drawdown" picks the lowest drawdown instead. Strategies with a NaN metric are never the best.
+        """
+        if metric not in ("cagr", "sharpe", "max_drawdown"):
+            raise InvalidInputError("The metric has to be cagr, sharpe or max_drawdown, but it is set to " + metric)
+        values = getattr(self, metric)
+        scores = -values if metric == "max_drawdown" else values
+        if np.isnan(scores).all():
+            raise InvalidInputError("The " + metric + " of every strategy is NaN")
+        index = int(np.nanargmax(scores))
+        return self.parameters[index], float(values[index])
+
+    def __repr__(self) -> str:
+        return "BacktestResult(" + str(self.equity.shape[1]) + " strategies over " + str(self.equity.shape[0]) \
+            + " bars)"
+
+
+def signal_values(values: _Values) -> np.ndarray:
+    """Converts an indicator output to a float ndarray, with NaN for its warm-up, see array_backend.indicator_array
+
+    Example:
+        >>> from caishen_stonks.backtest import signal_values
+        >>> signal_values([-1, -1, 2.0, -1.0]).tolist()
+        [nan, nan, 2.0, -1.0]
+    """
+    return array_backend.indicator_array(values)
+
+
+def crossover_signals(fast: _Values, slow: _Values) -> Tuple[np.ndarray, np.ndarray]:
+    """Enters when "fast" crosses above "slow" and exits when it crosses below, e.g. for two moving averages or the
+    MACD line and its signal line
+
+    Args:
+        fast (_Values): The faster indicator, as returned by technical_indicators, or a (bars x strategies) ndarray
+        slow (_Values): The slower indicator, with the same shape as "fast"
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The boolean entries and exits
+    """
+    difference = signal_values(fast) - signal_values(slow)
+    entries = np.zeros(difference.shape, dtype=bool)
+    exits = np.zeros(difference.shape, dtype=bool)
+    entries[1:] = (difference[:-1] <= 0) & (difference[1:] > 0)
+    exits[1:] = (difference[:-1] >= 0) & (difference[1:] < 0)
+    return entries, exits
+
+
+def threshold_signals(values: _Values, enter_below: float = 30.0,
+                      exit_above: float = 70.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Enters when "values" are below "enter_below" and exits when they are above "exit_above", e.g. for RSI
+
+    Args:
+        values (_Values): The indicator, as returned by technical_indicators, or a (bars x strategies) ndarray. It
+                          needs one value per bar of the prices, so the list output of SO, which starts at the first
+                          complete K lookback, has to be padded with K_lookback - 1 leading NaN values first. The
+                          ndarray output of SO is aligned with the prices already.
+        enter_below (float, optional): The entry threshold. Defaults to 30.0.
+        exit_above (float, optional): The exit threshold. Defaults to 70.0.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The boolean entries and exits
+    """
+    values = signal_values(values)
+    return values < enter_below, values > exit_above
+
+
+def positions(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """Turns entry and exit signals into positions: long from an entry until the next exit, flat otherwise
+
+    An exit wins over an entry on the same bar.
+
+    Args:
+        entries (np.ndarray): The boolean entries, with one column per strategy if two dimensional
+        exits (np.ndarray): The boolean exits, with the same shape
+
+    Raises:
+        InvalidInputError: The shapes of the entries and exits are mismatching
+
+    Returns:
+        np.ndarray: The positions, 1.0 when long and 0.0 when flat
+    """
+    entries = np.asarray(entries, dtype=bool)
+    exits = np.asarray(exits, dtype=bool)
+    if entries.shape != exits.shape:
+        raise InvalidInputError("The shapes of the entries and exits are mismatching")
+    events = entries | exits
+    # the index of the latest event at or before every bar, carried forward without a loop
+    bars = np.arange(len(events)).reshape((-1,) + (1,) * (events.ndim - 1))
+    latest = np.maximum.accumulate(np.where(events, bars, -1), axis=0)
+    state = np.take_along_axis(entries & ~exits, np.maximum(latest, 0), axis=0)
+    return (state & (latest >= 0)).astype(float)
+
+
+def backtest(prices: _Values, positions: np.ndarray, fee: float = 0.0, slippage: float = 0.0,
+             periods_per_year: int = PERIODS_PER_YEAR, parameters: Optional[Sequence[Any]] = None) -> BacktestResult:
+    """Backtests one or many strategies at once
+
+    Args:
+        prices (_Values): The closing prices, shared by all strategies, or a (bars x strategies) matrix of them. A
+                          NaN price is a missing bar, which returns nothing.
+        positions (np.ndarray): The position after the close of every bar, one column per strategy if two
+                                dimensional. Fractional and negative (short) positions are allowed.
+        fee (float, optional): The fee per unit of traded value, e.g. 0.001 for 10 basis points. Defaults to 0.0.
+        slippage (float, optional): The price slippage per unit of traded value. Defaults to 0.0.
+        periods_per_year (int, optional): The number of bars per year. Defaults to 252 for daily bars.
+        parameters (Sequence[Any], optional): The parameters of every strategy, reported in the result
+
+    Raises:
+        InvalidInputError: The prices and positions have mismatching numbers of bars or strategies
+        InvalidInputError: The fee or slippage is negative, or the number of parameters does not match
+
+    Returns:
+        BacktestResult: The equity curves and metrics
+    """
+    prices = np.asarray(prices, dtype=float)
+    held = np.asarray(positions, dtype=float)
+    if held.ndim == 1:
+        held = held[:, np.newaxis]
+    if prices.ndim == 1:
+        prices = prices[:, np.newaxis]
+    if held.ndim != 2 or prices.ndim != 2 or prices.shape[0] != held.shape[0] \
+            or prices.shape[1] not in (1, held.shape[1]):
+        raise InvalidInputError("The shapes of the prices " + str(prices.shape) + " and positions "
+                                + str(held.shape) + " are mismatching")
+    if fee < 0 or slippage < 0:
+        raise InvalidInputError("The fee and slippage have to be non negative, but they are set to " + str(fee)
+                                + " and " + str(slippage))
+    if parameters is None:
+        parameters = [None] * held.shape[1]
+    if len(parameters) != held.shape[1]:
+        raise InvalidInputError("There are " + str(len(parameters)) + " parameters for " + str(held.shape[1])
+                                + " strategies")
+
+    asset_returns = np.zeros(prices.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        asset_returns[1:] = prices[1:] / prices[:-1] - 1.0
+    asset_returns[~np.isfinite(asset_returns)] = 0.0
+
+    traded = np.abs(np.diff(held, axis=0, prepend=0.0))
+    returns = -traded * (fee + slippage)
+    returns[1:] += held[:-1] * asset_returns[1:]
+    equity = np.cumprod(1.0 + returns, axis=0)
+
+    years = (len(held) - 1) / periods_per_year
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cagr = np.where(equity[-1] > 0, equity[-1] ** (1.0 / years) - 1.0, -1.0) if years > 0 else \
+            np.full(held.shape[1], np.nan)
+        deviation = returns[1:].std(axis=0, ddof=1) if len(held) > 2 else np.full(held.shape[1], np.nan)
+        sharpe = np.where(deviation > 0, returns[1:].mean(axis=0) / deviation * np.sqrt(periods_per_year), np.nan)
+    max_drawdown = (1.0 - equity / np.maximum.accumulate(equity, axis=0)).max(axis=0)
+    return BacktestResult(held, returns, equity, np.count_nonzero(traded, axis=0), cagr, sharpe, max_drawdown,
+                          list(parameters))
+
+
+def sweep(prices: _Values, signals: Callable[..., Tuple[np.ndarray, np.ndarray]], parameters: Sequence[Tuple[Any, ...]],
+          fee: float = 0.0, slippage: float = 0.0, periods_per_year: int = PERIODS_PER_YEAR) -> BacktestResult:
+    """Backtests a strategy for every parameterisation in one batched pass
+
+    Args:
+        prices (_Values): The closing prices
+        signals (Callable[..., Tuple[np.ndarray, np.ndarray]]): Returns the entries and exits for
+                                                                signals(prices, *parameters)
+        parameters (Sequence[Tuple[Any, ...]]): The parameterisations
+        fee (float, optional): The fee per unit of traded value. Defaults to 0.0.
+        slippage (float, optional): The price slippage per unit of traded value. Defaults to 0.0.
+        periods_per_year (int, optional): The number of bars per year. Defaults to 252.
+
+    Returns:
+        BacktestResult: One strategy per parameterisation, in the order of "parameters"
+
+    Example:
+        >>> from caishen_stonks import backtest
+        >>> from caishen_stonks import technical_indicators as TI
+        >>> prices = [float(price) for price in [10, 9, 8, 9, 10, 11, 10, 9, 8, 7, 8, 9]]
+        >>> result = backtest.sweep(prices, lambda prices, lookback, low, high:
+        ...                         backtest.threshold_signals(TI.RSI(prices, lookback), low, high),
+        ...                         [(2, 30.0, 70.0), (3, 20.0, 80.0)])
+        >>> result.trades.tolist()
+        [1, 1]
+    """
+    prices = np.asarray(prices, dtype=float)
+    if not len(parameters):
+        raise InvalidInputError("There are no parameters to sweep")
+    columns = [positions(*signals(prices, *parameterisation)) for parameterisation in parameters]
+    return backtest(prices, np.column_stack(columns), fee, slippage, periods_per_year, parameters)
+
+
+def crossover_sweep(prices: _Values, fast_lookbacks: Sequence[int], slow_lookbacks: Sequence[int],
+                    average: str = "SMA", fee: float = 0.0, slippage: float = 0.0,
+                    periods_per_year: int = PERIODS_PER_YEAR) -> BacktestResult:
+    """Backtests the moving average crossover of every pair of a fast and a slower lookback in one batched pass
+
+    Every lookback is computed once, by SMA_multi or EMA_multi, and the signals of all pairs are evaluated as one
+    (bars x pairs) matrix.
+
+    Args:
+        prices (_Values): The closing prices
+        fast_lookbacks (Sequence[int]): The lookbacks of the fast average
+        slow_lookbacks (Sequence[int]): The lookbacks of the slow average, only pairs with fast < slow are tested
+        average (str, optional): "SMA" or "EMA". Defaults to "SMA".
+        fee (float, optional): The fee per unit of traded value. Defaults to 0.0.
+        slippage (float, optional): The price slippage per unit of traded value. Defaults to 0.0.
+        periods_per_year (int, optional): The number of bars per year. Defaults to 252.
+
+    Raises:
+        InvalidInputError: The average is neither SMA nor EMA, or no pair has fast < slow
+
+    Returns:
+        BacktestResult: One strategy per (fast, slow) pair
+    """
+    if average not in ("SMA", "EMA"):
+        raise InvalidInputError("The average has to be SMA or EMA, but it is set to " + str(average))
+    pairs = [(fast, slow) for fast, slow in product(fast_lookbacks, slow_lookbacks) if fast < slow]
+    if not pairs:
+        raise InvalidInputError("No fast lookback is shorter than a slow lookback")
+    prices = np.asarray(prices, dtype=float)
+    lookbacks = sorted({lookback for pair in pairs for lookback in pair})
+    averages = getattr(TI, average + "_multi")(prices, lookbacks).T
+    column = {lookback: index for index, lookback in enumerate(lookbacks)}
+    fast = averages[:, [column[pair[0]] for pair in pairs]]
+    slow = averages[:, [column[pair[1]] for pair in pairs]]
+    return backtest(prices, positions(*crossover_signals(fast, slow)), fee, slippage, periods_per_year, pairs)
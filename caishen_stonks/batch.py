@@ -0,0 +1,210 @@
+"""Technical indicators for many tickers at once.
+
+Every function takes a (bars x tickers) matrix with one column per ticker and computes the indicator for all columns
+in one set of vectorised passes, instead of one call per ticker. NaN marks a bar that is missing for a ticker, e.g.
+before it was listed or during a trading halt. Each column is computed over its own available bars as if they were
+contiguous, so the warm-up of every ticker starts at its first available bar, and the missing bars are NaN in the
+result. Like array_backend, warm-up entries are NaN and the outputs have the same shape as the input.
+"""
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from . import array_backend
+from .errors import InvalidInputError
+
+
+def SMA(prices: np.ndarray, lookback: int = 14) -> np.ndarray:
+    """Calculates Simple Moving Average (SMA) for every column of "prices".
+
+    Args:
+        prices (np.ndarray): The (bars x tickers) matrix of prices, NaN for missing bars
+        lookback (int, optional): The lookback. Defaults to 14.
+
+    Raises:
+        InvalidInputError: The prices have to be a two dimensional matrix
+        TypeError: The lookback has to be an int
+        ValueError: The lookback has to be positive
+
+    Returns:
+        np.ndarray: The SMA values, with the same shape as "prices"
+
+    Example:
+        >>> import numpy as np
+        >>> from caishen_stonks.batch import SMA
+        >>> SMA(np.array([[1.0, np.nan], [2.0, 1.0], [3.0, 3.0], [4.0, np.nan], [5.0, 5.0]]), 2)
+        array([[nan, nan],
+               [1.5, nan],
+               [2.5, 2. ],
+               [3.5, nan],
+               [4.5, 4. ]])
+    """
+    prices = _as_matrix(prices)
+    _check_lookback(lookback)
+    return _by_column(lambda compacted: (array_backend._SMA(compacted, lookback),), prices)[0]
+
+
+def EMA(prices: np.ndarray, lookback: int = 12, smoothing: float = 2.0) -> np.ndarray:
+    """Calculates Exponential Moving Average (EMA) for every column of "prices".
+
+    Args:
+        prices (np.ndarray): The (bars x tickers) matrix of prices, NaN for missing bars
+        lookback (int, optional): The lookback. Defaults to 12.
+        smoothing (float, optional): Smoothing factor. Defaults to 2.0.
+
+    Raises:
+        InvalidInputError: The prices have to be a two dimensional matrix
+        TypeError: The lookback has to be an int
+        ValueError: The lookback has to be positive
+
+    Returns:
+        np.ndarray: The EMA values, with the same shape as "prices"
+    """
+    prices = _as_matrix(prices)
+    _check_lookback(lookback)
+    return _by_column(lambda compacted: (array_backend._EMA(compacted, lookback, smoothing),), prices)[0]
+
+
+def bollinger_bands(prices: np.ndarray, lookback: int = 20) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Calculates lower, middle and upper bollinger bands for every column of "prices".
+
+    Args:
+        prices (np.ndarray): The (bars x tickers) matrix of prices, NaN for missing bars
+        lookback (int, optional): The lookback. Defaults to 20.
+
+    Raises:
+        InvalidInputError: The prices have to be a two dimensional matrix
+        TypeError: The lookback has to be an int
+        ValueError: The lookback has to be positive
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The lower, middle and upper bands, in that order
+    """
+    prices = _as_matrix(prices)
+    _check_lookback(lookback)
+    return _by_column(lambda compacted: array_backend._bollinger_bands(compacted, lookback), prices)
+
+
+def SO(high_prices: np.ndarray, low_prices: np.ndarray, closing_prices: np.ndarray, K_lookback: int = 5,
+       D_lookback: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculates stochastic oscillator K and D scores for every column.
+
+    A bar is treated as missing if any of its high, low or closing price is NaN.
+
+    Args:
+        high_prices (np.ndarray): The (bars x tickers) matrix of high prices
+        low_prices (np.ndarray): The (bars x tickers) matrix of low prices
+        closing_prices (np.ndarray): The (bars x tickers) matrix of closing prices
+        K_lookback (int, optional): lookback for the K score. Defaults to 5.
+        D_lookback (int, optional): lookback for the D score. Defaults to 3.
+
+    Raises:
+        InvalidInputError: The prices have to be two dimensional matrices of the same shape
+        TypeError: The lookbacks have to be ints
+        ValueError: The lookbacks have to be positive
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: K scores & D scores
+    """
+    high_prices = _as_matrix(high_prices)
+    low_prices = _as_matrix(low_prices)
+    closing_prices = _as_matrix(closing_prices)
+    if high_prices.shape != low_prices.shape or high_prices.shape != closing_prices.shape:
+        raise InvalidInputError("The shapes of the price matrices are mismatching")
+    _check_lookback(K_lookback)
+    _check_lookback(D_lookback)
+    stacked = np.stack([high_prices, low_prices, closing_prices], axis=-1)
+    missing = np.isnan(stacked).any(axis=-1)
+    return _by_column(lambda compacted: array_backend._SO(compacted[..., 0], compacted[..., 1], compacted[..., 2],
+                                                          K_lookback, D_lookback),
+                      stacked, missing)
+
+
+def MACD(prices: np.ndarray, MACD_lookback: Tuple[int, int] = (12, 26), MACD_smoothing: Tuple[float, float] = (2.0, 2.0),
+         signal_lookback: int = 9, signal_smoothing: float = 2.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculates the MACD line and its signal line for every column of "prices".
+
+    Args:
+        prices (np.ndarray): The (bars x tickers) matrix of closing prices, NaN for missing bars
+        MACD_lookback (Tuple[int, int], optional): the lookback values used for creating MACD line
+        MACD_smoothing (Tuple[float, float], optional): the smoothing values used for creating MACD line
+        signal_lookback (int, optional): the lookback value used for signal line
+        signal_smoothing (float, optional): the smoothing value used for signal line
+
+    Raises:
+        InvalidInputError: The prices have to be a two dimensional matrix
+        TypeError: The lookbacks have to be ints
+        ValueError: The lookbacks have to be positive
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The MACD values and the signal values
+    """
+    prices = _as_matrix(prices)
+    _check_lookback(MACD_lookback[0])
+    _check_lookback(MACD_lookback[1])
+    _check_lookback(signal_lookback)
+    return _by_column(lambda compacted: array_backend._MACD(compacted, MACD_lookback, MACD_smoothing,
+                                                            signal_lookback, signal_smoothing),
+                      prices)
+
+
+def RSI(prices: np.ndarray, lookback: int = 14) -> np.ndarray:
+    """Calculates Relative Strength Index for every column of "prices".
+
+    Args:
+        prices (np.ndarray): The (bars x tickers) matrix of closing prices, NaN for missing bars
+        lookback (int, optional): The lookback. Defaults to 14.
+
+    Raises:
+        InvalidInputError: The prices have to be a two dimensional matrix
+        TypeError: The lookback has to be an int
+        ValueError: The lookback has to be positive
+
+    Returns:
+        np.ndarray: The RSI values, with the same shape as "prices"
+    """
+    prices = _as_matrix(prices)
+    _check_lookback(lookback)
+    return _by_column(lambda compacted: (array_backend._RSI(compacted, lookback),), prices)[0]
+
+
+def _as_matrix(prices: np.ndarray) -> np.ndarray:
+    prices = np.asarray(prices, dtype=float)
+    if prices.ndim != 2:
+        raise InvalidInputError("The prices are expected to be a two dimensional (bars x tickers) matrix, but they have "
+                                + str(prices.ndim) + " dimensions")
+    return prices
+
+
+def _check_lookback(lookback: int):
+    if type(lookback) is not int:
+        raise TypeError("The lookback is expected to be an int, but it's type is " + str(type(lookback)))
+    if lookback < 1:
+        raise ValueError("The lookback value has to be a positive integer, but it is set to " + str(lookback))
+
+
+def _by_column(kernel: Callable[[np.ndarray], Tuple[np.ndarray, ...]], prices: np.ndarray,
+               missing: Optional[np.ndarray] = None) -> Tuple[np.ndarray, ...]:
+    # Runs a kernel that works along the first axis over every column, skipping the missing bars of each column.
+    # The available bars of a column are moved to the top with a stable sort, which keeps them in order. The
+    # indicators are causal, so the missing bars that end up at the bottom cannot affect the results above them.
+    if missing is None:
+        missing = np.isnan(prices)
+    gapped = missing.any(axis=0)
+    if not gapped.any():
+        return tuple(kernel(prices))
+
+    # only the columns with missing bars need to be reordered
+    order = np.argsort(missing[:, gapped], axis=0, kind="stable")
+    # extra trailing axes, like the high/low/close axis of SO, follow the order of their bar
+    gather = order.reshape(order.shape + (1,) * (prices.ndim - 2))
+    compacted = prices.copy()
+    compacted[:, gapped] = np.take_along_axis(prices[:, gapped], gather, axis=0)
+    results = []
+    for result in kernel(compacted):
+        reordered = np.empty_like(result[:, gapped])
+        np.put_along_axis(reordered, order, result[:, gapped], axis=0)
+        result[:, gapped] = reordered
+        result[missing] = np.nan
+        results.append(result)
+    return tuple(results)
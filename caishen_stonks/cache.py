@@ -0,0 +1,326 @@
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import functools
+import hashlib
+import inspect
+import threading
+
+from . import incremental
+from .workspace import resize, unpack
+
+try:
+    import numpy as np
+    from . import array_backend
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+_TECHNICAL_INDICATORS = "caishen_stonks.technical_indicators"
+# Arguments of the indicators that receive their results or scratch buffers, which are not part of the key
+_BUFFERS = ("out", "workspace")
+
+
+class IndicatorCache:
+    """Opt-in result cache for the technical_indicators functions.
+
+    Results are keyed by the function, its parameters and a fast content hash of every series passed to it, so the
+    same ticker with the same parameters is only computed once. Entries are evicted least recently used first once
+    the estimated size of the cached results exceeds "max_bytes".
+
+    In append-aware mode, a call whose series are a cached series plus new bars extends the cached result instead of
+    recomputing it. This is supported for list inputs of SMA, EMA, bollinger_bands, SO, MACD and RSI. Those calls are
+    computed by the incremental indicators, whose values are identical to the batch functions. On a miss this is
+    slower than calling the batch function, but it keeps the state needed to extend the result later.
+
+    The out and workspace arguments of the indicators are not part of the key. On a hit and on a miss alike, the
+    result is copied into the out buffers, which are returned like the indicator returns them.
+
+    Args:
+        max_bytes (int, optional): Upper bound for the estimated size of the cached results. Defaults to 64 MiB.
+        append_aware (bool, optional): Extend cached results of prefixes of the input. Defaults to False.
+
+    Attributes:
+        hits (int): Calls answered from the cache
+        misses (int): Calls that had to be computed, including extended ones
+        extensions (int): Misses that extended the result of a cached prefix
+        evictions (int): Entries evicted to stay within "max_bytes"
+
+    Example:
+        >>> from caishen_stonks import technical_indicators as TI
+        >>> from caishen_stonks.cache import IndicatorCache
+        >>> cache = IndicatorCache()
+        >>> SMA = cache.wrap(TI.SMA)
+        >>> SMA([1.0, 2.0, 3.0, 4.0], 3)
+        [-1, -1, 2.0, 3.0]
+        >>> SMA([1.0, 2.0, 3.0, 4.0], lookback=3)
+        [-1, -1, 2.0, 3.0]
+        >>> cache.stats()
+        {'hits': 1, 'misses': 1, 'extensions': 0, 'evictions': 0, 'entries': 1, 'bytes': 184}
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, append_aware: bool = False):
+        self.max_bytes = max_bytes
+        self.append_aware = append_aware
+        self.hits = 0
+        self.misses = 0
+        self.extensions = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        # the entries that can be extended, by family, so a miss only looks at the entries of its own call
+        self._extendable: Dict[Tuple, Dict[Tuple, _Entry]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def wrap(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        """Returns a cached version of a technical_indicators function"""
+        @functools.wraps(function)
+        def cached(*args, **kwargs):
+            return self.call(function, *args, **kwargs)
+        return cached
+
+    def call(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Calls function(*args, **kwargs), or returns the cached result of an identical earlier call"""
+        arguments = _bind(function, args, kwargs)
+        buffers = {name: arguments.pop(name) for name in _BUFFERS if name in arguments}
+        out = buffers.pop("out", None)
+        series = {name: value for name, value in arguments.items() if _is_series(value)}
+        parameters = tuple((name, value) for name, value in arguments.items() if name not in series)
+        try:
+            fingerprints = tuple((name, _fingerprint(value)) for name, value in series.items())
+            family = (function.__module__, function.__qualname__, parameters)
+            key = (family, fingerprints)
+            hash(key)
+        except (TypeError, ValueError, OverflowError):
+            # parameters that cannot be hashed or series that are not numeric are not cached
+            return function(*args, **kwargs)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _into(out, entry.result)
+            self.misses += 1
+            candidates = self._candidates(family, series) if self._appendable(function, series) else []
+
+        prefix = self._find_prefix(family, series, candidates)
+        if prefix is not None:
+            result, state = self._extend(function, prefix, series, arguments)
+            with self._lock:
+                self.extensions += 1
+        elif self._appendable(function, series) and _long_enough(function, arguments, series):
+            result, state = _run_incremental(function, arguments, series)
+        else:
+            result, state = function(**arguments, **buffers), None
+
+        self._store(key, _Entry(family, result, {name: len(value) for name, value in series.items()}, state))
+        return _into(out, result)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the counters, the number of entries and the estimated size of the cached results"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "extensions": self.extensions,
+                    "evictions": self.evictions, "entries": len(self._entries), "bytes": self._bytes}
+
+    def clear(self):
+        """Removes every entry, keeping the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._extendable.clear()
+            self._bytes = 0
+
+    def _appendable(self, function: Callable[..., Any], series: Dict[str, Any]) -> bool:
+        return (self.append_aware and function.__module__ == _TECHNICAL_INDICATORS
+                and function.__name__ in _INCREMENTAL and len(series) > 0
+                and all(type(value) is list for value in series.values()))
+
+    def _candidates(self, family: Tuple, series: Dict[str, Any]) -> List[Tuple[Tuple, "_Entry"]]:
+        # the cached series of the same call that are shorter than the input, longest first. Called with the lock held
+        candidates = [(key, entry) for key, entry in self._extendable.get(family, {}).items()
+                      if entry.lengths.keys() == series.keys()
+                      and all(0 < length < len(series[name]) for name, length in entry.lengths.items())]
+        candidates.sort(key=lambda candidate: -max(candidate[1].lengths.values()))
+        return candidates
+
+    def _find_prefix(self, family: Tuple, series: Dict[str, Any],
+                     candidates: List[Tuple[Tuple, "_Entry"]]) -> Optional["_Entry"]:
+        # the longest candidate the input starts with. The prefixes are hashed without holding the lock
+        for key, entry in candidates:
+            prefix_key = (family, tuple((name, _fingerprint(series[name][:entry.lengths[name]]))
+                                        for name in series))
+            if prefix_key != key:
+                continue
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._entries.move_to_end(key)
+                    return entry
+        return None
+
+    def _extend(self, function: Callable[..., Any], prefix: "_Entry", series: Dict[str, Any],
+                arguments: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        factory, feed, merge, _ = _INCREMENTAL[function.__name__]
+        indicator = type(factory(arguments)).from_snapshot(prefix.state)
+        seen = next(iter(prefix.lengths.values()))
+        new_series = [series[name][prefix.lengths[name]:] for name in series]
+        outputs = feed(indicator, new_series)
+        return merge(arguments, _copy(prefix.result), outputs, seen), indicator.snapshot()
+
+    def _store(self, key: Tuple, entry: "_Entry"):
+        with self._lock:
+            if entry.nbytes > self.max_bytes or key in self._entries:
+                return
+            self._entries[key] = entry
+            if entry.state is not None:
+                self._extendable.setdefault(entry.family, {})[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+                if evicted.state is not None:
+                    family = self._extendable[evicted.family]
+                    del family[evicted_key]
+                    if not family:
+                        del self._extendable[evicted.family]
+
+
+class _Entry:
+    __slots__ = ("family", "result", "lengths", "state", "nbytes")
+
+    def __init__(self, family: Tuple, result: Any, lengths: Dict[str, int], state: Optional[Dict[str, Any]]):
+        self.family = family
+        self.result = result
+        self.lengths = lengths
+        self.state = state
+        self.nbytes = _sizeof(result) + sum(_sizeof(value) for value in _state_buffers(state))
+
+
+@functools.lru_cache(maxsize=None)
+def _signature(function: Callable[..., Any]) -> inspect.Signature:
+    return inspect.signature(function)
+
+
+def _bind(function: Callable[..., Any], args: Tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    bound = _signature(function).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def _is_series(value: Any) -> bool:
+    return isinstance(value, (list, array, memoryview)) or (np is not None and isinstance(value, np.ndarray))
+
+
+def _fingerprint(values: Any) -> Tuple[str, int, bytes]:
+    # the kind of series is part of the fingerprint, since lists and arrays give different kinds of results
+    if np is not None and isinstance(values, np.ndarray):
+        kind = "array"
+        data = np.ascontiguousarray(values, dtype=float).data
+    else:
+        kind = "list"
+        data = array("d", values)
+    return kind, len(values), hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _copy(result: Any) -> Any:
+    # callers get their own copy, so changing a result does not change the cache
+    if isinstance(result, tuple):
+        return tuple(_copy(item) for item in result)
+    if isinstance(result, list):
+        return list(result)
+    if np is not None and isinstance(result, np.ndarray):
+        return result.copy()
+    return result
+
+
+def _into(out: Any, result: Any) -> Any:
+    # copies a result into the out buffers of the call and returns them, like the indicator would have
+    if out is None:
+        return _copy(result)
+    if isinstance(result, tuple):
+        return tuple(_into(buffer, item) for buffer, item in zip(unpack(out, len(result)), result))
+    if np is not None and isinstance(result, np.ndarray):
+        buffer = array_backend._output(out, result.shape)
+        buffer[...] = result
+        return buffer
+    buffer = resize(out, len(result))
+    buffer[:] = result
+    return buffer
+
+
+def _sizeof(value: Any) -> int:
+    # an estimate: a list costs a pointer per element plus the float object it points to
+    if isinstance(value, tuple):
+        return sum(_sizeof(item) for item in value)
+    if isinstance(value, list):
+        return 56 + 32 * len(value)
+    if np is not None and isinstance(value, np.ndarray):
+        return 112 + value.nbytes
+    return 64
+
+
+def _state_buffers(state: Any) -> List[Any]:
+    # the windows held by a snapshot of an incremental indicator
+    if isinstance(state, dict):
+        return [buffer for value in state.values() for buffer in _state_buffers(value)]
+    if isinstance(state, list):
+        return [state]
+    return []
+
+
+def _long_enough(function: Callable[..., Any], arguments: Dict[str, Any], series: Dict[str, Any]) -> bool:
+    # shorter series pad their warm-up differently in the batch functions than in the incremental indicators
+    minimum = _INCREMENTAL[function.__name__][3](arguments)
+    return all(len(value) >= minimum for value in series.values())
+
+
+def _run_incremental(function: Callable[..., Any], arguments: Dict[str, Any],
+                     series: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+    factory, feed, merge, _ = _INCREMENTAL[function.__name__]
+    indicator = factory(arguments)
+    outputs = feed(indicator, list(series.values()))
+    return merge(arguments, None, outputs, 0), indicator.snapshot()
+
+
+def _lookback(arguments):
+    return arguments["lookback"]
+
+
+def _append_list(arguments, result, outputs, seen):
+    return (result or []) + outputs
+
+
+def _append_columns(count: int):
+    def merge(arguments, result, outputs, seen):
+        columns = result or tuple([] for _ in range(count))
+        for column, values in zip(columns, zip(*outputs)):
+            column.extend(values)
+        return tuple(columns)
+    return merge
+
+
+def _append_SO(arguments, result, outputs, seen):
+    # SO has no result for the bars before the first complete K lookback
+    skipped = max(0, arguments["K_lookback"] - 1 - seen)
+    return _append_columns(2)(arguments, result, outputs[skipped:], seen)
+
+
+# function name -> (build the incremental indicator, feed it the series, merge its outputs into a result,
+#                   shortest series computed by the incremental indicator)
+_INCREMENTAL = {
+    "SMA": (lambda arguments: incremental.IncrementalSMA(arguments["lookback"]),
+            lambda indicator, series: indicator.extend(series[0]), _append_list, _lookback),
+    "EMA": (lambda arguments: incremental.IncrementalEMA(arguments["lookback"], arguments["smoothing"]),
+            lambda indicator, series: indicator.extend(series[0]), _append_list, _lookback),
+    "RSI": (lambda arguments: incremental.IncrementalRSI(arguments["lookback"]),
+            lambda indicator, series: indicator.extend(series[0]), _append_list, _lookback),
+    "bollinger_bands": (lambda arguments: incremental.IncrementalBollingerBands(arguments["lookback"]),
+                        lambda indicator, series: indicator.extend(series[0]), _append_columns(3), _lookback),
+    "MACD": (lambda arguments: incremental.IncrementalMACD(arguments["MACD_lookback"], arguments["MACD_smoothing"],
+                                                           arguments["signal_lookback"],
+                                                           arguments["signal_smoothing"]),
+             lambda indicator, series: indicator.extend(series[0]), _append_columns(2),
+             lambda arguments: max(arguments["MACD_lookback"]) + arguments["signal_lookback"] - 2),
+    "SO": (lambda arguments: incremental.IncrementalSO(arguments["K_lookback"], arguments["D_lookback"]),
+           lambda indicator, series: indicator.extend(*series), _append_SO,
+           lambda arguments: arguments["K_lookback"] + arguments["D_lookback"] - 2),
+}
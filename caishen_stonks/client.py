@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .constants import DateRange, StockInterval
+from .errors import InvalidInputError, StockDataFetchError
+from .instrumentation import instrumented, observe_bytes
+from .stock import StockHistoryRequestBuilder
+
+# The most tickers the API accepts in a single request
+BATCH_SIZE = 10
+# Responses worth retrying: rate limiting and server side failures
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class StockHistoryClient:
+    """Client fetching the history of any number of stocks.
+
+    The tickers are split into batches of up to 10, the most a StockHistoryRequestBuilder accepts. The batches are
+    requested concurrently over one keep-alive session, and the responses are merged into one dictionary. Requests
+    that fail with a connection error, a timeout or one of RETRY_STATUS_CODES are retried with exponential backoff,
+    or after the delay given by the Retry-After header of the response.
+
+    Args:
+        max_workers (int, optional): The number of batches requested at the same time. Defaults to 8.
+        retries (int, optional): How many times a failed batch is retried. Defaults to 3.
+        backoff (float, optional): Seconds to wait before the first retry, doubled for every next one. Defaults to 0.5.
+        timeout (float, optional): Seconds to wait for a response. Defaults to 10.0.
+        session (requests.Session, optional): The session to send the requests with. Defaults to a new session with a
+            connection pool sized for "max_workers".
+        url (str, optional): Sends the requests to this URL instead of https://RAPIDAPI_HOST/RAPIDAPI_ENDPOINT, e.g.
+            to a local stand-in of the API
+
+    Raises:
+        TypeError: max_workers or retries is not an int
+        ValueError: max_workers is not positive or retries is negative
+
+    Example:
+        >>> from caishen_stonks.client import StockHistoryClient
+        >>> from caishen_stonks.constants import DateRange, StockInterval
+        >>> with StockHistoryClient(max_workers=16) as client:  # doctest: +SKIP
+        ...     history = client.fetch(universe, DateRange.oneYear, StockInterval.oneDay)
+        >>> history["AAPL"]["close"][-1]  # doctest: +SKIP
+        130.36
+    """
+
+    def __init__(self, max_workers: int = 8, retries: int = 3, backoff: float = 0.5, timeout: float = 10.0,
+                 session: Optional[requests.Session] = None, url: Optional[str] = None):
+        if type(max_workers) is not int or type(retries) is not int:
+            raise TypeError("max_workers and retries are expected to be ints")
+        if max_workers < 1:
+            raise ValueError("max_workers has to be a positive integer, but it is set to " + str(max_workers))
+        if retries < 0:
+            raise ValueError("retries cannot be negative, but it is set to " + str(retries))
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.url = url
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    @instrumented
+    def fetch(self, tickers: List[str], date_range: DateRange, interval: StockInterval) -> Dict[str, Any]:
+        """Fetches the history of every ticker
+
+        Args:
+            tickers (List[str]): The stock tickers, any number of them. Duplicates are requested once.
+            date_range (DateRange): The extent of the history to load
+            interval (StockInterval): The aggregate value for a specific interval of stock(s)
+
+        Raises:
+            TypeError: Invalid tickers, date range or interval type
+            InvalidInputError: No tickers were requested
+            MissingEnvVarError: If RAPIDAPI_HOST, RAPIDAPI_ENDPOINT or RAPID_API_TOKEN are missing
+            StockDataFetchError: A batch still failed after all retries, or the API rejected it
+
+        Returns:
+            Dict[str, Any]: The decoded responses of all batches merged together, keyed by ticker
+        """
+        if not isinstance(tickers, list):
+            raise TypeError("Invalid tickers type. Please use a list for tickers")
+        if len(tickers) == 0:
+            raise InvalidInputError("At least one ticker has to be requested")
+        unique = list(dict.fromkeys(tickers))
+        builders = [StockHistoryRequestBuilder(unique[start:start + BATCH_SIZE], date_range, interval)
+                    for start in range(0, len(unique), BATCH_SIZE)]
+
+        history: Dict[str, Any] = {}
+        if len(builders) == 1:
+            history.update(self._fetch_batch(builders[0].conf))
+            return history
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(builders))) as executor:
+            for batch in executor.map(lambda builder: self._fetch_batch(builder.conf), builders):
+                history.update(batch)
+        return history
+
+    def close(self):
+        """Closes the connections of the session"""
+        self.session.close()
+
+    def __enter__(self) -> "StockHistoryClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _fetch_batch(self, conf: Dict[str, Any]) -> Dict[str, Any]:
+        symbols = conf["querystring"]["symbols"]
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = self.session.get(self.url or conf["url"], headers=conf["headers"], params=conf["querystring"],
+                                            timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                reason = str(error)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    observe_bytes("client.StockHistoryClient.fetch", len(response.content))
+                    if not response.ok:
+                        raise StockDataFetchError(f"Fetching {symbols} failed with status {response.status_code}")
+                    return response.json()
+                reason = f"status {response.status_code}"
+                delay = max(delay, _retry_after(response))
+            if attempt < self.retries:
+                time.sleep(delay)
+        raise StockDataFetchError(f"Fetching {symbols} failed after {self.retries + 1} attempts: {reason}")
+
+
+def _retry_after(response: requests.Response) -> float:
+    # only the delay-seconds form of the header is supported
+    try:
+        return float(response.headers.get("Retry-After", 0))
+    except ValueError:
+        return 0.0
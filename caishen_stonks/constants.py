@@ -20,3 +20,23 @@ class StockInterval(Enum):
     oneDay = "1d"
     oneWeek = "1wk"
     oneMonth = "1mo"
+
+
+# Nominal length of a bar of every interval in seconds, a month is counted as 30 days
+INTERVAL_SECONDS = {
+    StockInterval.oneMinute: 60,
+    StockInterval.fiveMinute: 5 * 60,
+    StockInterval.fifteenMinute: 15 * 60,
+    StockInterval.oneDay: 24 * 60 * 60,
+    StockInterval.oneWeek: 7 * 24 * 60 * 60,
+    StockInterval.oneMonth: 30 * 24 * 60 * 60,
+}
+
+# Shortest span every date range covers in seconds, e.g. three months are at least 89 days
+DATE_RANGE_SECONDS = {
+    DateRange.oneDay: 24 * 60 * 60,
+    DateRange.fiveDay: 5 * 24 * 60 * 60,
+    DateRange.threeMonth: 89 * 24 * 60 * 60,
+    DateRange.oneYear: 365 * 24 * 60 * 60,
+    DateRange.fiveYear: 1826 * 24 * 60 * 60,
+}
@@ -0,0 +1,248 @@
+"""Reduction of long price and indicator series to the number of points a chart can show.
+
+A chart that is "width" pixels wide can not show more than about one point per pixel, so sending five years of minute
+bars to the browser only costs serialisation and rendering time. Two reductions are provided:
+
+- lttb selects the points of a line with Largest-Triangle-Three-Buckets, which keeps its visual shape. Long series
+  are first reduced to the minimum and maximum of small buckets with minmax_indices (MinMaxLTTB), so the sequential
+  part of LTTB only runs over a few points per output point.
+- ohlc_buckets aggregates bars into candles, keeping the first open, the highest high, the lowest low and the last
+  close of every bucket, so no extreme is lost.
+
+ChartDownsampler applies them to a price trace and its overlays together: every trace is sampled at the same bars,
+so the overlays stay aligned with the prices. A zoom only reduces the bars in the visible time range, which are found
+by binary search.
+"""
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .array_backend import indicator_array
+from .errors import InvalidInputError
+
+# Points per output point that minmax_indices preselects before LTTB
+PRESELECTION = 4
+
+_Values = Union[Sequence[float], np.ndarray]
+
+
+def minmax_indices(values: _Values, buckets: int) -> np.ndarray:
+    """Returns the positions of the minimum and maximum of "buckets" buckets of equally many values
+
+    Args:
+        values (_Values): The values, NaN values are never selected
+        buckets (int): The number of buckets
+
+    Returns:
+        np.ndarray: The positions in ascending order, at most 2 per bucket
+
+    Example:
+        >>> from caishen_stonks.downsample import minmax_indices
+        >>> minmax_indices([1.0, 5.0, 2.0, 0.0, 3.0, 3.0, 9.0], 3).tolist()
+        [0, 1, 3, 4, 6]
+    """
+    values = np.asarray(values, dtype=float)
+    size = -(-len(values) // max(buckets, 1))
+    if size <= 2:
+        return np.flatnonzero(~np.isnan(values))
+    rows = -(-len(values) // size)
+    padded = np.full(rows * size, np.nan)
+    padded[:len(values)] = values
+    padded = padded.reshape(rows, size)
+    missing = np.isnan(padded)
+    minimum = np.where(missing, np.inf, padded).argmin(axis=1)
+    maximum = np.where(missing, -np.inf, padded).argmax(axis=1)
+    offsets = np.arange(rows) * size
+    empty = missing.all(axis=1)
+    return np.unique(np.concatenate([(offsets + minimum)[~empty], (offsets + maximum)[~empty]]))
+
+
+def lttb(x: _Values, y: _Values, threshold: int) -> np.ndarray:
+    """Selects "threshold" points of a line with Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept. Between them, the points are split into threshold - 2 buckets, and of
+    every bucket the point forming the largest triangle with the point selected in the previous bucket and the
+    average of the next bucket is selected. NaN values are skipped.
+
+    Args:
+        x (_Values): The x coordinates, e.g. timestamps, in ascending order
+        y (_Values): The y coordinates
+        threshold (int): The number of points to select
+
+    Raises:
+        InvalidInputError: x and y have different lengths
+        ValueError: The threshold is smaller than 3
+
+    Returns:
+        np.ndarray: The positions of the selected points in ascending order
+
+    Example:
+        >>> from caishen_stonks.downsample import lttb
+        >>> lttb(range(8), [0.0, 1.0, 0.0, 0.0, 5.0, 0.0, 1.0, 0.0], 4).tolist()
+        [0, 3, 4, 7]
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) != len(y):
+        raise InvalidInputError("The lengths of x (" + str(len(x)) + ") and y (" + str(len(y)) + ") are mismatching")
+    if type(threshold) is not int:
+        raise TypeError("The threshold is expected to be an int, but it's type is " + str(type(threshold)))
+    if threshold < 3:
+        raise ValueError("The threshold has to be at least 3, but it is set to " + str(threshold))
+    positions = np.flatnonzero(~np.isnan(y))
+    if len(positions) > PRESELECTION * threshold:
+        preselected = minmax_indices(y[positions], PRESELECTION * threshold // 2)
+        positions = positions[np.union1d(preselected, [0, len(positions) - 1])]
+    if len(positions) <= threshold:
+        return positions
+    x = x[positions]
+    y = y[positions]
+
+    # bucket i spans [edges[i], edges[i + 1]), the first and last points are buckets of their own
+    edges = np.concatenate([[0], (np.arange(threshold - 1) * (len(x) - 2) / (threshold - 2)).astype(int) + 1,
+                            [len(x)]])
+    edges[-2] = len(x) - 1
+    x_sums = np.concatenate([[0.0], np.cumsum(x)])
+    y_sums = np.concatenate([[0.0], np.cumsum(y)])
+    counts = np.diff(edges)
+    x_means = (x_sums[edges[1:]] - x_sums[edges[:-1]]) / counts
+    y_means = (y_sums[edges[1:]] - y_sums[edges[:-1]]) / counts
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = len(x) - 1
+    previous = 0
+    for bucket in range(1, threshold - 1):
+        first, last = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        cx, cy = x_means[bucket + 1], y_means[bucket + 1]
+        # twice the triangle areas, the factor does not change the maximum
+        areas = np.abs((ax - cx) * (y[first:last] - ay) - (ax - x[first:last]) * (cy - ay))
+        previous = first + int(areas.argmax())
+        selected[bucket] = previous
+    return positions[selected]
+
+
+def ohlc_buckets(x: _Values, open: _Values, high: _Values, low: _Values, close: _Values,
+                 buckets: int) -> Tuple[np.ndarray, ...]:
+    """Aggregates bars into at most "buckets" candles of equally many bars
+
+    Args:
+        x (_Values): The timestamps of the bars
+        open (_Values): The opening prices
+        high (_Values): The high prices
+        low (_Values): The low prices
+        close (_Values): The closing prices
+        buckets (int): The number of candles
+
+    Returns:
+        Tuple[np.ndarray, ...]: The positions of the last bar of every candle, which label the candles, and the
+        open, high, low and close of the candles. NaN prices are skipped.
+
+    Example:
+        >>> from caishen_stonks.downsample import ohlc_buckets
+        >>> last, open, high, low, close = ohlc_buckets(range(4), [1.0, 2.0, 3.0, 4.0], [2.0, 5.0, 4.0, 4.5],
+        ...                                             [0.5, 1.5, 2.5, 3.5], [2.0, 3.0, 4.0, 4.0], 2)
+        >>> last.tolist(), open.tolist(), high.tolist(), low.tolist(), close.tolist()
+        ([1, 3], [1.0, 3.0], [5.0, 4.5], [0.5, 2.5], [3.0, 4.0])
+    """
+    columns = [np.asarray(column, dtype=float) for column in (open, high, low, close)]
+    length = len(columns[3])
+    if len(x) != length or any(len(column) != length for column in columns):
+        raise InvalidInputError("The lengths of the timestamps and prices are mismatching")
+    size = max(1, -(-length // max(buckets, 1)))
+    starts = np.arange(0, length, size)
+    last = np.minimum(starts + size, length) - 1
+    if size == 1:
+        return (last,) + tuple(columns)
+    with np.errstate(invalid="ignore"):
+        high = np.fmax.reduceat(columns[1], starts)
+        low = np.fmin.reduceat(columns[2], starts)
+    counts = last + 1 - starts
+    return last, _valid(columns[0], starts, counts, 1), high, low, _valid(columns[3], last, counts, -1)
+
+
+class ChartDownsampler:
+    """Serves a price trace and its overlays reduced to the width of a chart, at any zoom.
+
+    The columns are converted to float arrays once. The warm-up of the overlays, -1 in the list outputs of
+    technical_indicators, becomes a gap, and so do NaN prices. Without open, high and low prices, the bars are
+    selected by LTTB over the closing prices. With them, they are aggregated into candles by ohlc_buckets and the
+    overlays are sampled at the last bar of every candle. Either way every trace is returned for the same timestamps.
+
+    Args:
+        x (_Values): The timestamps of the bars, in ascending order
+        close (_Values): The closing prices
+        overlays (Dict[str, _Values], optional): Indicator traces aligned with the bars, e.g. {"SMA(20)": SMA(...)}
+        open (_Values, optional): The opening prices, to chart candles
+        high (_Values, optional): The high prices, to chart candles
+        low (_Values, optional): The low prices, to chart candles
+
+    Raises:
+        InvalidInputError: A trace has another length than the timestamps
+
+    Example:
+        >>> from caishen_stonks.downsample import ChartDownsampler
+        >>> from caishen_stonks import technical_indicators as TI
+        >>> close = [float(value % 7) for value in range(100)]
+        >>> chart = ChartDownsampler(range(100), close, {"SMA(5)": TI.SMA(close, 5)})
+        >>> view = chart.view(10, start=50)
+        >>> len(view["x"]), len(view["SMA(5)"])
+        (10, 10)
+    """
+
+    def __init__(self, x: _Values, close: _Values, overlays: Optional[Dict[str, _Values]] = None,
+                 open: Optional[_Values] = None, high: Optional[_Values] = None, low: Optional[_Values] = None):
+        self.x = np.asarray(x)
+        self.traces = {"close": np.asarray(close, dtype=float)}
+        self.candles = open is not None and high is not None and low is not None
+        if self.candles:
+            self.traces.update((name, np.asarray(values, dtype=float))
+                               for name, values in (("open", open), ("high", high), ("low", low)))
+        self.traces.update((name, indicator_array(values)) for name, values in (overlays or {}).items())
+        for name, values in self.traces.items():
+            if len(values) != len(self.x):
+                raise InvalidInputError("The length of " + name + " is " + str(len(values)) + ", but there are "
+                                        + str(len(self.x)) + " timestamps")
+
+    def view(self, width: int, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, list]:
+        """Returns the traces for a chart "width" points wide showing the bars with start <= x <= end
+
+        Args:
+            width (int): The number of points, e.g. the width of the chart in pixels
+            start (float, optional): The first timestamp shown. Defaults to the first bar.
+            end (float, optional): The last timestamp shown. Defaults to the last bar.
+
+        Returns:
+            Dict[str, list]: The timestamps as "x" and the values of every trace, None for a gap, ready to be
+            serialised to JSON
+        """
+        first = 0 if start is None else int(np.searchsorted(self.x, start, side="left"))
+        last = len(self.x) if end is None else int(np.searchsorted(self.x, end, side="right"))
+        x = self.x[first:last]
+        traces = {name: values[first:last] for name, values in self.traces.items()}
+        if self.candles:
+            positions, open, high, low, close = ohlc_buckets(x, traces["open"], traces["high"], traces["low"],
+                                                             traces["close"], width)
+            sampled = {name: values[positions] for name, values in traces.items()}
+            sampled.update(open=open, high=high, low=low, close=close)
+        else:
+            positions = lttb(x, traces["close"], width) if len(x) > width else np.arange(len(x))
+            sampled = {name: values[positions] for name, values in traces.items()}
+        view = {"x": x[positions].tolist()}
+        view.update((name, _json(values)) for name, values in sampled.items())
+        return view
+
+
+def _valid(values: np.ndarray, origins: np.ndarray, counts: np.ndarray, step: int) -> np.ndarray:
+    # the first non NaN value of every bucket, walking "counts" values from its origin in the direction of "step"
+    steps = np.arange(counts.max())
+    inside = steps < counts[:, np.newaxis]
+    windows = np.where(inside, values[np.clip(origins[:, np.newaxis] + step * steps, 0, len(values) - 1)], np.nan)
+    valid = ~np.isnan(windows)
+    chosen = windows[np.arange(len(origins)), valid.argmax(axis=1)]
+    return np.where(valid.any(axis=1), chosen, np.nan)
+
+
+def _json(values: np.ndarray) -> list:
+    return [None if value != value else value for value in values.tolist()]
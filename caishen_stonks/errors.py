@@ -6,3 +6,8 @@ class InvalidInputError(Exception):
 class MissingEnvVarError(Exception):
     """Raised when there is a missing enviroment variable"""
     pass
+
+
+class StockDataFetchError(Exception):
+    """Raised when the stock data could not be fetched from the API"""
+    pass
@@ -0,0 +1,169 @@
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Optional
+import math
+
+from .errors import InvalidInputError
+
+# The price and volume columns a history can hold besides the timestamps
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class StockHistory:
+    """Compact columnar history of one stock.
+
+    Every column is a read-only memoryview over a contiguous buffer: the timestamps are 64 bit integers (array('q'))
+    and the prices and volumes are doubles (array('d')), 8 bytes per value instead of a Python float in a list. The
+    columns can be passed to the technical_indicators functions as they are, and numpy.asarray(column) wraps them
+    without copying to use the NumPy backend.
+
+    A missing value (null in the API response) is stored as NaN. The windowed indicators, SMA, bollinger_bands and SO,
+    are NaN for the windows containing it and recover once it leaves the window, but the recursive ones, EMA, MACD
+    and RSI, carry it into every later value. Use filled() to fill the gaps before computing those.
+
+    Slicing a history, by position or by time with between, shares the buffers of the original instead of copying.
+
+    Args:
+        symbol (str): The stock ticker
+        timestamp (Iterable[int]): Unix timestamps of the bars, in ascending order
+        close (Iterable[float]): The closing prices
+        open (Iterable[float], optional): The opening prices
+        high (Iterable[float], optional): The high prices
+        low (Iterable[float], optional): The low prices
+        volume (Iterable[float], optional): The traded volumes
+
+    Raises:
+        InvalidInputError: The columns have different lengths
+
+    Example:
+        >>> from caishen_stonks.history import StockHistory
+        >>> from caishen_stonks import technical_indicators as TI
+        >>> history = StockHistory("AAPL", [1588305600, 1590984000, 1593576000, 1596254400],
+        ...                        [79.485, 91.2, 106.26, 129.04])
+        >>> history.between(1590984000, 1596254400).close.tolist()
+        [91.2, 106.26]
+        >>> TI.SMA(history.close, 2)
+        [-1, 85.3425, 98.73, 117.65]
+    """
+    __slots__ = ("symbol", "timestamp", "open", "high", "low", "close", "volume")
+
+    def __init__(self, symbol: str, timestamp: Iterable[int], close: Iterable[float],
+                 open: Optional[Iterable[float]] = None, high: Optional[Iterable[float]] = None,
+                 low: Optional[Iterable[float]] = None, volume: Optional[Iterable[float]] = None):
+        self.symbol = symbol
+        self.timestamp = _column("q", timestamp)
+        self.open = _column("d", open)
+        self.high = _column("d", high)
+        self.low = _column("d", low)
+        self.close = _column("d", close)
+        self.volume = _column("d", volume)
+        for field in FIELDS:
+            column = getattr(self, field)
+            if column is not None and len(column) != len(self.timestamp):
+                raise InvalidInputError("The length of the " + field + " column is " + str(len(column))
+                                        + ", but there are " + str(len(self.timestamp)) + " timestamps")
+
+    @classmethod
+    def from_response(cls, response: Dict[str, Any]) -> Dict[str, "StockHistory"]:
+        """Builds the history of every symbol in a decoded API response
+
+        Args:
+            response (Dict[str, Any]): The decoded JSON response, keyed by symbol, e.g. from StockHistoryClient.fetch
+
+        Returns:
+            Dict[str, StockHistory]: The history of every symbol
+        """
+        return {symbol: cls(symbol, data.get("timestamp") or [], data.get("close") or [],
+                            **{field: data[field] for field in ("open", "high", "low", "volume") if data.get(field)})
+                for symbol, data in response.items()}
+
+    def between(self, start: Optional[int] = None, end: Optional[int] = None) -> "StockHistory":
+        """Returns the bars with start <= timestamp < end, sharing the buffers of this history
+
+        Args:
+            start (int, optional): The first Unix timestamp to include. Defaults to the first bar.
+            end (int, optional): The Unix timestamp to stop before. Defaults to after the last bar.
+
+        Returns:
+            StockHistory: The bars in the time range
+        """
+        first = 0 if start is None else bisect_left(self.timestamp, start)
+        last = len(self.timestamp) if end is None else bisect_left(self.timestamp, end)
+        return self[first:last]
+
+    def filled(self) -> "StockHistory":
+        """Returns the history with its missing values filled in, e.g. to compute the recursive indicators
+
+        A missing price takes the last known price of its column and a missing volume is 0. The leading bars before
+        every price column has a value are dropped. Columns without missing values share the buffers of this history.
+
+        Returns:
+            StockHistory: The history without NaN values
+
+        Example:
+            >>> from caishen_stonks.history import StockHistory
+            >>> history = StockHistory("AAPL", [1, 2, 3, 4], [None, 10.0, None, 12.0], volume=[5, 6, None, 8])
+            >>> filled = history.filled()
+            >>> filled.timestamp.tolist(), filled.close.tolist(), filled.volume.tolist()
+            ([2, 3, 4], [10.0, 10.0, 12.0], [6.0, 0.0, 8.0])
+        """
+        prices = [getattr(self, field) for field in FIELDS[:-1] if getattr(self, field) is not None]
+        first = next((i for i in range(len(self)) if all(column[i] == column[i] for column in prices)), len(self))
+        history = self[first:]
+        for field in FIELDS:
+            column = getattr(history, field)
+            if column is not None and any(value != value for value in column):
+                setattr(history, field, _filled(column, field == "volume"))
+        return history
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the column buffers in bytes"""
+        return sum(column.nbytes for column in self._columns().values())
+
+    def _columns(self) -> Dict[str, memoryview]:
+        columns = {"timestamp": self.timestamp}
+        columns.update((field, getattr(self, field)) for field in FIELDS if getattr(self, field) is not None)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, index: slice) -> "StockHistory":
+        if not isinstance(index, slice):
+            raise TypeError("A StockHistory can only be indexed by a slice")
+        history = StockHistory.__new__(StockHistory)
+        history.symbol = self.symbol
+        for field in ("timestamp",) + FIELDS:
+            column = getattr(self, field)
+            setattr(history, field, None if column is None else column[index])
+        return history
+
+    def __repr__(self) -> str:
+        return f"StockHistory({self.symbol!r}, {len(self)} bars, fields={list(self._columns())})"
+
+
+def _column(typecode: str, values: Optional[Iterable[Any]]) -> Optional[memoryview]:
+    if values is None:
+        return None
+    try:
+        view = memoryview(values)
+    except TypeError:
+        pass
+    else:
+        # buffers holding 8 byte values of the right kind, like arrays or numpy arrays, are used without copying
+        kind = "d" if typecode == "d" else "qlLQ"
+        if view.ndim == 1 and view.c_contiguous and view.itemsize == 8 and view.format in kind:
+            return view.cast("B").cast(typecode).toreadonly()
+    if typecode == "d":
+        values = (math.nan if value is None else value for value in values)
+    return memoryview(array(typecode, values)).toreadonly()
+
+
+def _filled(column: memoryview, zero: bool) -> memoryview:
+    # NaN values take the previous value, or 0 if "zero"
+    values = array("d", column)
+    for i, value in enumerate(values):
+        if value != value:
+            values[i] = 0.0 if zero else values[i - 1]
+    return memoryview(values).toreadonly()
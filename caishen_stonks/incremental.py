@@ -0,0 +1,366 @@
+from typing import Any, Dict, List, Optional, Tuple
+from .rolling import RollingExtremum, RollingMeanStd, RollingSum
+
+
+class IncrementalSMA:
+    """Streaming counterpart of technical_indicators.SMA.
+
+    Each call to update costs O(1), regardless of how much history has been seen. Over any input with at least
+    "lookback - 1" values, the values returned by update are exactly the values SMA returns for the same input.
+
+    Args:
+        lookback (int, optional): The lookback. Defaults to 14.
+
+    Raises:
+        TypeError: The lookback has to be an int
+        ValueError: The lookback has to be positive
+
+    Example:
+        >>> from caishen_stonks.incremental import IncrementalSMA
+        >>> sma = IncrementalSMA(3)
+        >>> sma.extend([1.0, 2.0, 3.0])
+        [-1, -1, 2.0]
+        >>> sma.update(4.0)
+        3.0
+    """
+    __slots__ = ("lookback", "_sum")
+
+    def __init__(self, lookback: int = 14):
+        _check_lookback(lookback)
+        self.lookback = lookback
+        self._sum = RollingSum(lookback)
+
+    def update(self, value: float) -> float:
+        """Adds the newest value and returns the newest SMA value, or -1 while the lookback is not complete"""
+        total = self._sum.push(value)
+        if total is None:
+            return -1
+        return total / (1.0 * self.lookback)
+
+    def extend(self, values: List[float]) -> List[float]:
+        """Adds every value in order, e.g. to seed from history, and returns the SMA value for each of them"""
+        return [self.update(value) for value in values]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state as a dictionary of plain Python values that from_snapshot can restore"""
+        return {"lookback": self.lookback, "sum": self._sum.snapshot()}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "IncrementalSMA":
+        """Restores an indicator from the dictionary returned by snapshot"""
+        indicator = cls(state["lookback"])
+        indicator._sum = RollingSum.from_snapshot(state["sum"])
+        return indicator
+
+
+class IncrementalEMA:
+    """Streaming counterpart of technical_indicators.EMA.
+
+    Like EMA, the first value is the average of the first "lookback" values. Over any input with at least
+    "lookback - 1" values, update returns exactly the values EMA returns for the same input.
+
+    Args:
+        lookback (int, optional): The lookback. Defaults to 12.
+        smoothing (float, optional): Smoothing factor. Defaults to 2.0.
+
+    Raises:
+        TypeError: The lookback has to be an int
+        ValueError: The lookback has to be positive
+
+    Example:
+        >>> from caishen_stonks.incremental import IncrementalEMA
+        >>> ema = IncrementalEMA(4, 2.0)
+        >>> ema.extend([1.0, 2.0, 3.0, 4.0, 5.0])
+        [-1, -1, -1, 2.5, 3.5]
+    """
+    __slots__ = ("lookback", "smoothing", "_multiplier", "_warm_up", "_ema")
+
+    def __init__(self, lookback: int = 12, smoothing: float = 2.0):
+        _check_lookback(lookback)
+        self.lookback = lookback
+        self.smoothing = smoothing
+        self._multiplier = smoothing / (1.0 * (1 + lookback))
+        self._warm_up: List[float] = []
+        self._ema: Optional[float] = None
+
+    def update(self, value: float) -> float:
+        """Adds the newest value and returns the newest EMA value, or -1 while the lookback is not complete"""
+        if self._ema is None:
+            self._warm_up.append(value)
+            if len(self._warm_up) < self.lookback:
+                return -1
+            # The EMA of the first N elements is equal to their average
+            self._ema = sum(self._warm_up) / (1.0 * self.lookback)
+            self._warm_up = []
+        else:
+            self._ema = value * self._multiplier + self._ema * (1 - self._multiplier)
+        return self._ema
+
+    def extend(self, values: List[float]) -> List[float]:
+        """Adds every value in order, e.g. to seed from history, and returns the EMA value for each of them"""
+        return [self.update(value) for value in values]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state as a dictionary of plain Python values that from_snapshot can restore"""
+        return {"lookback": self.lookback, "smoothing": self.smoothing, "warm_up": list(self._warm_up),
+                "ema": self._ema}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "IncrementalEMA":
+        """Restores an indicator from the dictionary returned by snapshot"""
+        indicator = cls(state["lookback"], state["smoothing"])
+        indicator._warm_up = list(state["warm_up"])
+        indicator._ema = state["ema"]
+        return indicator
+
+
+class IncrementalBollingerBands:
+    """Streaming counterpart of technical_indicators.bollinger_bands.
+
+    Args:
+        lookback (int, optional): The lookback. Defaults to 20.
+
+    Raises:
+        TypeError: The lookback has to be an int
+        ValueError: The lookback has to be positive
+
+    Example:
+        >>> from caishen_stonks.incremental import IncrementalBollingerBands
+        >>> bands = IncrementalBollingerBands(2)
+        >>> bands.extend([1.0, 2.0, 3.0])
+        [(-1, -1, -1), (0.5, 1.5, 2.5), (1.5, 2.5, 3.5)]
+    """
+    __slots__ = ("lookback", "_moments")
+
+    def __init__(self, lookback: int = 20):
+        _check_lookback(lookback)
+        self.lookback = lookback
+        self._moments = RollingMeanStd(lookback)
+
+    def update(self, value: float) -> Tuple[float, float, float]:
+        """Adds the newest value and returns the newest lower, middle and upper band values
+
+        All three are -1 while the lookback is not complete
+        """
+        moments = self._moments.push(value)
+        if moments is None:
+            return -1, -1, -1
+        average, stdev = moments
+        return average - 2 * stdev, average, average + 2 * stdev
+
+    def extend(self, values: List[float]) -> List[Tuple[float, float, float]]:
+        """Adds every value in order, e.g. to seed from history, and returns the bands for each of them"""
+        return [self.update(value) for value in values]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state as a dictionary of plain Python values that from_snapshot can restore"""
+        return {"lookback": self.lookback, "moments": self._moments.snapshot()}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "IncrementalBollingerBands":
+        """Restores an indicator from the dictionary returned by snapshot"""
+        indicator = cls(state["lookback"])
+        indicator._moments = RollingMeanStd.from_snapshot(state["moments"])
+        return indicator
+
+
+class IncrementalSO:
+    """Streaming counterpart of technical_indicators.SO.
+
+    SO only returns K scores once "K_lookback" bars have been seen, while update returns (-1, -1) for those first bars
+    so that there is one result per bar. From then on, update returns exactly the K and D scores SO returns.
+
+    Args:
+        K_lookback (int, optional): lookback days for the K score. Defaults to 5.
+        D_lookback (int, optional): lookback days for the D score. Defaults to 3.
+
+    Raises:
+        TypeError: The lookbacks have to be ints
+        ValueError: The lookbacks have to be positive
+
+    Example:
+        >>> from caishen_stonks.incremental import IncrementalSO
+        >>> so = IncrementalSO(2, 2)
+        >>> [so.update(high, low, close) for high, low, close in [(3.0, 1.0, 2.0), (4.0, 2.0, 4.0), (5.0, 3.0, 4.0)]]
+        [(-1, -1), (100.0, -1), (66.66666666666667, 83.33333333333334)]
+    """
+    __slots__ = ("K_lookback", "D_lookback", "_highest", "_lowest", "_D")
+
+    def __init__(self, K_lookback: int = 5, D_lookback: int = 3):
+        _check_lookback(K_lookback)
+        _check_lookback(D_lookback)
+        self.K_lookback = K_lookback
+        self.D_lookback = D_lookback
+        self._highest = RollingExtremum(K_lookback, maximum=True)
+        self._lowest = RollingExtremum(K_lookback, maximum=False)
+        self._D = IncrementalSMA(D_lookback)
+
+    def update(self, high: float, low: float, close: float) -> Tuple[float, float]:
+        """Adds the newest bar and returns its K and D scores"""
+        highest = self._highest.push(high)
+        lowest = self._lowest.push(low)
+        if highest is None or lowest is None:
+            return -1, -1
+        if highest == lowest:
+            K_score = 50.0
+        else:
+            K_score = 100.0 * (close - lowest) / (highest - lowest)
+        return K_score, self._D.update(K_score)
+
+    def extend(self, high_values: List[float], low_values: List[float],
+               closing_values: List[float]) -> List[Tuple[float, float]]:
+        """Adds every bar in order, e.g. to seed from history, and returns the K and D scores for each of them"""
+        return [self.update(high, low, close) for high, low, close in zip(high_values, low_values, closing_values)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state as a dictionary of plain Python values that from_snapshot can restore"""
+        return {"K_lookback": self.K_lookback, "D_lookback": self.D_lookback, "highest": self._highest.snapshot(),
+                "lowest": self._lowest.snapshot(), "D": self._D.snapshot()}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "IncrementalSO":
+        """Restores an indicator from the dictionary returned by snapshot"""
+        indicator = cls(state["K_lookback"], state["D_lookback"])
+        indicator._highest = RollingExtremum.from_snapshot(state["highest"])
+        indicator._lowest = RollingExtremum.from_snapshot(state["lowest"])
+        indicator._D = IncrementalSMA.from_snapshot(state["D"])
+        return indicator
+
+
+class IncrementalMACD:
+    """Streaming counterpart of technical_indicators.MACD.
+
+    Args:
+        MACD_lookback (Tuple[int, int], optional): the lookback values used for creating MACD line
+        MACD_smoothing (Tuple[float, float], optional): the smoothing values used for creating MACD line
+        signal_lookback (int, optional): the lookback value used for signal line
+        signal_smoothing (float, optional): the smoothing value used for signal line
+
+    Raises:
+        TypeError: The lookbacks have to be ints
+        ValueError: The lookbacks have to be positive
+
+    Example:
+        >>> from caishen_stonks.incremental import IncrementalMACD
+        >>> macd = IncrementalMACD((2, 3), signal_lookback=2)
+        >>> macd.extend([1.0, 2.0, 3.0, 4.0, 5.0])
+        [(-1, -1), (-1, -1), (0.5, -1), (0.5, 0.5), (0.5, 0.5)]
+    """
+    __slots__ = ("MACD_lookback", "MACD_smoothing", "signal_lookback", "signal_smoothing", "_short_term",
+                 "_long_term", "_signal", "_count")
+
+    def __init__(self, MACD_lookback: Tuple[int, int] = (12, 26), MACD_smoothing: Tuple[float, float] = (2.0, 2.0),
+                 signal_lookback: int = 9, signal_smoothing: float = 2.0):
+        self.MACD_lookback = tuple(MACD_lookback)
+        self.MACD_smoothing = tuple(MACD_smoothing)
+        self.signal_lookback = signal_lookback
+        self.signal_smoothing = signal_smoothing
+        self._short_term = IncrementalEMA(MACD_lookback[0], MACD_smoothing[0])
+        self._long_term = IncrementalEMA(MACD_lookback[1], MACD_smoothing[1])
+        self._signal = IncrementalEMA(signal_lookback, signal_smoothing)
+        self._count = 0
+
+    def update(self, value: float) -> Tuple[float, float]:
+        """Adds the newest value and returns the newest MACD and signal values, or -1 while they warm up"""
+        x = self._short_term.update(value)
+        y = self._long_term.update(value)
+        MACD_value = x - y if y != -1 else -1
+        signal_value = -1
+        # like MACD, the signal line averages the MACD values from the end of the long lookback onwards
+        if self._count >= self.MACD_lookback[1] - 1:
+            signal_value = self._signal.update(MACD_value)
+        self._count += 1
+        return MACD_value, signal_value
+
+    def extend(self, values: List[float]) -> List[Tuple[float, float]]:
+        """Adds every value in order, e.g. to seed from history, and returns the MACD and signal for each of them"""
+        return [self.update(value) for value in values]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state as a dictionary of plain Python values that from_snapshot can restore"""
+        return {"MACD_lookback": list(self.MACD_lookback), "MACD_smoothing": list(self.MACD_smoothing),
+                "signal_lookback": self.signal_lookback, "signal_smoothing": self.signal_smoothing,
+                "short_term": self._short_term.snapshot(), "long_term": self._long_term.snapshot(),
+                "signal": self._signal.snapshot(), "count": self._count}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "IncrementalMACD":
+        """Restores an indicator from the dictionary returned by snapshot"""
+        indicator = cls(tuple(state["MACD_lookback"]), tuple(state["MACD_smoothing"]), state["signal_lookback"],
+                        state["signal_smoothing"])
+        indicator._short_term = IncrementalEMA.from_snapshot(state["short_term"])
+        indicator._long_term = IncrementalEMA.from_snapshot(state["long_term"])
+        indicator._signal = IncrementalEMA.from_snapshot(state["signal"])
+        indicator._count = state["count"]
+        return indicator
+
+
+class IncrementalRSI:
+    """Streaming counterpart of technical_indicators.RSI.
+
+    Args:
+        lookback (int, optional): The lookback. Defaults to 14.
+
+    Raises:
+        TypeError: The lookback has to be an int
+        ValueError: The lookback has to be positive
+
+    Example:
+        >>> from caishen_stonks.incremental import IncrementalRSI
+        >>> rsi = IncrementalRSI(3)
+        >>> rsi.extend([1.0, 1.2, 1.4, 1.1, 0.9])
+        [-1, -1, 0.0, 57.14285714285715, 28.57142857142857]
+    """
+    __slots__ = ("lookback", "_previous", "_gain", "_loss")
+
+    def __init__(self, lookback: int = 14):
+        _check_lookback(lookback)
+        self.lookback = lookback
+        self._previous: Optional[float] = None
+        self._gain = IncrementalSMA(lookback)
+        self._loss = IncrementalSMA(lookback)
+
+    def update(self, value: float) -> float:
+        """Adds the newest value and returns the newest RSI value, or -1 while the lookback is not complete"""
+        gain = 0.0
+        loss = 0.0
+        if self._previous is not None:
+            change = value - self._previous
+            if change >= 0:
+                gain = change
+            else:
+                loss = abs(change)
+        self._previous = value
+
+        x = self._gain.update(gain)
+        y = self._loss.update(loss)
+        if y == -1:
+            return -1
+        elif y == 0:
+            return 0.0
+        return 100 - 100 / (1 + x / y)
+
+    def extend(self, values: List[float]) -> List[float]:
+        """Adds every value in order, e.g. to seed from history, and returns the RSI value for each of them"""
+        return [self.update(value) for value in values]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state as a dictionary of plain Python values that from_snapshot can restore"""
+        return {"lookback": self.lookback, "previous": self._previous, "gain": self._gain.snapshot(),
+                "loss": self._loss.snapshot()}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "IncrementalRSI":
+        """Restores an indicator from the dictionary returned by snapshot"""
+        indicator = cls(state["lookback"])
+        indicator._previous = state["previous"]
+        indicator._gain = IncrementalSMA.from_snapshot(state["gain"])
+        indicator._loss = IncrementalSMA.from_snapshot(state["loss"])
+        return indicator
+
+
+def _check_lookback(lookback: int):
+    if type(lookback) is not int:
+        raise TypeError("The lookback is expected to be an int, but it's type is " + str(type(lookback)))
+    if lookback < 1:
+        raise ValueError("The lookback value has to be a positive integer, but it is set to " + str(lookback))
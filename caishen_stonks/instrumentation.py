@@ -0,0 +1,195 @@
+"""Opt-in timing and counters for the indicator and fetch hot paths.
+
+The functions of technical_indicators, StockHistoryRequestBuilder and StockHistoryClient are decorated with
+instrumented. While instrumentation is disabled, which is the default, the decorator only adds one flag check per
+call. Enable it with enable() or by setting the environment variable CAISHEN_INSTRUMENTATION=1 before the package is
+imported. Every call is then recorded in REGISTRY: the number of calls and errors, the size of the input (the length of
+the first positional argument that has one, else of the first keyword argument that has one), the cumulative latency
+and the latencies of the most recent calls, from which the percentiles are computed. StockHistoryClient also records
+the bytes of every response it receives. Composite indicators like MACD and RSI call the undecorated indicators they
+are built from, so a call is recorded once, under the function that was called.
+
+The registry can be read with snapshot() or exported in the Prometheus text format with to_prometheus().
+
+Example:
+    >>> from caishen_stonks import instrumentation
+    >>> from caishen_stonks import technical_indicators as TI
+    >>> instrumentation.enable()
+    >>> _ = TI.SMA([1.0, 2.0, 3.0, 4.0], 2)
+    >>> instrumentation.REGISTRY.snapshot()["technical_indicators.SMA"]["calls"]
+    1
+    >>> instrumentation.disable()
+    >>> instrumentation.REGISTRY.reset()
+"""
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+import functools
+import math
+import os
+import threading
+import time
+
+# Latencies of the most recent calls of a function that the percentiles are computed from
+SAMPLES = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+_enabled = os.environ.get("CAISHEN_INSTRUMENTATION", "") not in ("", "0")
+
+
+def enable():
+    """Starts recording the instrumented calls"""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stops recording the instrumented calls, keeping what was recorded"""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """Returns whether the instrumented calls are recorded"""
+    return _enabled
+
+
+class _Metric:
+    __slots__ = ("calls", "errors", "items", "seconds", "latencies", "fetched_bytes", "responses")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.items = 0
+        self.seconds = 0.0
+        self.latencies: Deque[float] = deque(maxlen=SAMPLES)
+        self.fetched_bytes = 0
+        self.responses = 0
+
+
+class Registry:
+    """In-process store of the recorded calls, keyed by the name of the instrumented function"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, items: Optional[int] = None, error: bool = False):
+        """Records one call of "name" that took "seconds" for an input of "items" values"""
+        with self._lock:
+            metric = self._metric(name)
+            metric.calls += 1
+            metric.errors += error
+            metric.items += items or 0
+            metric.seconds += seconds
+            metric.latencies.append(seconds)
+
+    def observe_bytes(self, name: str, size: int):
+        """Records a response received by "name" with a size of "size" bytes"""
+        with self._lock:
+            metric = self._metric(name)
+            metric.fetched_bytes += size
+            metric.responses += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the recorded metrics of every function, with the latency percentiles of its recent calls"""
+        with self._lock:
+            metrics = {name: (metric, sorted(metric.latencies)) for name, metric in self._metrics.items()}
+        return {name: {"calls": metric.calls, "errors": metric.errors, "items": metric.items,
+                       "seconds": metric.seconds, "fetched_bytes": metric.fetched_bytes,
+                       "responses": metric.responses,
+                       "quantiles": {quantile: _quantile(latencies, quantile) for quantile in QUANTILES}}
+                for name, (metric, latencies) in sorted(metrics.items())}
+
+    def to_prometheus(self, prefix: str = "caishen") -> str:
+        """Returns the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(metric: str, kind: str, description: str, samples):
+            lines.append(f"# HELP {prefix}_{metric} {description}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"{prefix}_{metric}{suffix}{{{label_text}}} {_format(value)}")
+
+        called = {name: values for name, values in snapshot.items() if values["calls"]}
+        family("calls_total", "counter", "Calls of the instrumented function",
+               [("", [("function", name)], values["calls"]) for name, values in called.items()])
+        family("errors_total", "counter", "Calls of the instrumented function that raised",
+               [("", [("function", name)], values["errors"]) for name, values in called.items()])
+        family("input_items_total", "counter", "Values passed to the instrumented function",
+               [("", [("function", name)], values["items"]) for name, values in called.items()])
+        family("latency_seconds", "summary", "Latency of the instrumented function",
+               [sample for name, values in called.items() for sample in
+                [("", [("function", name), ("quantile", quantile)], latency)
+                 for quantile, latency in values["quantiles"].items()]
+                + [("_sum", [("function", name)], values["seconds"]),
+                   ("_count", [("function", name)], values["calls"])]])
+        fetched = {name: values for name, values in snapshot.items() if values["responses"]}
+        family("fetched_bytes", "summary", "Bytes of the responses received",
+               [sample for name, values in fetched.items() for sample in
+                [("_sum", [("function", name)], values["fetched_bytes"]),
+                 ("_count", [("function", name)], values["responses"])]])
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Forgets everything recorded"""
+        with self._lock:
+            self._metrics.clear()
+
+    def _metric(self, name: str) -> _Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = _Metric()
+        return metric
+
+
+REGISTRY = Registry()
+
+
+def instrumented(function: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator recording the calls of "function" in REGISTRY while instrumentation is enabled
+
+    The calls are recorded under MODULE.QUALNAME, e.g. technical_indicators.SMA
+    """
+    name = function.__module__.rsplit(".", 1)[-1] + "." + function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return function(*args, **kwargs)
+        error = True
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            REGISTRY.observe(name, time.perf_counter() - start, _size(args, kwargs), error)
+    return wrapper
+
+
+def observe_bytes(name: str, size: int):
+    """Records a response of "size" bytes received by "name" in REGISTRY while instrumentation is enabled"""
+    if _enabled:
+        REGISTRY.observe_bytes(name, size)
+
+
+def _size(args, kwargs) -> Optional[int]:
+    for argument in (*args, *kwargs.values()):
+        if hasattr(argument, "__len__"):
+            return len(argument)
+    return None
+
+
+def _quantile(latencies, quantile: float) -> float:
+    # nearest rank on the sorted latencies
+    if not latencies:
+        return math.nan
+    return latencies[min(len(latencies) - 1, int(quantile * len(latencies)))]
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    return repr(value)
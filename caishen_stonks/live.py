@@ -0,0 +1,360 @@
+"""Indicator state kept warm between the refreshes of the dashboard.
+
+The dashboard charts the prices of a ticker with indicator overlays and refreshes them every bar. Instead of
+recomputing the whole series in every callback, LiveHub keeps one LiveIndicators per ticker and set of indicator
+parameters, which advances the streaming indicators of the incremental module by the new bars only. Every open
+session holds a Subscription and polls it for a Delta with the points it has not seen yet, which is sent to the
+browser as an extendData patch instead of a whole figure. Sessions charting the same ticker with the same parameters
+share the state, and the indicators are only recomputed over the whole history when a session changes parameters.
+
+The last bar of a ticker may still be in progress, so a bar with the timestamp of the last one replaces it. The
+deltas then start with that point, see Delta.replaced, and are sent as the new values of the replaced points, see
+Delta.replace_data, followed by the extendData patch of the others.
+
+Example:
+    >>> from caishen_stonks.live import LiveHub
+    >>> from caishen_stonks.history import StockHistory
+    >>> hub = LiveHub()
+    >>> session = hub.subscribe("AAPL", [("SMA", {"lookback": 2})])
+    >>> hub.update(StockHistory("AAPL", [60, 120], [1.0, 2.0]))
+    >>> session.poll().traces
+    {'close': [1.0, 2.0], 'SMA(2)': [None, 1.5]}
+    >>> hub.update(StockHistory("AAPL", [180], [4.0]))
+    >>> delta = session.poll()
+    >>> delta.extend_data()
+    ({'x': [[180], [180]], 'y': [[4.0], [3.0]]}, [0, 1], None)
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import threading
+
+from .errors import InvalidInputError
+from .history import StockHistory
+from .incremental import (IncrementalBollingerBands, IncrementalEMA, IncrementalMACD, IncrementalRSI, IncrementalSMA,
+                          IncrementalSO)
+from .plan import IndicatorPlan
+
+# The default view of the dashboard: (technical_indicators function, its keyword arguments)
+DEFAULT_INDICATORS = (("SMA", {"lookback": 20}), ("bollinger_bands", {"lookback": 20}), ("EMA", {"lookback": 12}),
+                      ("EMA", {"lookback": 26}), ("MACD", {}), ("RSI", {}))
+
+# The streaming counterpart of every indicator and the names of its outputs, None for a single output
+_INCREMENTAL = {
+    "SMA": (IncrementalSMA, None),
+    "EMA": (IncrementalEMA, None),
+    "bollinger_bands": (IncrementalBollingerBands, ("lower", "middle", "upper")),
+    "MACD": (IncrementalMACD, ("MACD", "signal")),
+    "RSI": (IncrementalRSI, None),
+    "SO": (IncrementalSO, ("K", "D")),
+}
+
+# The price traces, in the order they precede the indicator traces
+_PRICES = ("open", "high", "low", "close")
+
+# Indicators as (name, sorted keyword arguments), which identify a LiveIndicators in a LiveHub
+_Indicators = Tuple[Tuple[str, Tuple[Tuple[str, Any], ...]], ...]
+
+
+class Delta:
+    """The points of a chart that a session has not seen yet.
+
+    Attributes:
+        start (int): The position of the first point of the delta in the whole series
+        replaced (int): The number of points at the start of the delta that the session has seen with other values,
+                        i.e. the last bar was still in progress. It is 0 if the delta only appends points.
+        x (List[int]): The timestamps of the points
+        traces (Dict[str, List[Optional[float]]]): The values of every trace, None during the warm-up
+    """
+
+    __slots__ = ("start", "replaced", "x", "traces")
+
+    def __init__(self, start: int, replaced: int, x: List[int], traces: Dict[str, List[Optional[float]]]):
+        self.start = start
+        self.replaced = replaced
+        self.x = x
+        self.traces = traces
+
+    def extend_data(self, names: Optional[Sequence[str]] = None,
+                    max_points: Optional[int] = None) -> Tuple[Dict[str, List[List[Any]]], List[int], Optional[int]]:
+        """Returns the points the delta appends as the value of the extendData property of a dash_core_components.Graph
+
+        The points the delta replaces are left out, they are returned by replace_data.
+
+        Args:
+            names (Sequence[str], optional): The traces in the order of the figure data. Defaults to the order of
+                                             "traces".
+            max_points (int, optional): The number of points the browser keeps per trace. Defaults to all.
+
+        Returns:
+            Tuple[Dict[str, List[List[Any]]], List[int], Optional[int]]: The new points of every trace, the indices
+            of the traces and "max_points"
+        """
+        data, indices = self._data(names, self.replaced, len(self.x))
+        return data, indices, max_points
+
+    def replace_data(self, names: Optional[Sequence[str]] = None) -> Tuple[Dict[str, List[List[Any]]], List[int], int]:
+        """Returns the new values of the points the delta replaces, i.e. of the bar that was still in progress
+
+        The browser holds those points already, as the last "replaced" points of every trace. They are overwritten
+        with these values, e.g. by a dash.Patch or a restyle of the traces, before extend_data appends the new ones.
+
+        Args:
+            names (Sequence[str], optional): The traces in the order of the figure data. Defaults to the order of
+                                             "traces".
+
+        Returns:
+            Tuple[Dict[str, List[List[Any]]], List[int], int]: The replaced points of every trace, the indices of the
+            traces and the number of points replaced at the end of every trace, 0 if there are none
+
+        Example:
+            >>> from caishen_stonks.live import LiveHub
+            >>> from caishen_stonks.history import StockHistory
+            >>> hub = LiveHub()
+            >>> session = hub.subscribe("AAPL", [("SMA", {"lookback": 2})])
+            >>> hub.update(StockHistory("AAPL", [60, 120], [1.0, 2.0]))
+            >>> _ = session.poll()
+            >>> hub.update(StockHistory("AAPL", [120, 180], [3.0, 4.0]))
+            >>> delta = session.poll()
+            >>> delta.replace_data()
+            ({'x': [[120], [120]], 'y': [[3.0], [2.0]]}, [0, 1], 1)
+            >>> delta.extend_data()
+            ({'x': [[180], [180]], 'y': [[4.0], [3.5]]}, [0, 1], None)
+        """
+        data, indices = self._data(names, 0, self.replaced)
+        return data, indices, self.replaced
+
+    def _data(self, names: Optional[Sequence[str]], first: int, last: int) -> Tuple[Dict[str, List[List[Any]]],
+                                                                                    List[int]]:
+        names = list(self.traces) if names is None else list(names)
+        x = self.x[first:last]
+        return {"x": [x for _ in names], "y": [self.traces[name][first:last] for name in names]}, list(range(len(names)))
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __repr__(self) -> str:
+        return f"Delta(start={self.start}, replaced={self.replaced}, {len(self)} points, traces={list(self.traces)})"
+
+
+class LiveIndicators:
+    """The bars of one ticker and the streaming state of its indicators.
+
+    Args:
+        symbol (str): The stock ticker
+        indicators (Sequence[Tuple[str, Dict[str, Any]]], optional): The indicators as (name of a technical_indicators
+            function, its keyword arguments). Defaults to DEFAULT_INDICATORS.
+
+    Raises:
+        InvalidInputError: An indicator has no streaming counterpart
+    """
+
+    __slots__ = ("symbol", "indicators", "version", "_states", "_names", "_timestamp", "_prices", "_traces",
+                 "_versions", "_before_last")
+
+    def __init__(self, symbol: str, indicators: Sequence[Tuple[str, Dict[str, Any]]] = DEFAULT_INDICATORS):
+        self.symbol = symbol
+        self.indicators = _normalize(indicators)
+        # increases with every update, the points of the series remember the version they last changed in
+        self.version = 0
+        self._states = [_INCREMENTAL[name][0](**dict(arguments)) for name, arguments in self.indicators]
+        self._names = _trace_names(self.indicators)
+        self._timestamp: List[int] = []
+        self._prices: Optional[Dict[str, List[float]]] = None
+        self._traces: Dict[str, List[Optional[float]]] = {}
+        self._versions: List[int] = []
+        # snapshots of the states before the last bar, to replace the last bar
+        self._before_last: Optional[List[Dict[str, Any]]] = None
+
+    def update(self, history: StockHistory) -> int:
+        """Advances the indicators by the bars of "history" that are not older than the last bar
+
+        Args:
+            history (StockHistory): The new bars, in ascending timestamp order. A bar with the timestamp of the last
+                                    bar replaces it, older bars are skipped.
+
+        Raises:
+            InvalidInputError: The history is of another ticker, or SO is computed without high and low prices
+
+        Returns:
+            int: The position of the first point that changed, the length of the series if none did
+        """
+        if history.symbol != self.symbol:
+            raise InvalidInputError("The bars of " + history.symbol + " can not update the indicators of "
+                                    + self.symbol)
+        if self._prices is None:
+            self._start(history)
+        columns = [(field, getattr(history, field)) for field in self._prices]
+        missing = [field for field, column in columns if column is None]
+        if missing:
+            raise InvalidInputError("The bars of " + self.symbol + " are missing the " + ", ".join(missing)
+                                    + " prices")
+
+        self.version += 1
+        first_changed = len(self._timestamp)
+        for position, timestamp in enumerate(history.timestamp):
+            if self._timestamp and timestamp <= self._timestamp[-1]:
+                if timestamp < self._timestamp[-1]:
+                    continue
+                # the states are back to the snapshot, which stays the one before the replacing bar
+                self._remove_last()
+            else:
+                self._before_last = [state.snapshot() for state in self._states]
+            self._append(timestamp, {field: column[position] for field, column in columns})
+            first_changed = min(first_changed, len(self._timestamp) - 1)
+        return first_changed
+
+    def reconfigured(self, indicators: Sequence[Tuple[str, Dict[str, Any]]]) -> "LiveIndicators":
+        """Returns the state of other indicators over the bars of this one, computed over the whole history"""
+        state = LiveIndicators(self.symbol, [(name, dict(arguments)) for name, arguments in _normalize(indicators)])
+        if self._prices is not None:
+            state.update(StockHistory(self.symbol, self._timestamp, **self._prices))
+        return state
+
+    def delta(self, cursor: int = 0, seen: int = 0) -> Delta:
+        """Returns the points that changed for a session
+
+        Args:
+            cursor (int, optional): The number of points the session has. Defaults to 0 for the whole series.
+            seen (int, optional): The version the session has seen. Defaults to 0.
+
+        Returns:
+            Delta: The points from "cursor" on, preceded by the last point the session has if it changed since
+        """
+        start = min(cursor, len(self._timestamp))
+        if start > 0 and self._versions[start - 1] > seen:
+            start -= 1
+        return Delta(start, cursor - start, self._timestamp[start:],
+                     {name: trace[start:] for name, trace in self._traces.items()})
+
+    def __len__(self) -> int:
+        return len(self._timestamp)
+
+    def __repr__(self) -> str:
+        return f"LiveIndicators({self.symbol!r}, {len(self)} bars, traces={list(self._traces)})"
+
+    def _start(self, history: StockHistory):
+        fields = [field for field in _PRICES if getattr(history, field) is not None]
+        if any(name == "SO" for name, _ in self.indicators):
+            fields = [field for field in _PRICES if field in fields or field in ("high", "low")]
+        self._prices = {field: [] for field in fields}
+        self._traces = {name: [] for name in fields + self._names}
+
+    def _append(self, timestamp: int, prices: Dict[str, float]):
+        self._timestamp.append(timestamp)
+        self._versions.append(self.version)
+        for field, price in prices.items():
+            self._prices[field].append(price)
+            self._traces[field].append(price)
+        points: List[Any] = []
+        for (name, _), state in zip(self.indicators, self._states):
+            if name == "SO":
+                output = state.update(prices["high"], prices["low"], prices["close"])
+            else:
+                output = state.update(prices["close"])
+            points.extend(output if isinstance(output, tuple) else (output,))
+        for name, point in zip(self._names, points):
+            # the -1 of the warm-up is a gap in the chart
+            self._traces[name].append(None if type(point) is int and point == -1 else point)
+
+    def _remove_last(self):
+        self._states = [type(state).from_snapshot(snapshot) for state, snapshot in zip(self._states, self._before_last)]
+        for series in [self._timestamp, self._versions] + list(self._prices.values()) + list(self._traces.values()):
+            series.pop()
+
+
+class Subscription:
+    """The view of one session on a LiveIndicators, created by LiveHub.subscribe"""
+
+    __slots__ = ("state", "cursor", "seen", "_lock")
+
+    def __init__(self, state: LiveIndicators, lock: threading.RLock):
+        self.state = state
+        self.cursor = 0
+        self.seen = 0
+        self._lock = lock
+
+    def poll(self) -> Delta:
+        """Returns the points the session has not seen yet, the whole series on the first poll"""
+        with self._lock:
+            delta = self.state.delta(self.cursor, self.seen)
+            self.cursor = len(self.state)
+            self.seen = self.state.version
+        return delta
+
+
+class LiveHub:
+    """The indicator states of all open sessions, shared by the sessions charting the same indicators of a ticker.
+
+    It is safe to use from the threads serving the dashboard callbacks.
+    """
+
+    def __init__(self):
+        self._states: Dict[Tuple[str, _Indicators], LiveIndicators] = {}
+        self._subscribers: Dict[Tuple[str, _Indicators], int] = {}
+        self._lock = threading.RLock()
+
+    def subscribe(self, symbol: str,
+                  indicators: Sequence[Tuple[str, Dict[str, Any]]] = DEFAULT_INDICATORS) -> Subscription:
+        """Opens a session charting "indicators" of a ticker. Its first poll returns the whole series."""
+        with self._lock:
+            return Subscription(self._acquire(symbol, _normalize(indicators)), self._lock)
+
+    def reconfigure(self, subscription: Subscription, indicators: Sequence[Tuple[str, Dict[str, Any]]]):
+        """Changes the indicators of a session, whose next poll returns the whole series"""
+        with self._lock:
+            indicators = _normalize(indicators)
+            if indicators == subscription.state.indicators:
+                return
+            state = self._acquire(subscription.state.symbol, indicators)
+            self.unsubscribe(subscription)
+            subscription.state = state
+            subscription.cursor = 0
+            subscription.seen = 0
+
+    def unsubscribe(self, subscription: Subscription):
+        """Closes a session. The state is dropped with its last session."""
+        with self._lock:
+            key = (subscription.state.symbol, subscription.state.indicators)
+            self._subscribers[key] -= 1
+            if not self._subscribers[key]:
+                del self._subscribers[key]
+                del self._states[key]
+
+    def update(self, history: StockHistory):
+        """Advances every state of the ticker of "history" by its new bars"""
+        with self._lock:
+            for (symbol, _), state in self._states.items():
+                if symbol == history.symbol:
+                    state.update(history)
+
+    def _acquire(self, symbol: str, indicators: _Indicators) -> LiveIndicators:
+        key = (symbol, indicators)
+        if key not in self._states:
+            # a state of other indicators of the ticker has its bars already
+            other = next((state for (other_symbol, _), state in self._states.items() if other_symbol == symbol), None)
+            arguments = [(name, dict(keywords)) for name, keywords in indicators]
+            self._states[key] = LiveIndicators(symbol, arguments) if other is None else other.reconfigured(arguments)
+        self._subscribers[key] = self._subscribers.get(key, 0) + 1
+        return self._states[key]
+
+
+def _normalize(indicators: Sequence[Tuple[str, Dict[str, Any]]]) -> _Indicators:
+    normalized = []
+    for name, arguments in indicators:
+        if name not in _INCREMENTAL:
+            raise InvalidInputError(name + " can not be computed incrementally. The indicators are "
+                                    + ", ".join(_INCREMENTAL))
+        normalized.append((name, tuple(sorted((key, tuple(value) if isinstance(value, list) else value)
+                                              for key, value in dict(arguments).items()))))
+    # an indicator listed twice is computed once
+    return tuple(dict.fromkeys(normalized))
+
+
+def _trace_names(indicators: _Indicators) -> List[str]:
+    # the indicators are named like by IndicatorPlan, e.g. bollinger_bands(20) lower
+    plan = IndicatorPlan()
+    names = []
+    for name, arguments in indicators:
+        base = getattr(plan, name)(**dict(arguments))
+        outputs = _INCREMENTAL[name][1]
+        names.extend([base] if outputs is None else [base + " " + output for output in outputs])
+    return names
@@ -0,0 +1,233 @@
+"""The standard indicator pack of the dashboard, computed in a single pass over the closing prices.
+
+The default view of a ticker shows SMA(20), bollinger_bands(20), EMA(12), EMA(26), MACD((12, 26), 9) and RSI(14).
+Computed one function at a time, the list implementations walk the prices about eight times and build intermediate
+lists of EMAs, gains and losses in between. indicator_pack advances the rolling state of all of them bar by bar
+instead: one compensated running sum and deviation for the SMA and the bands, the two EMAs, the MACD line and its
+signal EMA, and the running sums of the gains and losses.
+
+Every operation is the one the technical_indicators functions apply, in the same order, so the results are equal
+to theirs and not only close. The numpy kernels of array_backend are vectorised already, so arrays are computed by
+them one indicator at a time, sharing what the indicators have in common: the SMA is the middle band, and the MACD
+line is the difference of the two EMAs of the pack.
+"""
+from typing import Any, Dict, List
+import math
+
+from . import technical_indicators as TI
+from .errors import InvalidInputError
+from .instrumentation import instrumented
+from .rolling import _compensated_add
+
+# The lookbacks of the pack
+BAND_LOOKBACK = 20
+SHORT_LOOKBACK = 12
+LONG_LOOKBACK = 26
+SIGNAL_LOOKBACK = 9
+RSI_LOOKBACK = 14
+
+# The names of the results, like IndicatorPlan and the live dashboard name them
+PACK = (f"SMA({BAND_LOOKBACK})", f"bollinger_bands({BAND_LOOKBACK})", f"EMA({SHORT_LOOKBACK}, 2.0)",
+        f"EMA({LONG_LOOKBACK}, 2.0)", f"MACD(({SHORT_LOOKBACK}, {LONG_LOOKBACK}), {SIGNAL_LOOKBACK})",
+        f"RSI({RSI_LOOKBACK})")
+
+# Series shorter than this have no signal line value. Their results have other lengths than the series, or MACD
+# raises, so they are left to the individual functions
+_FUSED_MINIMUM = LONG_LOOKBACK + SIGNAL_LOOKBACK - 1
+
+
+@instrumented
+def indicator_pack(values: List[float]) -> Dict[str, Any]:
+    """Calculates the standard indicator pack over the closing prices "values"
+
+    Args:
+        values (List[float]): The closing prices
+                              A numpy.ndarray is computed by array_backend instead and returns ndarrays,
+                              with NaN instead of -1 for the warm-up elements
+
+    Raises:
+        TypeError: The values is expected to be a list
+        InvalidInputError: The list "values" must not be empty
+
+    Returns:
+        Dict[str, Any]: The result of every indicator of PACK, keyed by its name. Each result is equal to what the
+                        technical_indicators function returns for the same arguments
+
+    Example:
+        >>> from caishen_stonks.pack import indicator_pack
+        >>> from caishen_stonks import technical_indicators as TI
+        >>> values = [100.0 + (i * 37 % 101) / 7.0 for i in range(100)]
+        >>> results = indicator_pack(values)
+        >>> list(results)
+        ['SMA(20)', 'bollinger_bands(20)', 'EMA(12, 2.0)', 'EMA(26, 2.0)', 'MACD((12, 26), 9)', 'RSI(14)']
+        >>> results["MACD((12, 26), 9)"] == TI.MACD(values) and results["RSI(14)"] == TI.RSI(values, 14)
+        True
+    """
+    if not TI._is_sequence(values):
+        raise TypeError("The values is expected to be a list but it is " + str(values))
+    if len(values) == 0:
+        raise InvalidInputError("The length of the values list is 0. It should be at least 1")
+    if TI._is_array(values):
+        return _array_pack(values)
+    if len(values) < _FUSED_MINIMUM or not all(map(math.isfinite, values)):
+        # the fused sums never recover from a NaN or infinity, while the windowed indicators rebuild their windows
+        return _separate_pack(values)
+
+    length = len(values)
+    SMA = [-1] * length
+    lower_band = [-1] * length
+    middle_band = [-1] * length
+    upper_band = [-1] * length
+    short_term = [-1] * length
+    long_term = [-1] * length
+    MACD_values = [-1] * length
+    signal_values = [-1] * length
+    RSI = [-1] * length
+    gains = [0.0] * length
+    losses = [0.0] * length
+
+    # the compensated running sum and the squared deviations of the bands, as in rolling.rolling_mean_std
+    total = compensation = mean = squared_deviations = 0.0
+    # the compensated running sums of the gains and losses, as in rolling.rolling_sum. Adding or removing a gain or
+    # loss of 0.0 leaves a sum of non negative values unchanged, so only the non zero ones are accumulated
+    gain_total = gain_compensation = loss_total = loss_compensation = 0.0
+    short_multiplier = 2.0 / (1.0 * (1 + SHORT_LOOKBACK))
+    long_multiplier = 2.0 / (1.0 * (1 + LONG_LOOKBACK))
+    signal_multiplier = 2.0 / (1.0 * (1 + SIGNAL_LOOKBACK))
+    short_ema = long_ema = signal_ema = 0.0
+    previous = values[0]
+
+    # the warm-up, where every indicator starts at another bar
+    for i in range(_FUSED_MINIMUM):
+        value = values[i]
+
+        total, compensation = _compensated_add(total, compensation, value)
+        if i < BAND_LOOKBACK:
+            new_mean = (total + compensation) / (i + 1)
+            squared_deviations += (value - mean) * (value - new_mean)
+        else:
+            outgoing = values[i - BAND_LOOKBACK]
+            total, compensation = _compensated_add(total, compensation, -outgoing)
+            new_mean = (total + compensation) / BAND_LOOKBACK
+            squared_deviations += (value - outgoing) * (value - new_mean + outgoing - mean)
+        mean = new_mean
+        if i >= BAND_LOOKBACK - 1:
+            stdev = math.sqrt(max(squared_deviations, 0.0) / BAND_LOOKBACK)
+            SMA[i] = (total + compensation) / (1.0 * BAND_LOOKBACK)
+            middle_band[i] = mean
+            upper_band[i] = mean + 2 * stdev
+            lower_band[i] = mean - 2 * stdev
+
+        # the EMAs are seeded with the average of their first values like technical_indicators.EMA
+        if i == SHORT_LOOKBACK - 1:
+            short_ema = sum(values[:SHORT_LOOKBACK]) / (1.0 * SHORT_LOOKBACK)
+            short_term[i] = short_ema
+        elif i >= SHORT_LOOKBACK:
+            short_ema = value * short_multiplier + short_ema * (1 - short_multiplier)
+            short_term[i] = short_ema
+        if i == LONG_LOOKBACK - 1:
+            long_ema = sum(values[:LONG_LOOKBACK]) / (1.0 * LONG_LOOKBACK)
+            long_term[i] = long_ema
+        elif i >= LONG_LOOKBACK:
+            long_ema = value * long_multiplier + long_ema * (1 - long_multiplier)
+            long_term[i] = long_ema
+        if i >= LONG_LOOKBACK - 1:
+            MACD_values[i] = short_ema - long_ema if long_ema != -1 else -1
+        # the signal line is the EMA of the MACD values from the first one on
+        if i == _FUSED_MINIMUM - 1:
+            signal_ema = sum(MACD_values[LONG_LOOKBACK - 1:_FUSED_MINIMUM]) / (1.0 * SIGNAL_LOOKBACK)
+            signal_values[i] = signal_ema
+
+        change = value - previous
+        previous = value
+        if change >= 0:
+            gains[i] = gain = change
+            if gain != 0.0:
+                gain_total, gain_compensation = _compensated_add(gain_total, gain_compensation, gain)
+        else:
+            losses[i] = loss = abs(change)
+            loss_total, loss_compensation = _compensated_add(loss_total, loss_compensation, loss)
+        if i >= RSI_LOOKBACK:
+            removed = -gains[i - RSI_LOOKBACK]
+            if removed:
+                gain_total, gain_compensation = _compensated_add(gain_total, gain_compensation, removed)
+            removed = -losses[i - RSI_LOOKBACK]
+            if removed:
+                loss_total, loss_compensation = _compensated_add(loss_total, loss_compensation, removed)
+        if i >= RSI_LOOKBACK - 1:
+            average_gain = (gain_total + gain_compensation) / (1.0 * RSI_LOOKBACK)
+            average_loss = (loss_total + loss_compensation) / (1.0 * RSI_LOOKBACK)
+            RSI[i] = 0.0 if average_loss == 0 else 100 - 100 / (1 + average_gain / average_loss)
+
+    # every indicator is past its warm-up, so each bar takes the same steps
+    for i in range(_FUSED_MINIMUM, length):
+        value = values[i]
+
+        # SMA and bollinger bands
+        total, compensation = _compensated_add(total, compensation, value)
+        outgoing = values[i - BAND_LOOKBACK]
+        total, compensation = _compensated_add(total, compensation, -outgoing)
+        new_mean = (total + compensation) / BAND_LOOKBACK
+        squared_deviations += (value - outgoing) * (value - new_mean + outgoing - mean)
+        mean = new_mean
+        stdev = math.sqrt(max(squared_deviations, 0.0) / BAND_LOOKBACK)
+        SMA[i] = (total + compensation) / (1.0 * BAND_LOOKBACK)
+        middle_band[i] = mean
+        upper_band[i] = mean + 2 * stdev
+        lower_band[i] = mean - 2 * stdev
+
+        # EMAs, MACD line and signal line
+        short_ema = value * short_multiplier + short_ema * (1 - short_multiplier)
+        short_term[i] = short_ema
+        long_ema = value * long_multiplier + long_ema * (1 - long_multiplier)
+        long_term[i] = long_ema
+        MACD_value = short_ema - long_ema if long_ema != -1 else -1
+        MACD_values[i] = MACD_value
+        signal_ema = MACD_value * signal_multiplier + signal_ema * (1 - signal_multiplier)
+        signal_values[i] = signal_ema
+
+        # RSI from the average gains and losses
+        change = value - previous
+        previous = value
+        if change >= 0:
+            gains[i] = gain = change
+            if gain != 0.0:
+                gain_total, gain_compensation = _compensated_add(gain_total, gain_compensation, gain)
+        else:
+            losses[i] = loss = abs(change)
+            loss_total, loss_compensation = _compensated_add(loss_total, loss_compensation, loss)
+        removed = -gains[i - RSI_LOOKBACK]
+        if removed:
+            gain_total, gain_compensation = _compensated_add(gain_total, gain_compensation, removed)
+        removed = -losses[i - RSI_LOOKBACK]
+        if removed:
+            loss_total, loss_compensation = _compensated_add(loss_total, loss_compensation, removed)
+        average_gain = (gain_total + gain_compensation) / (1.0 * RSI_LOOKBACK)
+        average_loss = (loss_total + loss_compensation) / (1.0 * RSI_LOOKBACK)
+        RSI[i] = 0.0 if average_loss == 0 else 100 - 100 / (1 + average_gain / average_loss)
+
+    return dict(zip(PACK, (SMA, (lower_band, middle_band, upper_band), short_term, long_term,
+                           (MACD_values, signal_values), RSI)))
+
+
+def _array_pack(values) -> Dict[str, Any]:
+    backend = TI.array_backend
+    values = backend._as_series(values)
+    lower_band, middle_band, upper_band = backend._bollinger_bands(values, BAND_LOOKBACK)
+    short_term = backend._EMA(values, SHORT_LOOKBACK, 2.0)
+    long_term = backend._EMA(values, LONG_LOOKBACK, 2.0)
+    MACD_values = backend._MACD_line(short_term, long_term)
+    signal_values = backend._signal_line(MACD_values, LONG_LOOKBACK, SIGNAL_LOOKBACK, 2.0)
+    RSI = backend._RSI(values, RSI_LOOKBACK)
+    # the SMA is computed exactly like the middle band
+    return dict(zip(PACK, (middle_band.copy(), (lower_band, middle_band, upper_band), short_term, long_term,
+                           (MACD_values, signal_values), RSI)))
+
+
+def _separate_pack(values: List[float]) -> Dict[str, Any]:
+    # the undecorated functions, so the call is only recorded as indicator_pack
+    return dict(zip(PACK, (TI._SMA(values, BAND_LOOKBACK), TI.bollinger_bands.__wrapped__(values, BAND_LOOKBACK),
+                           TI._EMA(values, SHORT_LOOKBACK), TI._EMA(values, LONG_LOOKBACK),
+                           TI.MACD.__wrapped__(values, (SHORT_LOOKBACK, LONG_LOOKBACK),
+                                               signal_lookback=SIGNAL_LOOKBACK),
+                           TI.RSI.__wrapped__(values, RSI_LOOKBACK))))
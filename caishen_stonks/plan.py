@@ -0,0 +1,155 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from . import technical_indicators as TI
+from .errors import InvalidInputError
+
+# Inputs of a plan, which every other node is derived from
+_VALUES = ("values",)
+_HIGH_VALUES = ("high_values",)
+_LOW_VALUES = ("low_values",)
+
+
+class IndicatorPlan:
+    """Computes a set of indicators over the same series, evaluating every shared sub-computation once.
+
+    Declare the indicators with the methods named after the technical_indicators functions. Each of them returns the
+    name under which its result is reported by evaluate. The indicators are broken down into the intermediate
+    results they are built from: EMAs, rolling means and deviations, price changes and average gains and losses.
+    Identical intermediates are merged, so e.g. MACD((12, 26)) and EMA(12) compute the EMA12 once, and SMA(20) is
+    read from the middle band of bollinger_bands(20).
+
+    Every result is equal to what the technical_indicators function returns for the same arguments. Lists and numpy
+    arrays are both supported, like in technical_indicators.
+
+    Example:
+        >>> from caishen_stonks.plan import IndicatorPlan
+        >>> plan = IndicatorPlan()
+        >>> plan.SMA(2)
+        'SMA(2)'
+        >>> plan.bollinger_bands(2)
+        'bollinger_bands(2)'
+        >>> results = plan.evaluate([1.0, 2.0, 3.0, 4.0, 5.0])
+        >>> results["SMA(2)"]
+        [-1, 1.5, 2.5, 3.5, 4.5]
+        >>> len(plan.nodes)
+        2
+    """
+
+    def __init__(self):
+        # node key -> (function computing the node from its dependencies, keys of the dependencies)
+        self._nodes: Dict[Tuple, Tuple[Callable[..., Any], Tuple[Tuple, ...]]] = {}
+        # declared name -> key of the node holding its result
+        self._outputs: Dict[str, Tuple] = {}
+
+    @property
+    def nodes(self) -> List[Tuple]:
+        """The keys of the distinct computations the plan evaluates"""
+        return list(self._nodes)
+
+    def SMA(self, lookback: int = 14, name: Optional[str] = None) -> str:
+        """Declares technical_indicators.SMA(values, lookback) and returns the name of its result"""
+        return self._declare(name or f"SMA({lookback})", self._SMA(_VALUES, lookback))
+
+    def EMA(self, lookback: int = 12, smoothing: float = 2.0, name: Optional[str] = None) -> str:
+        """Declares technical_indicators.EMA(values, lookback, smoothing) and returns the name of its result"""
+        return self._declare(name or f"EMA({lookback}, {smoothing})", self._EMA(_VALUES, lookback, smoothing))
+
+    def bollinger_bands(self, lookback: int = 20, name: Optional[str] = None) -> str:
+        """Declares technical_indicators.bollinger_bands(values, lookback) and returns the name of its result"""
+        return self._declare(name or f"bollinger_bands({lookback})", self._bollinger_bands(_VALUES, lookback))
+
+    def MACD(self, MACD_lookback: Tuple[int, int] = (12, 26), MACD_smoothing: Tuple[float, float] = (2.0, 2.0),
+             signal_lookback: int = 9, signal_smoothing: float = 2.0, name: Optional[str] = None) -> str:
+        """Declares technical_indicators.MACD(values, ...) and returns the name of its result"""
+        short_term = self._EMA(_VALUES, MACD_lookback[0], MACD_smoothing[0])
+        long_term = self._EMA(_VALUES, MACD_lookback[1], MACD_smoothing[1])
+        MACD_line = self._add(("MACD_line", short_term, long_term), TI._MACD_line, short_term, long_term)
+        signal_line = self._add(("signal_line", MACD_line, MACD_lookback[1], signal_lookback, signal_smoothing),
+                                lambda MACD_values: TI._signal_line(MACD_values, MACD_lookback[1], signal_lookback,
+                                                                    signal_smoothing),
+                                MACD_line)
+        key = self._add(("MACD", MACD_line, signal_line), lambda *lines: lines, MACD_line, signal_line)
+        return self._declare(name or f"MACD({tuple(MACD_lookback)}, {signal_lookback})", key)
+
+    def RSI(self, lookback: int = 14, name: Optional[str] = None) -> str:
+        """Declares technical_indicators.RSI(values, lookback) and returns the name of its result"""
+        changes = self._add(("gains_losses", _VALUES), TI._gains_losses, _VALUES)
+        gain = self._add(("gain", changes), lambda gains_losses: gains_losses[0], changes)
+        loss = self._add(("loss", changes), lambda gains_losses: gains_losses[1], changes)
+        key = self._add(("RSI", lookback), TI._RSI_from_averages, self._SMA(gain, lookback),
+                        self._SMA(loss, lookback))
+        return self._declare(name or f"RSI({lookback})", key)
+
+    def SO(self, K_lookback: int = 5, D_lookback: int = 3, name: Optional[str] = None) -> str:
+        """Declares technical_indicators.SO(high_values, low_values, values, ...) and returns the name of its result
+
+        The high and low values have to be passed to evaluate
+        """
+        key = self._add(("SO", K_lookback, D_lookback),
+                        lambda high_values, low_values, values: TI.SO(high_values, low_values, values, K_lookback,
+                                                                      D_lookback),
+                        _HIGH_VALUES, _LOW_VALUES, _VALUES)
+        return self._declare(name or f"SO({K_lookback}, {D_lookback})", key)
+
+    def evaluate(self, values: List[float], high_values: Optional[List[float]] = None,
+                 low_values: Optional[List[float]] = None) -> Dict[str, Any]:
+        """Computes every declared indicator over "values"
+
+        Args:
+            values (List[float]): The closing prices, as a list or a numpy.ndarray
+            high_values (List[float], optional): The high prices, needed by SO
+            low_values (List[float], optional): The low prices, needed by SO
+
+        Raises:
+            InvalidInputError: SO was declared without passing high and low values
+
+        Returns:
+            Dict[str, Any]: The result of every declared indicator, keyed by the name returned when declaring it
+        """
+        results: Dict[Tuple, Any] = {_VALUES: values, _HIGH_VALUES: high_values, _LOW_VALUES: low_values}
+        return {name: self._resolve(key, results) for name, key in self._outputs.items()}
+
+    def _resolve(self, key: Tuple, results: Dict[Tuple, Any]) -> Any:
+        # every node is computed the first time it is needed and then reused
+        if key not in results:
+            function, dependencies = self._nodes[key]
+            arguments = [self._resolve(dependency, results) for dependency in dependencies]
+            if any(argument is None for argument in arguments):
+                raise InvalidInputError("The high and low values are required to evaluate " + str(key[0]))
+            results[key] = function(*arguments)
+        return results[key]
+
+    def _SMA(self, source: Tuple, lookback: int) -> Tuple:
+        bands = ("bollinger_bands", source, lookback)
+        if bands in self._nodes:
+            # the middle band is computed exactly like the SMA
+            return self._add(("SMA", source, lookback), lambda bands: _copy(bands[1]), bands)
+        return self._add(("SMA", source, lookback), lambda values: TI.SMA(values, lookback), source)
+
+    def _EMA(self, source: Tuple, lookback: int, smoothing: float) -> Tuple:
+        return self._add(("EMA", source, lookback, smoothing), lambda values: TI.EMA(values, lookback, smoothing),
+                         source)
+
+    def _bollinger_bands(self, source: Tuple, lookback: int) -> Tuple:
+        key = self._add(("bollinger_bands", source, lookback),
+                        lambda values: TI.bollinger_bands(values, lookback), source)
+        sma = ("SMA", source, lookback)
+        if sma in self._nodes:
+            # an SMA declared earlier can now be read from the bands
+            self._nodes[sma] = (lambda bands: _copy(bands[1]), (key,))
+        return key
+
+    def _add(self, key: Tuple, function: Callable[..., Any], *dependencies: Tuple) -> Tuple:
+        if key not in self._nodes:
+            self._nodes[key] = (function, dependencies)
+        return key
+
+    def _declare(self, name: str, key: Tuple) -> str:
+        if name in self._outputs and self._outputs[name] != key:
+            raise InvalidInputError("An indicator named " + name + " is already declared")
+        self._outputs[name] = key
+        return name
+
+
+def _copy(values: Any) -> Any:
+    # results are returned to the caller separately, so an intermediate shared by two of them is copied
+    return values.copy() if hasattr(values, "copy") else list(values)
@@ -0,0 +1,230 @@
+"""Aggregation of stock bars into a coarser StockInterval, without fetching them again.
+
+A coarse bar takes the open of its first source bar, the highest high, the lowest low, the close of its last source
+bar and the total volume. Missing (NaN) values are skipped. The columns that the source bars lack are lacking in the
+coarse bars too.
+
+The bars are grouped by their time in the time zone of the exchange, given as its offset from UTC in seconds:
+
+- fiveMinute and fifteenMinute bars start at multiples of their length on the clock, e.g. 9:30, 9:45 and 10:00, and
+  are labelled with that start time
+- oneDay bars hold the bars of one local calendar day, i.e. one trading session, and are labelled with the timestamp
+  of their first bar, the session open, like the daily bars of the API
+- oneWeek bars hold the days from Monday to Sunday and oneMonth bars the days of a calendar month, labelled with the
+  timestamp of their first bar as well
+
+Since the buckets follow the local time, no coarse bar spans the boundary between two sessions.
+
+Resampler aggregates incrementally: new source bars only update the last coarse bar or append new ones.
+"""
+from array import array
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+import math
+
+from .constants import INTERVAL_SECONDS, StockInterval
+from .errors import InvalidInputError
+from .history import FIELDS, StockHistory
+
+_DAY = 24 * 60 * 60
+_EPOCH = date(1970, 1, 1).toordinal()
+_INTRADAY = (StockInterval.oneMinute, StockInterval.fiveMinute, StockInterval.fifteenMinute)
+
+# Folds a source value into the aggregated value of a coarse bar, either of them may be NaN
+_FOLDS: Dict[str, Callable[[float, float], float]] = {
+    "open": lambda aggregate, value: value if aggregate != aggregate else aggregate,
+    "high": lambda aggregate, value: value if aggregate != aggregate or value > aggregate else aggregate,
+    "low": lambda aggregate, value: value if aggregate != aggregate or value < aggregate else aggregate,
+    "close": lambda aggregate, value: aggregate if value != value else value,
+    "volume": lambda aggregate, value: aggregate if value != value else value if aggregate != aggregate
+    else aggregate + value,
+}
+
+
+def can_resample(source: StockInterval, target: StockInterval) -> bool:
+    """Returns whether bars of the "source" interval can be aggregated into bars of the "target" interval
+
+    Example:
+        >>> from caishen_stonks.resample import can_resample
+        >>> from caishen_stonks.constants import StockInterval
+        >>> can_resample(StockInterval.fiveMinute, StockInterval.fifteenMinute)
+        True
+        >>> can_resample(StockInterval.oneWeek, StockInterval.oneMonth)
+        False
+    """
+    if source == target or INTERVAL_SECONDS[source] > INTERVAL_SECONDS[target]:
+        return False
+    if target in _INTRADAY:
+        return INTERVAL_SECONDS[target] % INTERVAL_SECONDS[source] == 0
+    if target == StockInterval.oneDay:
+        return source in _INTRADAY
+    # weeks do not fit into months
+    return target == StockInterval.oneWeek or source != StockInterval.oneWeek
+
+
+def resample(history: StockHistory, source: StockInterval, target: StockInterval,
+             utc_offset: int = 0) -> StockHistory:
+    """Aggregates the bars of a history into a coarser interval
+
+    Args:
+        history (StockHistory): The bars, in ascending timestamp order
+        source (StockInterval): The interval of the bars
+        target (StockInterval): The coarser interval to aggregate to
+        utc_offset (int, optional): The offset of the local time of the exchange from UTC in seconds, e.g.
+                                    -4 * 60 * 60 for New York in summer. Defaults to 0.
+
+    Raises:
+        InvalidInputError: The source interval can not be aggregated into the target interval
+
+    Returns:
+        StockHistory: The coarse bars
+
+    Example:
+        >>> from caishen_stonks.history import StockHistory
+        >>> from caishen_stonks.resample import resample
+        >>> from caishen_stonks.constants import StockInterval
+        >>> minutes = StockHistory("AAPL", [0, 60, 120, 300, 360], [1.0, 3.0, 2.0, 4.0, 5.0],
+        ...                        volume=[10.0, 20.0, 30.0, 40.0, 50.0])
+        >>> bars = resample(minutes, StockInterval.oneMinute, StockInterval.fiveMinute)
+        >>> bars.timestamp.tolist(), bars.close.tolist(), bars.volume.tolist()
+        ([0, 300], [2.0, 5.0], [60.0, 90.0])
+    """
+    return Resampler(history.symbol, source, target, utc_offset).update(history)
+
+
+class Resampler:
+    """Incremental aggregation of the bars of one ticker into a coarser interval.
+
+    The source bars of the last coarse bar are kept, so update can take new bars as well as new values of bars it
+    has seen, e.g. a bar that was still in progress. Only bars of the last coarse bar and later ones are aggregated,
+    earlier ones are skipped as their coarse bars are complete.
+
+    Args:
+        symbol (str): The stock ticker
+        source (StockInterval): The interval of the source bars
+        target (StockInterval): The coarser interval to aggregate to
+        utc_offset (int, optional): The offset of the local time of the exchange from UTC in seconds. Defaults to 0.
+
+    Raises:
+        InvalidInputError: The source interval can not be aggregated into the target interval
+
+    Example:
+        >>> from caishen_stonks.history import StockHistory
+        >>> from caishen_stonks.resample import Resampler
+        >>> from caishen_stonks.constants import StockInterval
+        >>> resampler = Resampler("AAPL", StockInterval.oneMinute, StockInterval.fiveMinute)
+        >>> resampler.update(StockHistory("AAPL", [0, 60], [1.0, 2.0])).close.tolist()
+        [2.0]
+        >>> changed = resampler.update(StockHistory("AAPL", [60, 120, 300], [1.5, 3.0, 4.0]))
+        >>> changed.timestamp.tolist(), changed.close.tolist()
+        ([0, 300], [3.0, 4.0])
+        >>> resampler.history().close.tolist()
+        [3.0, 4.0]
+    """
+
+    __slots__ = ("symbol", "source", "target", "utc_offset", "_fields", "_timestamp", "_columns", "_key", "_bucket")
+
+    def __init__(self, symbol: str, source: StockInterval, target: StockInterval, utc_offset: int = 0):
+        if not isinstance(source, StockInterval) or not isinstance(target, StockInterval):
+            raise TypeError("Invalid interval type. Please use StockInterval class")
+        if not can_resample(source, target):
+            raise InvalidInputError(source.value + " bars can not be resampled to " + target.value + " bars")
+        self.symbol = symbol
+        self.source = source
+        self.target = target
+        self.utc_offset = utc_offset
+        self._fields: Optional[List[str]] = None
+        self._timestamp = array("q")
+        self._columns: Dict[str, array] = {}
+        # key of the last coarse bar and its source bars as (timestamp, values of the fields)
+        self._key: Optional[int] = None
+        self._bucket: List[Tuple[int, Tuple[float, ...]]] = []
+
+    def update(self, history: StockHistory) -> StockHistory:
+        """Aggregates source bars
+
+        Args:
+            history (StockHistory): New source bars, in ascending timestamp order. Bars that were passed before are
+                                    taken with their new values if they belong to the last coarse bar.
+
+        Raises:
+            InvalidInputError: The history is of another ticker
+
+        Returns:
+            StockHistory: The coarse bars that changed, i.e. the last one before the update and the new ones
+        """
+        if history.symbol != self.symbol:
+            raise InvalidInputError("The history of " + history.symbol + " can not be resampled with the bars of "
+                                    + self.symbol)
+        if self._fields is None:
+            self._fields = [field for field in FIELDS if getattr(history, field) is not None]
+            self._columns = {field: array("d") for field in self._fields}
+        columns = [getattr(history, field) for field in self._fields]
+        nan_column = [math.nan] * len(history)
+        columns = [nan_column if column is None else column for column in columns]
+
+        first_changed = len(self._timestamp)
+        for position, timestamp in enumerate(history.timestamp):
+            key = self._bucket_key(timestamp)
+            if self._key is not None and key < self._key:
+                continue
+            values = tuple(column[position] for column in columns)
+            if key != self._key:
+                self._key = key
+                self._bucket = [(timestamp, values)]
+                self._timestamp.append(key if self.target in _INTRADAY else timestamp)
+                for field in self._fields:
+                    self._columns[field].append(math.nan)
+                self._fold(values)
+            elif timestamp > self._bucket[-1][0]:
+                self._bucket.append((timestamp, values))
+                self._fold(values)
+            else:
+                # a bar seen before, or a late one, changes the last coarse bar, which is aggregated again
+                self._bucket = [bar for bar in self._bucket if bar[0] != timestamp] + [(timestamp, values)]
+                self._bucket.sort(key=lambda bar: bar[0])
+                self._reaggregate()
+            first_changed = min(first_changed, len(self._timestamp) - 1)
+        return self._slice(first_changed)
+
+    def history(self) -> StockHistory:
+        """Returns all coarse bars aggregated so far, the last one may still change"""
+        return self._slice(0)
+
+    @property
+    def resume_timestamp(self) -> Optional[int]:
+        """The timestamp of the first source bar of the last coarse bar, from which on the source bars have to be
+        passed to update to take changes into account, None before the first update"""
+        return self._bucket[0][0] if self._bucket else None
+
+    def _bucket_key(self, timestamp: int) -> int:
+        local = timestamp + self.utc_offset
+        if self.target in _INTRADAY:
+            width = INTERVAL_SECONDS[self.target]
+            return local // width * width - self.utc_offset
+        day = local // _DAY
+        if self.target == StockInterval.oneDay:
+            return day
+        if self.target == StockInterval.oneWeek:
+            # 1970-01-01 was a Thursday, so the weeks start on Mondays
+            return (day + 3) // 7
+        month = date.fromordinal(_EPOCH + day)
+        return month.year * 12 + month.month - 1
+
+    def _fold(self, values: Tuple[float, ...]):
+        for field, value in zip(self._fields, values):
+            column = self._columns[field]
+            column[-1] = _FOLDS[field](column[-1], value)
+
+    def _reaggregate(self):
+        if self.target not in _INTRADAY:
+            self._timestamp[-1] = self._bucket[0][0]
+        for field in self._fields:
+            self._columns[field][-1] = math.nan
+        for _, values in self._bucket:
+            self._fold(values)
+
+    def _slice(self, first: int) -> StockHistory:
+        # copies, as the arrays can not grow while a view of them is exported
+        return StockHistory(self.symbol, self._timestamp[first:],
+                            **{field: column[first:] for field, column in self._columns.items()})
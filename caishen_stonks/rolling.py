@@ -0,0 +1,391 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+import math
+import operator
+
+
+def rolling_sum(values: Sequence[float], window: int) -> Iterator[float]:
+    """Yields the sum of every complete window of "values" in a single pass.
+
+    A running sum is kept instead of re-summing every slice, so the whole series is processed in O(n).
+    Values entering and leaving the window are accumulated with Neumaier's compensated summation, which keeps the
+    running sum from drifting on long series. Once a NaN or infinity has entered the running sum, the sum is rebuilt
+    from the window at every step, so only the windows containing the value are affected by it.
+
+    Args:
+        values (Sequence[float]): The values to sum over
+        window (int): The number of values in each window
+
+    Raises:
+        ValueError: The window has to be a positive integer
+
+    Yields:
+        float: The sum of the window ending at each value, starting with the first complete window.
+               The i-th yielded value is the sum of values[i:i + window]
+
+    Example:
+        >>> from caishen_stonks.rolling import rolling_sum
+        >>> list(rolling_sum([1.0, 2.0, 3.0, 4.0], 3))
+        [6.0, 9.0]
+    """
+    if window < 1:
+        raise ValueError("The window has to be a positive integer, but it is set to " + str(window))
+
+    total, compensation = _window_sum(values[:window])
+    if len(values) < window:
+        return
+    yield total + compensation
+
+    for i in range(window, len(values)):
+        # add the incoming value
+        value = values[i]
+        new_total = total + value
+        if abs(total) >= abs(value):
+            compensation += (total - new_total) + value
+        else:
+            compensation += (value - new_total) + total
+        total = new_total
+        # remove the outgoing value
+        value = -values[i - window]
+        new_total = total + value
+        if abs(total) >= abs(value):
+            compensation += (total - new_total) + value
+        else:
+            compensation += (value - new_total) + total
+        total = new_total
+        if total - total != 0.0:
+            # a NaN or infinity entered the window at some point, which a running sum never recovers from
+            total, compensation = _window_sum(values[i - window + 1:i + 1])
+        yield total + compensation
+
+
+def rolling_mean_std(values: Sequence[float], window: int) -> Iterator[Tuple[float, float]]:
+    """Yields the mean and the population standard deviation of every complete window of "values" in a single pass.
+
+    The mean comes from the same compensated running sum as rolling_sum, so it is identical to the SMA of the
+    window. The sum of squared deviations is updated Welford-style as values enter and leave the window, which avoids
+    both re-scanning every slice and the cancellation of the naive sum-of-squares formula. Like in rolling_sum, only
+    the windows containing a NaN or infinity are affected by it.
+
+    Args:
+        values (Sequence[float]): The values to average
+        window (int): The number of values in each window
+
+    Raises:
+        ValueError: The window has to be a positive integer
+
+    Yields:
+        Tuple[float, float]: The mean and population standard deviation of values[i:i + window],
+                             starting with the first complete window
+
+    Example:
+        >>> from caishen_stonks.rolling import rolling_mean_std
+        >>> list(rolling_mean_std([1.0, 2.0, 3.0, 4.0], 2))
+        [(1.5, 0.5), (2.5, 0.5), (3.5, 0.5)]
+    """
+    if window < 1:
+        raise ValueError("The window has to be a positive integer, but it is set to " + str(window))
+
+    total, compensation, mean, squared_deviations = _window_moments(values[:window])
+    if len(values) < window:
+        return
+    yield mean, math.sqrt(max(squared_deviations, 0.0) / window)
+
+    for i in range(window, len(values)):
+        incoming = values[i]
+        outgoing = values[i - window]
+        # add the incoming value
+        new_total = total + incoming
+        if abs(total) >= abs(incoming):
+            compensation += (total - new_total) + incoming
+        else:
+            compensation += (incoming - new_total) + total
+        total = new_total
+        # remove the outgoing value
+        value = -outgoing
+        new_total = total + value
+        if abs(total) >= abs(value):
+            compensation += (total - new_total) + value
+        else:
+            compensation += (value - new_total) + total
+        total = new_total
+        new_mean = (total + compensation) / window
+        squared_deviations += (incoming - outgoing) * (incoming - new_mean + outgoing - mean)
+        mean = new_mean
+        if total - total != 0.0:
+            total, compensation, mean, squared_deviations = _window_moments(values[i - window + 1:i + 1])
+        yield mean, math.sqrt(max(squared_deviations, 0.0) / window)
+
+
+def rolling_max(values: Sequence[float], window: int) -> Iterator[float]:
+    """Yields the largest value of every complete window of "values", e.g. the highest high of a Donchian channel.
+
+    The candidates for the maximum are kept in a monotonic deque, so each value is pushed and popped at most once and
+    the whole series is processed in amortised O(1) per value. The windows containing a NaN yield NaN.
+
+    Args:
+        values (Sequence[float]): The values to scan
+        window (int): The number of values in each window
+
+    Raises:
+        ValueError: The window has to be a positive integer
+
+    Yields:
+        float: The maximum of values[i:i + window], starting with the first complete window
+
+    Example:
+        >>> from caishen_stonks.rolling import rolling_max
+        >>> list(rolling_max([1.0, 3.0, 2.0, 1.0, 0.0], 2))
+        [3.0, 3.0, 2.0, 1.0]
+    """
+    return _rolling_extremum(values, window, operator.ge)
+
+
+def rolling_min(values: Sequence[float], window: int) -> Iterator[float]:
+    """Yields the smallest value of every complete window of "values", e.g. the lowest low of a Donchian channel.
+
+    Works like rolling_max with the ordering reversed.
+
+    Args:
+        values (Sequence[float]): The values to scan
+        window (int): The number of values in each window
+
+    Raises:
+        ValueError: The window has to be a positive integer
+
+    Yields:
+        float: The minimum of values[i:i + window], starting with the first complete window
+
+    Example:
+        >>> from caishen_stonks.rolling import rolling_min
+        >>> list(rolling_min([1.0, 3.0, 2.0, 1.0, 0.0], 2))
+        [1.0, 2.0, 1.0, 0.0]
+    """
+    return _rolling_extremum(values, window, operator.le)
+
+
+def _rolling_extremum(values: Sequence[float], window: int,
+                      dominates: Callable[[float, float], bool]) -> Iterator[float]:
+    if window < 1:
+        raise ValueError("The window has to be a positive integer, but it is set to " + str(window))
+
+    # indices whose values are candidates for the extremum, in the order they arrived. The values behind them are
+    # monotonic, so the current extremum is always at the front. A NaN dominates every value, so it is the extremum of
+    # the windows containing it, like in the max of a slice starting with it
+    candidates: Deque[int] = deque()
+    for i, value in enumerate(values):
+        while candidates and (value != value or dominates(value, values[candidates[-1]])):
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1:
+            yield values[candidates[0]]
+
+
+class RollingSum:
+    """Keeps the compensated sum of the last "window" values pushed into it.
+
+    This is the streaming counterpart of rolling_sum. The same operations are applied in the same order, so pushing a
+    series value by value produces exactly the sums rolling_sum yields for it.
+
+    Args:
+        window (int): The number of values in the window
+
+    Raises:
+        ValueError: The window has to be a positive integer
+
+    Example:
+        >>> from caishen_stonks.rolling import RollingSum
+        >>> rolling = RollingSum(3)
+        >>> [rolling.push(value) for value in [1.0, 2.0, 3.0, 4.0]]
+        [None, None, 6.0, 9.0]
+    """
+    __slots__ = ("window", "_values", "_total", "_compensation")
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("The window has to be a positive integer, but it is set to " + str(window))
+        self.window = window
+        self._values: Deque[float] = deque()
+        self._total = 0.0
+        self._compensation = 0.0
+
+    def push(self, value: float) -> Optional[float]:
+        """Adds a value to the window and returns the sum of the window, or None until the window is complete"""
+        self._total, self._compensation = _compensated_add(self._total, self._compensation, value)
+        self._values.append(value)
+        if len(self._values) > self.window:
+            self._total, self._compensation = _compensated_add(self._total, self._compensation,
+                                                               -self._values.popleft())
+            if self._total - self._total != 0.0:
+                self._total, self._compensation = _window_sum(self._values)
+        if len(self._values) < self.window:
+            return None
+        return self._total + self._compensation
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state of the window as a dictionary of plain Python values"""
+        return {"window": self.window, "values": list(self._values), "total": self._total,
+                "compensation": self._compensation}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "RollingSum":
+        """Rebuilds a window from the dictionary returned by snapshot"""
+        rolling = cls(state["window"])
+        rolling._values.extend(state["values"])
+        rolling._total = state["total"]
+        rolling._compensation = state["compensation"]
+        return rolling
+
+
+class RollingMeanStd:
+    """Keeps the mean and population standard deviation of the last "window" values pushed into it.
+
+    This is the streaming counterpart of rolling_mean_std and produces exactly the same values.
+
+    Args:
+        window (int): The number of values in the window
+
+    Raises:
+        ValueError: The window has to be a positive integer
+
+    Example:
+        >>> from caishen_stonks.rolling import RollingMeanStd
+        >>> rolling = RollingMeanStd(2)
+        >>> [rolling.push(value) for value in [1.0, 2.0, 3.0]]
+        [None, (1.5, 0.5), (2.5, 0.5)]
+    """
+    __slots__ = ("window", "_values", "_total", "_compensation", "_mean", "_squared_deviations")
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("The window has to be a positive integer, but it is set to " + str(window))
+        self.window = window
+        self._values: Deque[float] = deque()
+        self._total = 0.0
+        self._compensation = 0.0
+        self._mean = 0.0
+        self._squared_deviations = 0.0
+
+    def push(self, value: float) -> Optional[Tuple[float, float]]:
+        """Adds a value to the window and returns its mean and standard deviation, or None until it is complete"""
+        self._total, self._compensation = _compensated_add(self._total, self._compensation, value)
+        self._values.append(value)
+        if len(self._values) <= self.window:
+            new_mean = (self._total + self._compensation) / len(self._values)
+            self._squared_deviations += (value - self._mean) * (value - new_mean)
+        else:
+            outgoing = self._values.popleft()
+            self._total, self._compensation = _compensated_add(self._total, self._compensation, -outgoing)
+            new_mean = (self._total + self._compensation) / self.window
+            self._squared_deviations += (value - outgoing) * (value - new_mean + outgoing - self._mean)
+        self._mean = new_mean
+        if len(self._values) == self.window and self._total - self._total != 0.0:
+            self._total, self._compensation, self._mean, self._squared_deviations = _window_moments(self._values)
+        if len(self._values) < self.window:
+            return None
+        return self._mean, math.sqrt(max(self._squared_deviations, 0.0) / self.window)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state of the window as a dictionary of plain Python values"""
+        return {"window": self.window, "values": list(self._values), "total": self._total,
+                "compensation": self._compensation, "mean": self._mean,
+                "squared_deviations": self._squared_deviations}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "RollingMeanStd":
+        """Rebuilds a window from the dictionary returned by snapshot"""
+        rolling = cls(state["window"])
+        rolling._values.extend(state["values"])
+        rolling._total = state["total"]
+        rolling._compensation = state["compensation"]
+        rolling._mean = state["mean"]
+        rolling._squared_deviations = state["squared_deviations"]
+        return rolling
+
+
+class RollingExtremum:
+    """Keeps the maximum (or minimum) of the last "window" values pushed into it.
+
+    This is the streaming counterpart of rolling_max and rolling_min, built on the same monotonic deque.
+
+    Args:
+        window (int): The number of values in the window
+        maximum (bool, optional): Track the maximum if True, the minimum otherwise. Defaults to True.
+
+    Raises:
+        ValueError: The window has to be a positive integer
+
+    Example:
+        >>> from caishen_stonks.rolling import RollingExtremum
+        >>> rolling = RollingExtremum(2, maximum=False)
+        >>> [rolling.push(value) for value in [1.0, 3.0, 2.0]]
+        [None, 1.0, 2.0]
+    """
+    __slots__ = ("window", "maximum", "_candidates", "_count")
+
+    def __init__(self, window: int, maximum: bool = True):
+        if window < 1:
+            raise ValueError("The window has to be a positive integer, but it is set to " + str(window))
+        self.window = window
+        self.maximum = maximum
+        # (index, value) pairs that are candidates for the extremum, see _rolling_extremum
+        self._candidates: Deque[Tuple[int, float]] = deque()
+        self._count = 0
+
+    def push(self, value: float) -> Optional[float]:
+        """Adds a value to the window and returns its extremum, or None until the window is complete"""
+        dominates = operator.ge if self.maximum else operator.le
+        candidates = self._candidates
+        while candidates and (value != value or dominates(value, candidates[-1][1])):
+            candidates.pop()
+        candidates.append((self._count, value))
+        if candidates[0][0] <= self._count - self.window:
+            candidates.popleft()
+        self._count += 1
+        if self._count < self.window:
+            return None
+        return candidates[0][1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state of the window as a dictionary of plain Python values"""
+        return {"window": self.window, "maximum": self.maximum, "candidates": [list(c) for c in self._candidates],
+                "count": self._count}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "RollingExtremum":
+        """Rebuilds a window from the dictionary returned by snapshot"""
+        rolling = cls(state["window"], state["maximum"])
+        rolling._candidates.extend((index, value) for index, value in state["candidates"])
+        rolling._count = state["count"]
+        return rolling
+
+
+def _compensated_add(total: float, compensation: float, value: float) -> Tuple[float, float]:
+    # one step of Neumaier's summation, in the same order of operations as the loops above
+    new_total = total + value
+    if abs(total) >= abs(value):
+        compensation += (total - new_total) + value
+    else:
+        compensation += (value - new_total) + total
+    return new_total, compensation
+
+
+def _window_sum(values: Iterable[float]) -> Tuple[float, float]:
+    # the compensated sum of a window, as the running total and its compensation
+    total = compensation = 0.0
+    for value in values:
+        total, compensation = _compensated_add(total, compensation, value)
+    return total, compensation
+
+
+def _window_moments(values: Iterable[float]) -> Tuple[float, float, float, float]:
+    # the compensated sum, mean and sum of squared deviations of a window, accumulated Welford-style
+    total = compensation = mean = squared_deviations = 0.0
+    for count, value in enumerate(values, 1):
+        total, compensation = _compensated_add(total, compensation, value)
+        new_mean = (total + compensation) / count
+        squared_deviations += (value - mean) * (value - new_mean)
+        mean = new_mean
+    return total, compensation, mean, squared_deviations
@@ -0,0 +1,470 @@
+"""Scheduling of history requests within the rate limits of the RapidAPI plan.
+
+The plan allows a number of requests per second and per month, and every request over them is answered with 429.
+RequestScheduler sends all requests of an application through one TokenBucket refilled at the per second limit and a
+MonthlyQuota, so interactive dashboard fetches and background universe refreshes no longer compete for them blindly:
+
+- Every request is queued with a priority, INTERACTIVE or BACKGROUND. A queued interactive request is always sent
+  before the background ones, and the background ones leave some tokens of the bucket for interactive requests.
+- Queued tickers with the same DateRange and StockInterval are packed into batches of up to 10 symbols, so many
+  single ticker fetches cost one request. A ticker queued or in flight already is not requested twice.
+- A 429 response pauses the bucket for the Retry-After delay of the response, or an exponential backoff, and halves
+  its rate. Every successful request raises the rate again, up to the plan limit.
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import threading
+import time
+
+import requests
+
+from .client import BATCH_SIZE, RETRY_STATUS_CODES, StockHistoryClient, _retry_after
+from .constants import DateRange, StockInterval
+from .errors import InvalidInputError, StockDataFetchError
+from .instrumentation import observe_bytes
+from .stock import StockHistoryRequestBuilder
+
+# Priorities of the requests, in the order they are served
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+
+class TokenBucket:
+    """Token bucket allowing "rate" requests per second on average and "burst" requests at once.
+
+    The rate adapts to the responses: throttle pauses the bucket and halves the rate, down to "minimum_rate", and
+    recover raises it again by a sixteenth of the limit after every successful request. The bucket is not thread safe,
+    RequestScheduler only uses it under its lock.
+
+    Args:
+        rate (float): The requests per second allowed by the plan
+        burst (int, optional): The most tokens the bucket holds. Defaults to the rate, and at least 1.
+        minimum_rate (float, optional): The lowest rate throttle lowers the rate to. Defaults to a sixteenth of the
+            rate.
+        clock (Callable[[], float], optional): The clock in seconds. Defaults to time.monotonic.
+
+    Raises:
+        ValueError: The rate or burst are not positive
+
+    Example:
+        >>> from caishen_stonks.scheduler import TokenBucket
+        >>> bucket = TokenBucket(2.0, burst=1, clock=lambda: 0.0)
+        >>> bucket.delay()
+        0.0
+        >>> bucket.take()
+        >>> bucket.delay()
+        0.5
+    """
+
+    __slots__ = ("limit", "rate", "burst", "minimum_rate", "tokens", "paused_until", "_clock", "_refilled")
+
+    def __init__(self, rate: float, burst: Optional[int] = None, minimum_rate: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("The rate has to be positive, but it is set to " + str(rate))
+        if burst is not None and burst < 1:
+            raise ValueError("The burst has to be a positive integer, but it is set to " + str(burst))
+        self.limit = float(rate)
+        self.rate = float(rate)
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.minimum_rate = minimum_rate if minimum_rate is not None else rate / 16
+        self.tokens = float(self.burst)
+        self._clock = clock
+        self._refilled = clock()
+        self.paused_until = self._refilled
+
+    def delay(self, reserve: int = 0) -> float:
+        """Returns the seconds until a token can be taken while "reserve" tokens are left in the bucket"""
+        now = self._refill()
+        missing = 1 + reserve - self.tokens
+        return max(0.0, self.paused_until - now, missing / self.rate if missing > 0 else 0.0)
+
+    def take(self):
+        """Takes a token, which delay has to allow"""
+        self._refill()
+        self.tokens -= 1
+
+    def throttle(self, seconds: float):
+        """Pauses the bucket for "seconds" and halves the rate, after the API answered with 429"""
+        self.rate = max(self.minimum_rate, self.rate / 2)
+        self.pause(seconds)
+        self.tokens = min(self.tokens, 0.0)
+
+    def pause(self, seconds: float):
+        """Lets no token be taken for "seconds" seconds"""
+        self.paused_until = max(self.paused_until, self._refill() + seconds)
+
+    def recover(self):
+        """Raises the rate towards the limit, after a successful request"""
+        self.rate = min(self.limit, self.rate + self.limit / 16)
+
+    def _refill(self) -> float:
+        # no tokens accrue while the bucket is paused, so a pause is not followed by a burst
+        now = self._clock()
+        refilled = max(self._refilled, self.paused_until)
+        self.tokens = min(float(self.burst), self.tokens + max(0.0, now - refilled) * self.rate)
+        self._refilled = now
+        return now
+
+
+class MonthlyQuota:
+    """Count of the requests sent in the current calendar month (UTC), against the monthly limit of the plan.
+
+    Args:
+        limit (int): The requests allowed per month
+        used (int, optional): The requests already sent this month, e.g. by an earlier process. Defaults to 0.
+        clock (Callable[[], float], optional): The wall clock in seconds since the epoch. Defaults to time.time.
+
+    Raises:
+        ValueError: The limit is not positive or more requests were used than the limit allows
+
+    Example:
+        >>> from caishen_stonks.scheduler import MonthlyQuota
+        >>> quota = MonthlyQuota(2, used=1)
+        >>> quota.take(), quota.take(), quota.remaining
+        (True, False, 0)
+    """
+
+    __slots__ = ("limit", "used", "_clock", "_month")
+
+    def __init__(self, limit: int, used: int = 0, clock: Callable[[], float] = time.time):
+        if limit < 1:
+            raise ValueError("The monthly limit has to be a positive integer, but it is set to " + str(limit))
+        if not 0 <= used <= limit:
+            raise ValueError("The used requests have to be between 0 and the limit, but they are set to " + str(used))
+        self.limit = limit
+        self.used = used
+        self._clock = clock
+        self._month = time.gmtime(clock())[:2]
+
+    @property
+    def remaining(self) -> int:
+        """The requests left this month"""
+        self._roll()
+        return self.limit - self.used
+
+    def take(self) -> bool:
+        """Counts a request, returns False without counting it if the quota is used up"""
+        if self.remaining == 0:
+            return False
+        self.used += 1
+        return True
+
+    def _roll(self):
+        month = time.gmtime(self._clock())[:2]
+        if month != self._month:
+            self._month = month
+            self.used = 0
+
+
+class RequestScheduler:
+    """Sends the history requests of interactive and background callers within the rate limits of the plan.
+
+    Callers submit tickers with a priority and get a Future of their history. A dispatcher thread sends the queued
+    tickers whenever the TokenBucket has a token: it takes the oldest ticker of the highest priority queue and packs
+    the other queued tickers with the same DateRange and StockInterval into its batch, interactive ones first, up to
+    10 symbols. Background tickers are only taken when "reserve" tokens are left for interactive requests afterwards.
+
+    The requests are sent over the session of "client", to its url, with its timeout. A request failing with a
+    connection error, a timeout or one of RETRY_STATUS_CODES requeues its tickers at the front of their queues and
+    pauses the bucket for the Retry-After delay of the response, or client.backoff doubled for every earlier attempt.
+    A 429 also halves the rate of the bucket. Tickers failing more than client.retries times, and all tickers once the
+    monthly quota is used up, fail with StockDataFetchError.
+
+    Args:
+        client (StockHistoryClient, optional): The client whose session, url, timeout, retries and backoff are used.
+            Defaults to a new client.
+        requests_per_second (float, optional): The per second limit of the plan. Defaults to 5.0.
+        burst (int, optional): The requests allowed at once. Defaults to the per second limit.
+        requests_per_month (int, optional): The monthly limit of the plan, None for no limit. Defaults to None.
+        used_this_month (int, optional): The requests already sent this month. Defaults to 0.
+        reserve (int, optional): Tokens background requests leave for interactive ones. Defaults to half the burst.
+        max_in_flight (int, optional): The most requests sent at the same time. Defaults to 4.
+
+    Raises:
+        ValueError: The limits are not positive, the reserve is not below the burst or max_in_flight is not positive
+
+    Attributes:
+        bucket (TokenBucket): The token bucket every request takes a token from
+        quota (MonthlyQuota): The monthly quota, None without a monthly limit
+
+    Example:
+        >>> from caishen_stonks.scheduler import BACKGROUND, RequestScheduler
+        >>> from caishen_stonks.constants import DateRange, StockInterval
+        >>> with RequestScheduler(requests_per_second=5.0, requests_per_month=500000) as scheduler:  # doctest: +SKIP
+        ...     refresh = scheduler.submit(universe, DateRange.oneYear, StockInterval.oneDay, priority=BACKGROUND)
+        ...     history = scheduler.fetch(["AAPL"], DateRange.oneYear, StockInterval.oneDay)
+    """
+
+    def __init__(self, client: Optional[StockHistoryClient] = None, requests_per_second: float = 5.0,
+                 burst: Optional[int] = None, requests_per_month: Optional[int] = None, used_this_month: int = 0,
+                 reserve: Optional[int] = None, max_in_flight: int = 4):
+        self.client = client if client is not None else StockHistoryClient()
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.quota = MonthlyQuota(requests_per_month, used_this_month) if requests_per_month is not None else None
+        self.reserve = reserve if reserve is not None else self.bucket.burst // 2
+        if not 0 <= self.reserve < self.bucket.burst:
+            raise ValueError("The reserve has to be between 0 and the burst, but it is set to " + str(self.reserve))
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight has to be a positive integer, but it is set to " + str(max_in_flight))
+        self.max_in_flight = max_in_flight
+        self._queues: Dict[int, Deque[_Entry]] = {priority: deque() for priority in PRIORITIES}
+        self._pending: Dict[Tuple[str, DateRange, StockInterval], _Entry] = {}
+        self._counts = {"submitted": 0, "coalesced": 0, "requests": 0, "throttled": 0, "retries": 0}
+        self._in_flight = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._dispatcher = threading.Thread(target=self._dispatch, name="RequestScheduler", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, tickers: List[str], date_range: DateRange, interval: StockInterval,
+               priority: int = INTERACTIVE) -> "Future[Dict[str, Any]]":
+        """Queues the tickers and returns a Future of their history
+
+        Args:
+            tickers (List[str]): The stock tickers, any number of them. Duplicates are requested once.
+            date_range (DateRange): The extent of the history to load
+            interval (StockInterval): The aggregate value for a specific interval of stock(s)
+            priority (int, optional): INTERACTIVE or BACKGROUND. Defaults to INTERACTIVE.
+
+        Raises:
+            TypeError: Invalid tickers, date range or interval type
+            InvalidInputError: No tickers were requested
+            ValueError: The priority is not one of PRIORITIES
+            StockDataFetchError: The scheduler is closed
+
+        Returns:
+            Future[Dict[str, Any]]: The decoded responses keyed by ticker, like StockHistoryClient.fetch, or the
+            StockDataFetchError of the first ticker that failed
+        """
+        _validate(tickers, date_range, interval)
+        if priority not in PRIORITIES:
+            raise ValueError("The priority has to be INTERACTIVE or BACKGROUND, but it is set to " + str(priority))
+        with self._condition:
+            if self._closed:
+                raise StockDataFetchError("The scheduler is closed")
+            futures = {ticker: self._enqueue(ticker, date_range, interval, priority)
+                       for ticker in dict.fromkeys(tickers)}
+            self._condition.notify_all()
+        return _gather(futures)
+
+    def fetch(self, tickers: List[str], date_range: DateRange, interval: StockInterval, priority: int = INTERACTIVE,
+              timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Like submit, waiting up to "timeout" seconds for the history"""
+        return self.submit(tickers, date_range, interval, priority).result(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the counters, the queued tickers of every priority, the requests in flight and the current rate"""
+        with self._condition:
+            stats: Dict[str, Any] = dict(self._counts)
+            stats.update(interactive=len(self._queues[INTERACTIVE]), background=len(self._queues[BACKGROUND]),
+                         in_flight=self._in_flight, rate=self.bucket.rate,
+                         quota_remaining=None if self.quota is None else self.quota.remaining)
+        return stats
+
+    def close(self):
+        """Fails the queued tickers, waits for the requests in flight and closes the client"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+        with self._condition:
+            self._fail_queued(StockDataFetchError("The scheduler was closed before the request was sent"))
+        self.client.close()
+
+    def __enter__(self) -> "RequestScheduler":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _enqueue(self, ticker: str, date_range: DateRange, interval: StockInterval, priority: int) -> Future:
+        self._counts["submitted"] += 1
+        key = (ticker, date_range, interval)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = _Entry(ticker, date_range, interval, priority)
+            self._queues[priority].append(entry)
+            return entry.future
+        self._counts["coalesced"] += 1
+        if entry.queued and priority < entry.priority:
+            # a background ticker an interactive caller waits for is promoted
+            self._queues[entry.priority].remove(entry)
+            entry.priority = priority
+            self._queues[priority].append(entry)
+        return entry.future
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+            self._executor.submit(self._send, batch)
+
+    def _next_batch(self) -> Optional[List["_Entry"]]:
+        # waits until a batch may be sent, called under the lock
+        while not self._closed:
+            priority = INTERACTIVE if self._queues[INTERACTIVE] else BACKGROUND
+            if not self._queues[priority] or self._in_flight >= self.max_in_flight:
+                self._condition.wait()
+                continue
+            delay = self.bucket.delay(0 if priority == INTERACTIVE else self.reserve)
+            if delay > 0:
+                self._condition.wait(delay)
+                continue
+            if self.quota is not None and not self.quota.take():
+                self._fail_queued(StockDataFetchError(f"The monthly quota of {self.quota.limit} requests is used up"))
+                continue
+            self.bucket.take()
+            self._in_flight += 1
+            self._counts["requests"] += 1
+            return self._pack(priority)
+        return None
+
+    def _pack(self, priority: int) -> List["_Entry"]:
+        first = self._queues[priority].popleft()
+        batch = [first]
+        for queue in self._queues.values():
+            if len(batch) == BATCH_SIZE:
+                break
+            kept: Deque[_Entry] = deque()
+            while queue:
+                entry = queue.popleft()
+                if len(batch) < BATCH_SIZE and (entry.date_range, entry.interval) == (first.date_range, first.interval):
+                    batch.append(entry)
+                else:
+                    kept.append(entry)
+            queue.extend(kept)
+        for entry in batch:
+            entry.queued = False
+        return batch
+
+    def _send(self, batch: List["_Entry"]):
+        symbols = [entry.ticker for entry in batch]
+        reason = None
+        retry_after = 0.0
+        try:
+            conf = StockHistoryRequestBuilder(symbols, batch[0].date_range, batch[0].interval).conf
+            response = self.client.session.get(self.client.url or conf["url"], headers=conf["headers"],
+                                               params=conf["querystring"], timeout=self.client.timeout)
+            if response.status_code in RETRY_STATUS_CODES:
+                reason = f"status {response.status_code}"
+                retry_after = _retry_after(response)
+            else:
+                observe_bytes("scheduler.RequestScheduler.fetch", len(response.content))
+                if not response.ok:
+                    raise StockDataFetchError(f"Fetching {symbols} failed with status {response.status_code}")
+                history = response.json()
+        except (requests.ConnectionError, requests.Timeout) as error:
+            reason = str(error)
+        except Exception as error:
+            with self._condition:
+                self._finish(batch)
+            for entry in batch:
+                entry.future.set_exception(error)
+            return
+
+        with self._condition:
+            if reason is None:
+                self.bucket.recover()
+                self._finish(batch)
+            else:
+                self._retry(batch, reason, retry_after, throttled=reason == "status 429")
+        if reason is None:
+            for entry in batch:
+                entry.future.set_result(history.get(entry.ticker, _MISSING))
+
+    def _retry(self, batch: List["_Entry"], reason: str, retry_after: float, throttled: bool):
+        # called under the lock: requeues the batch at the front of its queues, or fails the tickers out of retries
+        attempts = max(entry.attempts for entry in batch)
+        delay = max(retry_after, self.client.backoff * 2 ** attempts)
+        if throttled:
+            self._counts["throttled"] += 1
+            self.bucket.throttle(delay)
+        else:
+            self.bucket.pause(delay)
+        self._in_flight -= 1
+        for entry in reversed(batch):
+            entry.attempts += 1
+            if entry.attempts > self.client.retries or self._closed:
+                del self._pending[(entry.ticker, entry.date_range, entry.interval)]
+                entry.future.set_exception(StockDataFetchError(
+                    f"Fetching {entry.ticker} failed after {entry.attempts} attempts: {reason}"))
+            else:
+                self._counts["retries"] += 1
+                entry.queued = True
+                self._queues[entry.priority].appendleft(entry)
+        self._condition.notify_all()
+
+    def _finish(self, batch: List["_Entry"]):
+        # called under the lock once the request of the batch completed
+        self._in_flight -= 1
+        for entry in batch:
+            del self._pending[(entry.ticker, entry.date_range, entry.interval)]
+        self._condition.notify_all()
+
+    def _fail_queued(self, error: Exception):
+        # called under the lock
+        for queue in self._queues.values():
+            while queue:
+                entry = queue.popleft()
+                del self._pending[(entry.ticker, entry.date_range, entry.interval)]
+                entry.future.set_exception(error)
+
+
+class _Entry:
+    # a queued or in flight ticker, shared by every caller waiting for it
+
+    __slots__ = ("ticker", "date_range", "interval", "priority", "future", "attempts", "queued")
+
+    def __init__(self, ticker: str, date_range: DateRange, interval: StockInterval, priority: int):
+        self.ticker = ticker
+        self.date_range = date_range
+        self.interval = interval
+        self.priority = priority
+        self.future: Future = Future()
+        self.attempts = 0
+        self.queued = True
+
+
+# Result of a ticker the API returned no data for
+_MISSING = object()
+
+
+def _validate(tickers: List[str], date_range: DateRange, interval: StockInterval):
+    if not isinstance(tickers, list):
+        raise TypeError("Invalid tickers type. Please use a list for tickers")
+    if len(tickers) == 0:
+        raise InvalidInputError("At least one ticker has to be requested")
+    if not isinstance(date_range, DateRange):
+        raise TypeError("Invalid date range type. Please use DateRange class")
+    if not isinstance(interval, StockInterval):
+        raise TypeError("Invalid interval type. Please use StockInterval class")
+
+
+def _gather(futures: Dict[str, Future]) -> Future:
+    # one future completing once every ticker completed, with the first error of the tickers if any failed
+    gathered: Future = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def completed(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        errors = [future.exception() for future in futures.values() if future.exception() is not None]
+        if errors:
+            gathered.set_exception(errors[0])
+        else:
+            gathered.set_result({ticker: future.result() for ticker, future in futures.items()
+                                 if future.result() is not _MISSING})
+
+    for future in futures.values():
+        future.add_done_callback(completed)
+    return gathered
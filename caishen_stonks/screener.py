@@ -0,0 +1,362 @@
+"""Screens a universe of tickers with declarative conditions over the technical indicators.
+
+Conditions are built from the series of this module, which are named after the technical_indicators functions, and
+are evaluated for all tickers at once with the batch kernels:
+
+    >>> import numpy as np
+    >>> from caishen_stonks import screener as S
+    >>> screen = S.Screener([S.RSI(14) < 30, S.close < S.bollinger_bands(20).lower,
+    ...                      S.crossed_above(S.MACD().line, S.MACD().signal, within=3)])
+    >>> matches = screen.run(prices, tickers, rank_by=S.RSI(14))  # doctest: +SKIP
+
+A comparison holds if it holds at the last bar. Only the indicators the conditions reference are computed, each once.
+The conditions are evaluated from the cheapest to the most expensive, and every condition only computes its
+indicators for the tickers that passed the conditions before it.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+import operator
+
+import numpy as np
+
+from . import batch
+from .errors import InvalidInputError
+
+# Relative cost of computing an indicator, used to evaluate cheap conditions first
+_COSTS = {"price": 0, "SMA": 1, "EMA": 2, "bollinger_bands": 3, "RSI": 3, "SO": 4, "MACD": 5}
+
+# Indicator key: (function name, arguments)
+_Key = Tuple[str, Tuple[Any, ...]]
+
+
+class Series(ABC):
+    """Values of every ticker at every bar. Comparing a series gives a Condition, arithmetic gives a Series."""
+
+    def __lt__(self, other: Union["Series", float]) -> "Condition":
+        return _Compare(self, operator.lt, other)
+
+    def __le__(self, other: Union["Series", float]) -> "Condition":
+        return _Compare(self, operator.le, other)
+
+    def __gt__(self, other: Union["Series", float]) -> "Condition":
+        return _Compare(self, operator.gt, other)
+
+    def __ge__(self, other: Union["Series", float]) -> "Condition":
+        return _Compare(self, operator.ge, other)
+
+    def __add__(self, other: Union["Series", float]) -> "Series":
+        return _Arithmetic(self, operator.add, other)
+
+    def __radd__(self, other: float) -> "Series":
+        return _Arithmetic(other, operator.add, self)
+
+    def __sub__(self, other: Union["Series", float]) -> "Series":
+        return _Arithmetic(self, operator.sub, other)
+
+    def __rsub__(self, other: float) -> "Series":
+        return _Arithmetic(other, operator.sub, self)
+
+    def __mul__(self, other: Union["Series", float]) -> "Series":
+        return _Arithmetic(self, operator.mul, other)
+
+    def __rmul__(self, other: float) -> "Series":
+        return _Arithmetic(other, operator.mul, self)
+
+    def __truediv__(self, other: Union["Series", float]) -> "Series":
+        return _Arithmetic(self, operator.truediv, other)
+
+    @abstractmethod
+    def _evaluate(self, frame: "_Frame") -> np.ndarray:
+        """Returns the values of the tickers of the frame"""
+
+    @abstractmethod
+    def _keys(self) -> FrozenSet[_Key]:
+        """Returns the indicators needed to evaluate it"""
+
+
+class _Indicator(Series):
+    def __init__(self, name: str, arguments: Tuple[Any, ...], output: int = 0):
+        self.key: _Key = (name, arguments)
+        self.output = output
+
+    def _evaluate(self, frame: "_Frame") -> np.ndarray:
+        return frame.indicator(self.key)[self.output]
+
+    def _keys(self) -> FrozenSet[_Key]:
+        return frozenset([self.key])
+
+
+class _Arithmetic(Series):
+    def __init__(self, left: Union[Series, float], function: Callable[[Any, Any], Any], right: Union[Series, float]):
+        self.left = left
+        self.function = function
+        self.right = right
+
+    def _evaluate(self, frame: "_Frame") -> np.ndarray:
+        return self.function(_evaluate(self.left, frame), _evaluate(self.right, frame))
+
+    def _keys(self) -> FrozenSet[_Key]:
+        return _keys(self.left) | _keys(self.right)
+
+
+class Condition(ABC):
+    """Holds or not for every ticker. Conditions can be combined with &, | and ~."""
+
+    def __and__(self, other: "Condition") -> "Condition":
+        return _Combined(np.logical_and, self, other)
+
+    def __or__(self, other: "Condition") -> "Condition":
+        return _Combined(np.logical_or, self, other)
+
+    def __invert__(self) -> "Condition":
+        return _Not(self)
+
+    @abstractmethod
+    def _mask(self, frame: "_Frame") -> np.ndarray:
+        """Returns whether it holds for every ticker of the frame"""
+
+    @abstractmethod
+    def _keys(self) -> FrozenSet[_Key]:
+        """Returns the indicators needed to evaluate it"""
+
+
+class _Compare(Condition):
+    def __init__(self, left: Series, function: Callable[[Any, Any], Any], right: Union[Series, float]):
+        self.left = left
+        self.function = function
+        self.right = right
+
+    def _mask(self, frame: "_Frame") -> np.ndarray:
+        # NaN, e.g. during the warm-up of an indicator, compares false
+        return self.function(_last(self.left, frame), _last(self.right, frame))
+
+    def _keys(self) -> FrozenSet[_Key]:
+        return _keys(self.left) | _keys(self.right)
+
+
+class _Crossed(Condition):
+    def __init__(self, series: Series, other: Union[Series, float], within: int, above: bool):
+        if type(within) is not int:
+            raise TypeError("within is expected to be an int, but it's type is " + str(type(within)))
+        if within < 1:
+            raise ValueError("within has to be a positive integer, but it is set to " + str(within))
+        self.series = series
+        self.other = other
+        self.within = within
+        self.above = above
+
+    def _mask(self, frame: "_Frame") -> np.ndarray:
+        difference = _evaluate(self.series, frame) - _evaluate(self.other, frame)
+        if not self.above:
+            difference = -difference
+        recent = difference[-self.within - 1:]
+        return ((recent[:-1] <= 0) & (recent[1:] > 0)).any(axis=0)
+
+    def _keys(self) -> FrozenSet[_Key]:
+        return _keys(self.series) | _keys(self.other)
+
+
+class _Combined(Condition):
+    def __init__(self, function: Callable[[np.ndarray, np.ndarray], np.ndarray], left: Condition, right: Condition):
+        self.function = function
+        self.left = left
+        self.right = right
+
+    def _mask(self, frame: "_Frame") -> np.ndarray:
+        return self.function(self.left._mask(frame), self.right._mask(frame))
+
+    def _keys(self) -> FrozenSet[_Key]:
+        return self.left._keys() | self.right._keys()
+
+
+class _Not(Condition):
+    def __init__(self, condition: Condition):
+        self.condition = condition
+
+    def _mask(self, frame: "_Frame") -> np.ndarray:
+        return ~self.condition._mask(frame)
+
+    def _keys(self) -> FrozenSet[_Key]:
+        return self.condition._keys()
+
+
+class _Bands:
+    def __init__(self, lookback: int):
+        self.lower = _Indicator("bollinger_bands", (lookback,), 0)
+        self.middle = _Indicator("bollinger_bands", (lookback,), 1)
+        self.upper = _Indicator("bollinger_bands", (lookback,), 2)
+
+
+class _MACDLines:
+    def __init__(self, arguments: Tuple[Any, ...]):
+        self.line = _Indicator("MACD", arguments, 0)
+        self.signal = _Indicator("MACD", arguments, 1)
+
+
+class _Stochastic:
+    def __init__(self, K_lookback: int, D_lookback: int):
+        self.K = _Indicator("SO", (K_lookback, D_lookback), 0)
+        self.D = _Indicator("SO", (K_lookback, D_lookback), 1)
+
+
+# The prices themselves
+close = _Indicator("price", ("close",))
+high = _Indicator("price", ("high",))
+low = _Indicator("price", ("low",))
+
+
+def SMA(lookback: int = 14) -> Series:
+    """The Simple Moving Average of the closing prices"""
+    return _Indicator("SMA", (lookback,))
+
+
+def EMA(lookback: int = 12, smoothing: float = 2.0) -> Series:
+    """The Exponential Moving Average of the closing prices"""
+    return _Indicator("EMA", (lookback, smoothing))
+
+
+def RSI(lookback: int = 14) -> Series:
+    """The Relative Strength Index of the closing prices"""
+    return _Indicator("RSI", (lookback,))
+
+
+def bollinger_bands(lookback: int = 20) -> _Bands:
+    """The bollinger bands of the closing prices, as the series lower, middle and upper"""
+    return _Bands(lookback)
+
+
+def MACD(MACD_lookback: Tuple[int, int] = (12, 26), MACD_smoothing: Tuple[float, float] = (2.0, 2.0),
+         signal_lookback: int = 9, signal_smoothing: float = 2.0) -> _MACDLines:
+    """The MACD of the closing prices, as the series line and signal"""
+    return _MACDLines((tuple(MACD_lookback), tuple(MACD_smoothing), signal_lookback, signal_smoothing))
+
+
+def SO(K_lookback: int = 5, D_lookback: int = 3) -> _Stochastic:
+    """The stochastic oscillator, as the series K and D"""
+    return _Stochastic(K_lookback, D_lookback)
+
+
+def crossed_above(series: Series, other: Union[Series, float], within: int = 1) -> Condition:
+    """Holds if "series" crossed above "other" during the last "within" bars"""
+    return _Crossed(series, other, within, above=True)
+
+
+def crossed_below(series: Series, other: Union[Series, float], within: int = 1) -> Condition:
+    """Holds if "series" crossed below "other" during the last "within" bars"""
+    return _Crossed(series, other, within, above=False)
+
+
+class Screener:
+    """Finds the tickers meeting every condition.
+
+    Args:
+        conditions (Sequence[Condition]): The conditions, which all have to hold
+
+    Raises:
+        TypeError: A condition is not a Condition, e.g. a Series that was not compared to anything
+    """
+
+    def __init__(self, conditions: Sequence[Condition]):
+        for condition in conditions:
+            if not isinstance(condition, Condition):
+                raise TypeError("The conditions are expected to be Conditions, but one of them is " + repr(condition))
+        self.conditions = list(conditions)
+
+    def run(self, prices: np.ndarray, tickers: Optional[Sequence[str]] = None, high_prices: Optional[np.ndarray] = None,
+            low_prices: Optional[np.ndarray] = None, rank_by: Optional[Series] = None, ascending: bool = True,
+            limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Screens the tickers
+
+        Args:
+            prices (np.ndarray): The (bars x tickers) matrix of closing prices, NaN for missing bars
+            tickers (Sequence[str], optional): The names of the columns. Defaults to their indices as strings.
+            high_prices (np.ndarray, optional): The (bars x tickers) matrix of high prices, needed by SO and high
+            low_prices (np.ndarray, optional): The (bars x tickers) matrix of low prices, needed by SO and low
+            rank_by (Series, optional): Orders the matches by the last value of this series
+            ascending (bool, optional): Ranks the lowest values of "rank_by" first. Defaults to True.
+            limit (int, optional): Returns at most this many matches
+
+        Raises:
+            InvalidInputError: The prices are not (bars x tickers) matrices of the same shape, the number of tickers
+                does not match, or the high and low prices are missing for a condition that needs them
+
+        Returns:
+            List[Tuple[str, float]]: The matching tickers with the last value of "rank_by" (NaN without "rank_by"),
+            best ranked first. Matches with a NaN rank are last.
+        """
+        frame = _Frame(prices, high_prices, low_prices)
+        if tickers is None:
+            tickers = [str(column) for column in range(frame.prices.shape[1])]
+        if len(tickers) != frame.prices.shape[1]:
+            raise InvalidInputError("There are " + str(len(tickers)) + " tickers for "
+                                    + str(frame.prices.shape[1]) + " columns of prices")
+
+        remaining = list(self.conditions)
+        while remaining and frame.alive.size:
+            # the condition needing the least computation is evaluated next
+            condition = min(remaining, key=lambda condition: frame.cost(condition._keys()))
+            remaining.remove(condition)
+            frame.keep(condition._mask(frame))
+
+        scores = _evaluate(rank_by, frame)[-1] if rank_by is not None and frame.alive.size else \
+            np.full(frame.alive.size, np.nan)
+        order = np.argsort(scores if ascending else -scores, kind="stable")
+        matches = [(tickers[column], float(score)) for column, score in zip(frame.alive[order], scores[order])]
+        return matches if limit is None else matches[:limit]
+
+
+class _Frame:
+    # the prices and the indicators computed so far, for the tickers that passed every condition evaluated so far
+
+    def __init__(self, prices: np.ndarray, high_prices: Optional[np.ndarray], low_prices: Optional[np.ndarray]):
+        self.prices = batch._as_matrix(prices)
+        self.high_prices = None if high_prices is None else batch._as_matrix(high_prices)
+        self.low_prices = None if low_prices is None else batch._as_matrix(low_prices)
+        for other in (self.high_prices, self.low_prices):
+            if other is not None and other.shape != self.prices.shape:
+                raise InvalidInputError("The shapes of the price matrices are mismatching")
+        self.alive = np.arange(self.prices.shape[1])
+        # key -> (columns the indicator was computed for, its outputs)
+        self._computed: Dict[_Key, Tuple[np.ndarray, Tuple[np.ndarray, ...]]] = {}
+
+    def keep(self, mask: np.ndarray):
+        self.alive = self.alive[np.asarray(mask, dtype=bool)]
+
+    def cost(self, keys: FrozenSet[_Key]) -> int:
+        return sum(_COSTS[key[0]] for key in keys if key not in self._computed)
+
+    def indicator(self, key: _Key) -> Tuple[np.ndarray, ...]:
+        if key not in self._computed:
+            self._computed[key] = (self.alive, self._compute(key))
+        columns, outputs = self._computed[key]
+        if columns is self.alive:
+            return outputs
+        # the tickers only get fewer, so the alive ones are a subset of the computed ones
+        positions = np.searchsorted(columns, self.alive)
+        return tuple(output[:, positions] for output in outputs)
+
+    def _compute(self, key: _Key) -> Tuple[np.ndarray, ...]:
+        name, arguments = key
+        if (name == "SO" or arguments in (("high",), ("low",))) and (self.high_prices is None
+                                                                     or self.low_prices is None):
+            raise InvalidInputError("The high and low prices are required to screen with " + name + str(arguments))
+        prices = self.prices[:, self.alive]
+        if name == "price":
+            source = {"close": self.prices, "high": self.high_prices, "low": self.low_prices}[arguments[0]]
+            return (source[:, self.alive],)
+        if name == "SO":
+            return batch.SO(self.high_prices[:, self.alive], self.low_prices[:, self.alive], prices, *arguments)
+        outputs = getattr(batch, name)(prices, *arguments)
+        return outputs if isinstance(outputs, tuple) else (outputs,)
+
+
+def _evaluate(value: Union[Series, float], frame: _Frame) -> Union[np.ndarray, float]:
+    return value._evaluate(frame) if isinstance(value, Series) else value
+
+
+def _last(value: Union[Series, float], frame: _Frame) -> Union[np.ndarray, float]:
+    return value._evaluate(frame)[-1] if isinstance(value, Series) else value
+
+
+def _keys(value: Union[Series, float]) -> FrozenSet[_Key]:
+    return value._keys() if isinstance(value, Series) else frozenset()
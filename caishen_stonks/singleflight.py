@@ -0,0 +1,135 @@
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import threading
+
+from .client import StockHistoryClient
+from .constants import DateRange, StockInterval
+from .errors import InvalidInputError
+
+
+class SingleFlightClient:
+    """Coalesces concurrent fetches of the same stock histories into one request.
+
+    Every ticker of a fetch is keyed by (ticker, date_range, interval). A ticker that is already being fetched by
+    another caller is not requested again: the caller waits for the fetch in flight and shares its result. Only the
+    remaining tickers are requested, so callers with overlapping ticker sets fetch every shared ticker once. Once a
+    fetch completes its tickers are no longer in flight, so later calls fetch fresh data.
+
+    fetch serves threaded callers and fetch_async asyncio callers, and both can share the same fetches. A failed fetch
+    raises its error in every caller waiting for it.
+
+    Args:
+        client (StockHistoryClient, optional): The client used to fetch the tickers. Defaults to a new client.
+
+    Attributes:
+        calls (int): Calls of fetch and fetch_async
+        coalesced_calls (int): Calls that waited for at least one ticker fetched by another call
+        coalesced_tickers (int): Tickers that were not requested because they were already in flight
+        fetches (int): Requests sent to the client
+
+    Example:
+        >>> from caishen_stonks.singleflight import SingleFlightClient
+        >>> from caishen_stonks.constants import DateRange, StockInterval
+        >>> client = SingleFlightClient()
+        >>> history = client.fetch(["AAPL", "MSFT"], DateRange.oneYear, StockInterval.oneDay)  # doctest: +SKIP
+    """
+
+    def __init__(self, client: Optional[StockHistoryClient] = None):
+        self.client = client if client is not None else StockHistoryClient()
+        self.calls = 0
+        self.coalesced_calls = 0
+        self.coalesced_tickers = 0
+        self.fetches = 0
+        self._in_flight: Dict[Tuple[str, DateRange, StockInterval], Future] = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, tickers: List[str], date_range: DateRange, interval: StockInterval) -> Dict[str, Any]:
+        """Fetches the history of every ticker, sharing the fetches in flight
+
+        Args:
+            tickers (List[str]): The stock tickers
+            date_range (DateRange): The extent of the history to load
+            interval (StockInterval): The aggregate value for a specific interval of stock(s)
+
+        Raises:
+            TypeError: Invalid tickers, date range or interval type
+            InvalidInputError: No tickers were requested
+
+        Returns:
+            Dict[str, Any]: The decoded responses keyed by ticker, like StockHistoryClient.fetch
+        """
+        owned, futures = self._claim(tickers, date_range, interval)
+        if owned:
+            self._fetch_owned(owned, date_range, interval)
+        return _collect({ticker: future.result() for ticker, future in futures.items()})
+
+    async def fetch_async(self, tickers: List[str], date_range: DateRange, interval: StockInterval) -> Dict[str, Any]:
+        """Like fetch, for asyncio callers: the request runs in the default executor of the running loop"""
+        owned, futures = self._claim(tickers, date_range, interval)
+        loop = asyncio.get_running_loop()
+        if owned:
+            await loop.run_in_executor(None, self._fetch_owned, owned, date_range, interval)
+        results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures.values()))
+        return _collect(dict(zip(futures, results)))
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the counters and the number of tickers in flight"""
+        with self._lock:
+            return {"calls": self.calls, "coalesced_calls": self.coalesced_calls,
+                    "coalesced_tickers": self.coalesced_tickers, "fetches": self.fetches,
+                    "in_flight": len(self._in_flight)}
+
+    def _claim(self, tickers: List[str], date_range: DateRange,
+               interval: StockInterval) -> Tuple[Dict[str, Future], Dict[str, Future]]:
+        # the tickers nobody is fetching yet are claimed by this call, the others are waited for
+        if not isinstance(tickers, list):
+            raise TypeError("Invalid tickers type. Please use a list for tickers")
+        if len(tickers) == 0:
+            raise InvalidInputError("At least one ticker has to be requested")
+        if not isinstance(date_range, DateRange):
+            raise TypeError("Invalid date range type. Please use DateRange class")
+        if not isinstance(interval, StockInterval):
+            raise TypeError("Invalid interval type. Please use StockInterval class")
+        owned: Dict[str, Future] = {}
+        futures: Dict[str, Future] = {}
+        with self._lock:
+            self.calls += 1
+            for ticker in dict.fromkeys(tickers):
+                key = (ticker, date_range, interval)
+                future = self._in_flight.get(key)
+                if future is None:
+                    future = owned[ticker] = self._in_flight[key] = Future()
+                futures[ticker] = future
+            shared = len(futures) - len(owned)
+            if shared:
+                self.coalesced_calls += 1
+                self.coalesced_tickers += shared
+            if owned:
+                self.fetches += 1
+        return owned, futures
+
+    def _fetch_owned(self, owned: Dict[str, Future], date_range: DateRange, interval: StockInterval):
+        try:
+            history = self.client.fetch(list(owned), date_range, interval)
+        except BaseException as error:
+            self._release(owned, date_range, interval)
+            for future in owned.values():
+                future.set_exception(error)
+            raise
+        self._release(owned, date_range, interval)
+        for ticker, future in owned.items():
+            future.set_result(history.get(ticker, _MISSING))
+
+    def _release(self, owned: Dict[str, Future], date_range: DateRange, interval: StockInterval):
+        with self._lock:
+            for ticker in owned:
+                del self._in_flight[(ticker, date_range, interval)]
+
+
+# Result of a ticker the API returned no data for
+_MISSING = object()
+
+
+def _collect(results: Dict[str, Any]) -> Dict[str, Any]:
+    return {ticker: result for ticker, result in results.items() if result is not _MISSING}
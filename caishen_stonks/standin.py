@@ -0,0 +1,281 @@
+"""Local stand-in of the Yahoo Finance spark endpoint, to load test the fetch path without spending API quota.
+
+StandInServer serves GET /v8/finance/spark?symbols=...&range=...&interval=... like the endpoint a
+StockHistoryRequestBuilder targets, and answers with the same JSON: one object per symbol with its timestamps and
+closing prices. The series are synthetic but shaped like real ones: bars only fall into the regular trading session
+of weekdays, and the prices follow a random walk with a level and volatility of their own for every ticker. The same
+request always gets the same series.
+
+Latency, failing responses and rate limiting can be configured, to see how a fetch strategy copes with a slow or
+overloaded API. Point a StockHistoryClient at the server with its url argument.
+
+Example:
+    >>> from caishen_stonks.standin import StandInServer
+    >>> from caishen_stonks.client import StockHistoryClient
+    >>> from caishen_stonks.constants import DateRange, StockInterval
+    >>> with StandInServer(latency=0.05, rate_limit=20.0) as server:  # doctest: +SKIP
+    ...     with StockHistoryClient(url=server.url) as client:
+    ...         history = client.fetch(["AAPL", "MSFT"], DateRange.oneYear, StockInterval.oneDay)
+"""
+from datetime import date
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import json
+import math
+import random
+import threading
+import time
+import zlib
+
+from .client import BATCH_SIZE
+from .constants import DATE_RANGE_SECONDS, INTERVAL_SECONDS, DateRange, StockInterval
+
+# The path the requests are served on, like RAPIDAPI_ENDPOINT
+ENDPOINT = "v8/finance/spark"
+# The regular trading session in UTC: 14:30 to 21:00, 390 minutes
+SESSION_OPEN = (14 * 60 + 30) * 60
+SESSION_SECONDS = 390 * 60
+# Status codes of the simulated server side failures
+ERROR_STATUS_CODES = (500, 502, 503)
+
+_DAY = 24 * 60 * 60
+_EPOCH = date(1970, 1, 1).toordinal()
+# Trading days every bar spans, which scale the volatility of a step of the random walk
+_TRADING_DAYS = {
+    StockInterval.oneMinute: 1 / 390,
+    StockInterval.fiveMinute: 5 / 390,
+    StockInterval.fifteenMinute: 15 / 390,
+    StockInterval.oneDay: 1.0,
+    StockInterval.oneWeek: 5.0,
+    StockInterval.oneMonth: 21.0,
+}
+
+
+def synthetic_history(symbol: str, date_range: DateRange, interval: StockInterval, now: int) -> Dict[str, Any]:
+    """Generates the spark response of one symbol
+
+    Args:
+        symbol (str): The stock ticker, which seeds the series
+        date_range (DateRange): The extent of the history, ending at "now"
+        interval (StockInterval): The interval of the bars
+        now (int): Unix timestamp of the end of the history
+
+    Returns:
+        Dict[str, Any]: The decoded JSON the endpoint returns for the symbol
+
+    Example:
+        >>> from caishen_stonks.standin import synthetic_history
+        >>> from caishen_stonks.constants import DateRange, StockInterval
+        >>> history = synthetic_history("AAPL", DateRange.fiveDay, StockInterval.oneDay, now=1617912000)
+        >>> len(history["timestamp"]), len(history["close"])
+        (4, 4)
+    """
+    timestamps = _timestamps(date_range, interval, now)
+    generator = random.Random(zlib.crc32(f"{symbol}/{interval.value}".encode()))
+    price = 10.0 * math.exp(generator.uniform(0.0, 4.0))
+    deviation = generator.uniform(0.01, 0.03) * math.sqrt(_TRADING_DAYS[interval])
+    drift = generator.uniform(-0.0002, 0.0005) * _TRADING_DAYS[interval]
+    close = []
+    for _ in timestamps:
+        price *= math.exp(generator.gauss(drift, deviation))
+        close.append(round(price, 4))
+    return {"symbol": symbol, "end": None, "start": None, "timestamp": timestamps, "close": close,
+            "previousClose": None, "chartPreviousClose": close[0] if close else None, "dataGranularity": 300}
+
+
+class StandInServer:
+    """Serves synthetic histories on the spark endpoint from a background thread.
+
+    Every request is delayed by "latency" plus a uniformly distributed part of up to "jitter" seconds. It then fails
+    with one of ERROR_STATUS_CODES with probability "error_rate". With a "rate_limit", the requests take tokens from a
+    bucket refilled with "rate_limit" tokens per second and holding up to "burst" of them. A request finding the bucket
+    empty is answered with 429 and a Retry-After header giving the seconds until the next token.
+
+    Args:
+        host (str, optional): The interface to listen on. Defaults to "127.0.0.1".
+        port (int, optional): The port to listen on, 0 picks a free one. Defaults to 0.
+        latency (float, optional): Seconds every response is delayed by. Defaults to 0.0.
+        jitter (float, optional): Most seconds added to the latency at random. Defaults to 0.0.
+        error_rate (float, optional): Fraction of the requests that fail. Defaults to 0.0.
+        rate_limit (float, optional): Requests per second allowed, None for no limit. Defaults to None.
+        burst (int, optional): Requests allowed at once before the rate limit applies. Defaults to the rate limit.
+        token (str, optional): The x-rapidapi-key requests have to send, None to accept any. Defaults to None.
+        now (int, optional): Unix timestamp the histories end at. Defaults to the time the server was created.
+        seed (int, optional): Seeds the latencies and failures. Defaults to None.
+
+    Raises:
+        ValueError: The error rate is not between 0 and 1, or the rate limit or burst are not positive
+
+    Attributes:
+        statistics (Dict[int, int]): The number of responses sent with every status code
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: Optional[float] = None, burst: Optional[int] = None,
+                 token: Optional[str] = None, now: Optional[int] = None, seed: Optional[int] = None):
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("The error rate has to be between 0 and 1, but it is set to " + str(error_rate))
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("The rate limit has to be positive, but it is set to " + str(rate_limit))
+        if burst is not None and burst < 1:
+            raise ValueError("The burst has to be a positive integer, but it is set to " + str(burst))
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst if burst is not None else max(1, int(rate_limit or 1))
+        self.token = token
+        self.now = int(time.time()) if now is None else now
+        self.statistics: Dict[int, int] = {}
+        self._random = random.Random(seed)
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = _HTTPServer((host, port), _Handler)
+        self._server.stand_in = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """The URL of the endpoint, to pass to StockHistoryClient"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{ENDPOINT}"
+
+    def start(self) -> "StandInServer":
+        """Starts serving from a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="stand-in-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the socket"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, path: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Returns the status code, headers and body of the response to a GET of "path"
+
+        The HTTP handler calls this for every request, after which the response is counted in statistics.
+        """
+        url = urlsplit(path)
+        if url.path.strip("/") != ENDPOINT:
+            return _error(404, "Unknown endpoint " + url.path)
+        if self.token is not None and headers.get("x-rapidapi-key") != self.token:
+            return _error(401, "Invalid API key")
+        query = parse_qs(url.query)
+        symbols = [symbol.upper() for symbol in ",".join(query.get("symbols", [])).split(",") if symbol]
+        if not 1 <= len(symbols) <= BATCH_SIZE:
+            return _error(400, f"Between 1 and {BATCH_SIZE} symbols have to be requested, but there are "
+                          + str(len(symbols)))
+        try:
+            date_range = DateRange(query.get("range", [""])[0])
+            interval = StockInterval(query.get("interval", [""])[0])
+        except ValueError as error:
+            return _error(400, str(error))
+
+        delay, retry_after, failed = self._admit()
+        time.sleep(delay)
+        if retry_after is not None:
+            return 429, {"Retry-After": str(retry_after)}, json.dumps({"message": "Too many requests"}).encode()
+        if failed is not None:
+            return _error(failed, "Simulated failure")
+        body = "{" + ",".join(_symbol_json(symbol, date_range, interval, self.now) for symbol in symbols) + "}"
+        return 200, {}, body.encode()
+
+    def _admit(self) -> Tuple[float, Optional[int], Optional[int]]:
+        # draws the delay and the failure of a request and takes its token from the bucket
+        with self._lock:
+            delay = self.latency + self._random.uniform(0.0, self.jitter)
+            failed = None
+            if self._random.random() < self.error_rate:
+                failed = self._random.choice(ERROR_STATUS_CODES)
+            if self.rate_limit is None:
+                return delay, None, failed
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens < 1.0:
+                return delay, max(1, math.ceil((1.0 - self._tokens) / self.rate_limit)), None
+            self._tokens -= 1.0
+            return delay, None, failed
+
+    def _count(self, status: int):
+        with self._lock:
+            self.statistics[status] = self.statistics.get(status, 0) + 1
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # load tests open many connections at once
+    request_queue_size = 256
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive, like the API, so clients reuse their connections
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        status, headers, body = stand_in.respond(self.path, {key.lower(): value for key, value in self.headers.items()})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        stand_in._count(status)
+
+    def log_message(self, format, *args):
+        # a load test would flood stderr with one line per request
+        pass
+
+
+@lru_cache(maxsize=4096)
+def _symbol_json(symbol: str, date_range: DateRange, interval: StockInterval, now: int) -> str:
+    # the encoded history of one symbol, cached since load tests request the same ones over and over
+    return json.dumps(symbol) + ":" + json.dumps(synthetic_history(symbol, date_range, interval, now))
+
+
+def _error(status: int, message: str) -> Tuple[int, Dict[str, str], bytes]:
+    return status, {}, json.dumps({"message": message}).encode()
+
+
+def _timestamps(date_range: DateRange, interval: StockInterval, now: int) -> List[int]:
+    # the bars of the trading sessions between now - date_range and now
+    start = now - DATE_RANGE_SECONDS[date_range]
+    timestamps = []
+    if interval == StockInterval.oneMonth:
+        day = date.fromordinal(_EPOCH + start // _DAY).replace(day=1)
+        while True:
+            timestamp = (day.toordinal() - _EPOCH) * _DAY + SESSION_OPEN
+            if timestamp > now:
+                return timestamps
+            if timestamp >= start:
+                timestamps.append(timestamp)
+            day = day.replace(year=day.year + day.month // 12, month=day.month % 12 + 1)
+    step = INTERVAL_SECONDS[interval]
+    for day in range(start // _DAY, now // _DAY + 1):
+        # 1970-01-01 was a Thursday, so (day + 3) % 7 counts the days since Monday
+        weekday = (day + 3) % 7
+        if weekday >= 5 or (interval == StockInterval.oneWeek and weekday != 0):
+            continue
+        opening = day * _DAY + SESSION_OPEN
+        if step >= _DAY:
+            bars = range(opening, opening + 1)
+        else:
+            bars = range(opening, opening + SESSION_SECONDS, step)
+        timestamps.extend(timestamp for timestamp in bars if start <= timestamp <= now)
+    return timestamps
@@ -2,6 +2,7 @@ from typing import List
 import os
 from .errors import InvalidInputError, MissingEnvVarError
 from .constants import DateRange, StockInterval
+from .instrumentation import instrumented
 
 
 class StockHistoryRequestBuilder:
@@ -27,6 +28,7 @@ class StockHistoryRequestBuilder:
         TypeError: Invalid interval type
         MissingEnvVarError: If RAPIDAPI_HOST or RAPIDAPI_ENDPOINT are missing
     """
+    @instrumented
     def __init__(self, tickers: List[str], date_range: DateRange, interval: StockInterval):
         self._validate(tickers, date_range, interval)
         self.conf = self._build_conf(tickers, date_range, interval)
@@ -0,0 +1,244 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+import math
+import mmap
+import os
+import threading
+import time
+
+from .client import StockHistoryClient
+from .constants import DATE_RANGE_SECONDS, INTERVAL_SECONDS, DateRange, StockInterval
+from .errors import InvalidInputError
+from .history import FIELDS, StockHistory
+from .resample import Resampler, can_resample
+
+
+class HistoryStore:
+    """Local on-disk store of stock histories, keyed by ticker and interval.
+
+    Every stored column of a history is a file of native 8 byte values in DIRECTORY/INTERVAL/TICKER/, e.g.
+    data/1d/AAPL/close. New bars are appended to the files, and only the bars that were fetched again are
+    overwritten. Reading maps the files into memory, so the returned StockHistory columns are views of the page cache
+    that are only loaded when they are used.
+
+    refresh only fetches what is missing: a ticker that was never stored is fetched for the whole "date_range", and a
+    stored ticker is fetched for the smallest DateRange that covers the time since its last stored bar.
+
+    load serves a DateRange from the stored bars, and aggregates stored bars of a finer interval when the requested
+    interval is not stored, e.g. fiveMinute bars from the stored oneMinute bars, so switching the interval needs no
+    fetch. The aggregation is incremental: later loads only aggregate the bars stored since.
+
+    Args:
+        directory (str): The directory holding the files. It is created when needed.
+        client (StockHistoryClient, optional): The client used to fetch missing bars. Defaults to a new client.
+
+    Example:
+        >>> from caishen_stonks.store import HistoryStore
+        >>> from caishen_stonks.constants import DateRange, StockInterval
+        >>> store = HistoryStore("data")  # doctest: +SKIP
+        >>> histories = store.refresh(["AAPL", "MSFT"], StockInterval.oneDay, DateRange.fiveYear)  # doctest: +SKIP
+        >>> store.read("AAPL", StockInterval.oneDay).close[-1]  # doctest: +SKIP
+        130.36
+    """
+
+    def __init__(self, directory: str, client: Optional[StockHistoryClient] = None):
+        self.directory = directory
+        self.client = client
+        self._lock = threading.RLock()
+        self._resamplers: Dict[Tuple[str, StockInterval, StockInterval, int], Resampler] = {}
+
+    def read(self, ticker: str, interval: StockInterval, start: Optional[int] = None,
+             end: Optional[int] = None) -> Optional[StockHistory]:
+        """Reads the stored bars of a ticker with start <= timestamp < end
+
+        Args:
+            ticker (str): The stock ticker
+            interval (StockInterval): The interval of the bars
+            start (int, optional): The first Unix timestamp to include. Defaults to the first stored bar.
+            end (int, optional): The Unix timestamp to stop before. Defaults to after the last stored bar.
+
+        Returns:
+            Optional[StockHistory]: The stored bars, or None if the ticker was never stored for this interval
+        """
+        path = self._path(ticker, interval)
+        with self._lock:
+            if not os.path.exists(os.path.join(path, "timestamp")):
+                return None
+            columns = {field: _map(os.path.join(path, field), "d") for field in FIELDS
+                       if os.path.exists(os.path.join(path, field))}
+            timestamp = _map(os.path.join(path, "timestamp"), "q")
+        # a write in progress in another process may have extended some columns already
+        rows = min(len(column) for column in list(columns.values()) + [timestamp])
+        columns = {field: column[:rows] for field, column in columns.items()}
+        return StockHistory(ticker, timestamp[:rows], **columns).between(start, end)
+
+    def last_timestamp(self, ticker: str, interval: StockInterval) -> Optional[int]:
+        """Returns the Unix timestamp of the last stored bar of a ticker, None if there is none"""
+        history = self.read(ticker, interval)
+        return history.timestamp[-1] if history is not None and len(history) > 0 else None
+
+    def load(self, ticker: str, interval: StockInterval, date_range: Optional[DateRange] = None,
+             now: Optional[float] = None, utc_offset: int = 0) -> Optional[StockHistory]:
+        """Returns the bars of a ticker in a DateRange from the store, without fetching
+
+        The bars stored for "interval" are used if there are any. Otherwise the stored bars of the coarsest finer
+        interval that covers the whole date range are aggregated with a Resampler.
+
+        Args:
+            ticker (str): The stock ticker
+            interval (StockInterval): The interval of the bars
+            date_range (DateRange, optional): The time before "now" to return the bars of. Defaults to all bars.
+            now (float, optional): The current Unix time. Defaults to time.time().
+            utc_offset (int, optional): The offset of the local time of the exchange from UTC in seconds, which
+                                        decides the sessions that bars are aggregated by. Defaults to 0.
+
+        Returns:
+            Optional[StockHistory]: The bars, or None if neither the interval nor a finer one covering the date range
+            is stored, in which case the bars have to be fetched
+        """
+        start = None
+        if date_range is not None:
+            start = int((time.time() if now is None else now) - DATE_RANGE_SECONDS[date_range])
+        stored = self.read(ticker, interval)
+        if stored is not None and len(stored) > 0:
+            return stored.between(start)
+
+        finer = sorted((source for source in StockInterval if can_resample(source, interval)),
+                       key=lambda source: -INTERVAL_SECONDS[source])
+        for source in finer:
+            history = self.read(ticker, source)
+            if history is None or len(history) == 0 or (start is not None and history.timestamp[0] > start):
+                continue
+            with self._lock:
+                key = (ticker, source, interval, utc_offset)
+                resampler = self._resamplers.get(key)
+                if resampler is None:
+                    resampler = self._resamplers[key] = Resampler(ticker, source, interval, utc_offset)
+                resampler.update(history.between(resampler.resume_timestamp))
+                return resampler.history().between(start)
+        return None
+
+    def write(self, history: StockHistory, interval: StockInterval):
+        """Merges bars into the stored history of their ticker
+
+        The stored bars from the first timestamp of "history" onwards are replaced by "history", so bars that were
+        still in progress when they were stored get their final values. The columns stored first for a ticker are
+        kept: columns missing from "history" are filled with NaN and other columns are not stored.
+
+        Args:
+            history (StockHistory): The bars to store, in ascending timestamp order
+            interval (StockInterval): The interval of the bars
+        """
+        if len(history) == 0:
+            return
+        path = self._path(history.symbol, interval)
+        with self._lock:
+            stored = self.read(history.symbol, interval)
+            if stored is None:
+                os.makedirs(path, exist_ok=True)
+                fields = [field for field in FIELDS if getattr(history, field) is not None]
+                position = 0
+            else:
+                fields = [field for field in FIELDS if getattr(stored, field) is not None]
+                position = bisect_left(stored.timestamp, history.timestamp[0])
+            new_columns = {field: _values(history, field) for field in fields}
+            new_columns["timestamp"] = history.timestamp
+
+            if stored is not None and position + len(history) < len(stored):
+                # the stored history is longer than the merged one: the files are replaced rather than truncated, as
+                # truncating a file that is mapped by a reader would crash the reader
+                for field, column in new_columns.items():
+                    merged = array("q" if field == "timestamp" else "d", getattr(stored, field)[:position])
+                    merged.frombytes(column.cast("B"))
+                    _replace(os.path.join(path, field), merged)
+            else:
+                # the timestamps are written last, so readers never see bars with missing prices
+                for field in fields + ["timestamp"]:
+                    _write_at(os.path.join(path, field), position, new_columns[field])
+
+    def refresh(self, tickers: List[str], interval: StockInterval, date_range: DateRange = DateRange.fiveYear,
+                max_age: Optional[float] = None, now: Optional[float] = None) -> Dict[str, Optional[StockHistory]]:
+        """Fetches the bars missing from the store and returns the stored histories
+
+        Args:
+            tickers (List[str]): The stock tickers
+            interval (StockInterval): The interval of the bars
+            date_range (DateRange, optional): The history to fetch for tickers that are not stored yet.
+                Defaults to DateRange.fiveYear.
+            max_age (float, optional): Tickers whose last stored bar is at most this many seconds old are not
+                fetched. Defaults to the length of one bar of "interval".
+            now (float, optional): The current Unix time. Defaults to time.time().
+
+        Returns:
+            Dict[str, Optional[StockHistory]]: The stored history of every ticker, None if the API had no data for it
+        """
+        now = time.time() if now is None else now
+        max_age = INTERVAL_SECONDS[interval] if max_age is None else max_age
+        groups: Dict[DateRange, List[str]] = {}
+        for ticker in dict.fromkeys(tickers):
+            last = self.last_timestamp(ticker, interval)
+            if last is None:
+                groups.setdefault(date_range, []).append(ticker)
+            elif now - last > max_age:
+                # the last stored bar is fetched again, as it may have been in progress when it was stored
+                gap = now - last + INTERVAL_SECONDS[interval]
+                groups.setdefault(covering_date_range(gap), []).append(ticker)
+
+        if groups and self.client is None:
+            self.client = StockHistoryClient()
+        for group_range, group in groups.items():
+            response = self.client.fetch(group, group_range, interval)
+            for history in StockHistory.from_response(response).values():
+                self.write(history, interval)
+        return {ticker: self.read(ticker, interval) for ticker in tickers}
+
+    def _path(self, ticker: str, interval: StockInterval) -> str:
+        if not isinstance(interval, StockInterval):
+            raise TypeError("Invalid interval type. Please use StockInterval class")
+        if not ticker or os.sep in ticker or ticker in (os.curdir, os.pardir):
+            raise InvalidInputError("Invalid ticker " + repr(ticker))
+        return os.path.join(self.directory, interval.value, ticker)
+
+
+def covering_date_range(seconds: float) -> DateRange:
+    """Returns the smallest DateRange covering at least "seconds", or the largest one if none does
+
+    Example:
+        >>> from caishen_stonks.store import covering_date_range
+        >>> covering_date_range(3 * 24 * 60 * 60)
+        <DateRange.fiveDay: '5d'>
+    """
+    for date_range, span in sorted(DATE_RANGE_SECONDS.items(), key=lambda item: item[1]):
+        if span >= seconds:
+            return date_range
+    return max(DATE_RANGE_SECONDS, key=DATE_RANGE_SECONDS.get)
+
+
+def _map(path: str, typecode: str) -> memoryview:
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size < 8:
+            return memoryview(array(typecode))
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    # the mapping stays open as long as a view of it is alive
+    return memoryview(mapped)[:size - size % 8].cast(typecode)
+
+
+def _values(history: StockHistory, field: str) -> memoryview:
+    column = getattr(history, field)
+    return column if column is not None else memoryview(array("d", [math.nan]) * len(history))
+
+
+def _write_at(path: str, position: int, column: memoryview):
+    mode = "r+b" if os.path.exists(path) else "wb"
+    with open(path, mode) as file:
+        file.seek(position * 8)
+        file.write(column)
+
+
+def _replace(path: str, column: array):
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(column)
+    os.replace(temporary, path)
@@ -1,9 +1,19 @@
-from typing import List, Tuple
+from array import array
+from typing import List, Optional, Tuple
 from .errors import InvalidInputError
-import statistics
+from .instrumentation import instrumented
+from .rolling import rolling_max, rolling_mean_std, rolling_min, rolling_sum
+from .workspace import Workspace, resize, scratch_list, unpack
+import math
 
+try:
+    from . import array_backend
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    array_backend = None
 
-def SMA(values: List[float], lookback: int = 14) -> List[float]:
+
+@instrumented
+def SMA(values: List[float], lookback: int = 14, out: Optional[List[float]] = None) -> List[float]:
     """Calculates Simple Moving Average (SMA) for a given lookback.
 
     The lookback determines the rolling window for which the averages are taken over. For example,
@@ -11,7 +21,12 @@ def SMA(values: List[float], lookback: int = 14) -> List[float]:
 
     Args:
         values (List[float]): The list of float values to average
+                                A numpy.ndarray is computed by array_backend instead and returns an ndarray,
+                                with NaN instead of -1 for the warm-up elements
         lookback (int, optional): The lookback. Defaults to 14.
+        out (List[float], optional): A list the result is written to instead of a new list, it is resized to the
+                                     length of the result. An ndarray of the shape of "values" for the array
+                                     path. Defaults to None.
 
     Raises:
         InvalidInputError: The list "values" must not be empty
@@ -35,20 +50,24 @@ def SMA(values: List[float], lookback: int = 14) -> List[float]:
         raise TypeError("The lookback is expected to be an int, but it's type is " + str(type(lookback)))
     if lookback < 0:
         raise ValueError("The lookback value has to be a non negative integer, but it is set to " + str(lookback))
+    if _is_array(values):
+        return array_backend.SMA(values, lookback, out)
 
-    result: List[float] = []
+    result = _buffer(out, max(len(values), lookback - 1))
 
     # calculate SMA for all values except the first lookback ones
     for i in range(lookback - 1):
-        result.append(-1)
-    for i in range(len(values) - lookback + 1):
-        average = sum(values[i:i + lookback]) / (1.0 * lookback)
-        result.append(average)
+        result[i] = -1
+    divisor = 1.0 * lookback
+    for i, total in enumerate(rolling_sum(values, lookback), lookback - 1):
+        result[i] = total / divisor
 
     return result
 
 
-def EMA(values: List[float], lookback: int = 12, smoothing: float = 2.0) -> List[float]:
+@instrumented
+def EMA(values: List[float], lookback: int = 12, smoothing: float = 2.0,
+        out: Optional[List[float]] = None) -> List[float]:
     """Calculates Exponential Moving Average (EMA) for a given lookback.
 
     The lookback determines the rolling window for which the averages are taken over. For example,
@@ -59,8 +78,13 @@ def EMA(values: List[float], lookback: int = 12, smoothing: float = 2.0) -> List
 
     Args:
         values (List[float]): The list of float values to average
+                                A numpy.ndarray is computed by array_backend instead and returns an ndarray,
+                                with NaN instead of -1 for the warm-up elements
         lookback (int, optional): The lookback. . Defaults to 12.
         smoothing (float, optional): Smoothing factor. Defaults to 2.0.
+        out (List[float], optional): A list the result is written to instead of a new list, it is resized to the
+                                     length of the result. An ndarray of the shape of "values" for the array
+                                     path. Defaults to None.
 
     Raises:
         InvalidInputError: The list "values" must not be empty
@@ -89,31 +113,172 @@ def EMA(values: List[float], lookback: int = 12, smoothing: float = 2.0) -> List
         raise TypeError("The smoothing value is expected to be a float, but it's type is " + str(smoothing))
     if smoothing < 0:
         raise ValueError("The smoothing value has to be a non negative float, but it is set to " + str(smoothing))
+    if _is_array(values):
+        return array_backend.EMA(values, lookback, smoothing, out)
 
-    result: List[float] = []
+    result = _buffer(out, max(len(values), lookback - 1))
     ema: float = values[0]
     # num_values_processed: int = 0
     multiplier: float = smoothing / (1.0 * (1 + lookback))
     # calculate EMA for all values except the first lookback # of values
     for i in range(lookback - 1):
-        result.append(-1)
+        result[i] = -1
     # The EMA of the first N elements is equal to their average
     if len(values) >= lookback:
         ema = sum(values[:lookback]) / (1.0 * (lookback))
-        result.append(ema)
-    for value in values[lookback:]:
-        ema = value * multiplier + ema * (1 - multiplier)
-        result.append(ema)
+        result[lookback - 1] = ema
+    for i in range(lookback, len(values)):
+        ema = values[i] * multiplier + ema * (1 - multiplier)
+        result[i] = ema
 
     return result
 
 
-def bollinger_bands(values: List[float], lookback: int = 20) -> Tuple[List[float], List[float], List[float]]:
+@instrumented
+def SMA_multi(values: List[float], lookbacks: List[int]) -> List[List[float]]:
+    """Calculates Simple Moving Averages (SMA) for several lookbacks at once, e.g. for a parameter sweep.
+
+    A prefix sum of "values" is built once, with compensated summation, and every window average is read from it,
+    so each lookback costs O(n) without re-scanning the values. Values holding a NaN or infinity are averaged by SMA
+    for every lookback instead, so only the windows containing them are affected.
+
+    Args:
+        values (List[float]): The list of float values to average
+                              A numpy.ndarray is computed by array_backend instead and returns a
+                              (lookbacks x values) ndarray, with NaN instead of -1 for the warm-up elements
+        lookbacks (List[int]): The lookbacks
+
+    Raises:
+        InvalidInputError: The list "values" must not be empty
+        TypeError: The lookbacks have to be ints
+        ValueError: The lookbacks have to be positive
+
+    Returns:
+        List[List[float]]: One list of SMA values for each lookback, in the order of "lookbacks".
+                           Each list is the same as SMA(values, lookback) returns, up to rounding
+
+    Example:
+        >>> from caishen_stonks.technical_indicators import SMA_multi
+        >>> SMA_multi([1.0, 2.0, 3.0, 4.0], [2, 3])
+        [[-1, 1.5, 2.5, 3.5], [-1, -1, 2.0, 3.0]]
+    """
+    # Error Checking
+    if len(values) == 0:
+        raise InvalidInputError("The length of the values list is 0. It should be at least 1")
+    for lookback in lookbacks:
+        if type(lookback) is not int:
+            raise TypeError("The lookback is expected to be an int, but it's type is " + str(type(lookback)))
+        if lookback < 1:
+            raise ValueError("The lookback value has to be a positive integer, but it is set to " + str(lookback))
+    if _is_array(values):
+        return array_backend.SMA_multi(values, lookbacks)
+    if not all(map(math.isfinite, values)):
+        # a prefix sum never recovers from a NaN or infinity, rolling sums only lose the windows containing them
+        return [_SMA(values, lookback) for lookback in lookbacks]
+
+    # prefix_total[i] + prefix_compensation[i] is the sum of values[:i]
+    prefix_total = [0.0]
+    prefix_compensation = [0.0]
+    total = 0.0
+    compensation = 0.0
+    for value in values:
+        new_total = total + value
+        if abs(total) >= abs(value):
+            compensation += (total - new_total) + value
+        else:
+            compensation += (value - new_total) + total
+        total = new_total
+        prefix_total.append(total)
+        prefix_compensation.append(compensation)
+
+    results: List[List[float]] = []
+    for lookback in lookbacks:
+        divisor = 1.0 * lookback
+        result: List[float] = [-1] * (lookback - 1)
+        result.extend(((prefix_total[i + lookback] - prefix_total[i])
+                       + (prefix_compensation[i + lookback] - prefix_compensation[i])) / divisor
+                      for i in range(len(values) - lookback + 1))
+        results.append(result)
+
+    return results
+
+
+@instrumented
+def EMA_multi(values: List[float], lookbacks: List[int], smoothing: float = 2.0) -> List[List[float]]:
+    """Calculates Exponential Moving Averages (EMA) for several lookbacks in a single pass over "values".
+
+    All the smoothing recurrences advance together, so the values are only traversed once.
+
+    Args:
+        values (List[float]): The list of float values to average
+                              A numpy.ndarray is computed by array_backend instead and returns a
+                              (lookbacks x values) ndarray, with NaN instead of -1 for the warm-up elements
+        lookbacks (List[int]): The lookbacks
+        smoothing (float, optional): Smoothing factor. Defaults to 2.0.
+
+    Raises:
+        InvalidInputError: The list "values" must not be empty
+        TypeError: The lookbacks have to be ints
+        ValueError: The lookbacks have to be positive
+        TypeError: The smoothing has to be a float
+        ValueError: The smoothing has to be non negative
+
+    Returns:
+        List[List[float]]: One list of EMA values for each lookback, in the order of "lookbacks".
+                           Each list is exactly what EMA(values, lookback, smoothing) returns
+
+    Example:
+        >>> from caishen_stonks.technical_indicators import EMA_multi
+        >>> EMA_multi([1.0, 2.0, 3.0, 4.0, 5.0], [2, 4])
+        [[-1, 1.5, 2.5, 3.5, 4.5], [-1, -1, -1, 2.5, 3.5]]
+    """
+    # Error Checking
+    if len(values) == 0:
+        raise InvalidInputError("The length of the values list is 0. It should be at least 1")
+    for lookback in lookbacks:
+        if type(lookback) is not int:
+            raise TypeError("The lookback is expected to be an int, but it's type is " + str(type(lookback)))
+        if lookback < 1:
+            raise ValueError("The lookback value has to be a positive integer, but it is set to " + str(lookback))
+    if type(smoothing) is not float:
+        raise TypeError("The smoothing value is expected to be a float, but it's type is " + str(smoothing))
+    if smoothing < 0:
+        raise ValueError("The smoothing value has to be a non negative float, but it is set to " + str(smoothing))
+    if _is_array(values):
+        return array_backend.EMA_multi(values, lookbacks, smoothing)
+
+    results: List[List[float]] = [[-1] * (lookback - 1) for lookback in lookbacks]
+    multipliers = [smoothing / (1.0 * (1 + lookback)) for lookback in lookbacks]
+    emas = [0.0] * len(lookbacks)
+    for i, value in enumerate(values):
+        for j, lookback in enumerate(lookbacks):
+            if i >= lookback:
+                ema = value * multipliers[j] + emas[j] * (1 - multipliers[j])
+            elif i == lookback - 1:
+                # The EMA of the first N elements is equal to their average
+                ema = sum(values[:lookback]) / (1.0 * (lookback))
+            else:
+                continue
+            emas[j] = ema
+            results[j].append(ema)
+
+    return results
+
+
+@instrumented
+def bollinger_bands(values: List[float], lookback: int = 20,
+                    out: Optional[Tuple[List[float], List[float], List[float]]] = None
+                    ) -> Tuple[List[float], List[float], List[float]]:
     """Calculates upper (avg + 2 * stdev), middle (avg) and lower (avg - 2 * stdev) bollinger bands
 
     Args:
         values (List[float]): The list of float values to bollinger band
+                                A numpy.ndarray is computed by array_backend instead and returns ndarrays,
+                                with NaN instead of -1 for the warm-up elements
         lookback (int, optional): The lookback. Defaults to 20.
+        out (Tuple[List[float], List[float], List[float]], optional): The lower, middle and upper band lists the
+                                                                      bands are written to instead of new lists.
+                                                                      Defaults to None.
 
     Raises:
         InvalidInputError: The list "values" must not be empty
@@ -139,25 +304,25 @@ def bollinger_bands(values: List[float], lookback: int = 20) -> Tuple[List[float
     if lookback < 0:
         raise ValueError(
             "The lookback value has to be a non negative integer, but it is set to " + str(lookback))
+    if _is_array(values):
+        return array_backend.bollinger_bands(values, lookback, out)
 
-    middle_band: List[float] = []
-    upper_band: List[float] = []
-    lower_band: List[float] = []
+    length = max(len(values), lookback - 1)
+    lower_band, middle_band, upper_band = (_buffer(band, length) for band in unpack(out, 3))
 
     for i in range(lookback - 1):
-        middle_band.append(-1)
-        upper_band.append(-1)
-        lower_band.append(-1)
-    for i in range(len(values) - lookback + 1):
-        average = sum(values[i:i + lookback]) / (1.0 * lookback)
-        stdev = statistics.pstdev(values[i:i + lookback])
-        middle_band.append(average)
-        upper_band.append(average + 2 * stdev)
-        lower_band.append(average - 2 * stdev)
+        middle_band[i] = -1
+        upper_band[i] = -1
+        lower_band[i] = -1
+    for i, (average, stdev) in enumerate(rolling_mean_std(values, lookback), lookback - 1):
+        middle_band[i] = average
+        upper_band[i] = average + 2 * stdev
+        lower_band[i] = average - 2 * stdev
 
     return lower_band, middle_band, upper_band
 
 
+@instrumented
 def fibonacci_retractments(start_price: float, end_price: float,
                            fibonacci_levels: List[float] = [0.236, 0.382, 0.5, 0.618, 0.764]) -> List[float]:
     """Calculates Fibonacci retractment levels for the given start price, end price and fibonacci levels
@@ -176,6 +341,8 @@ def fibonacci_retractments(start_price: float, end_price: float,
 
     Returns:
         List[float]: The values of Fibonacci retractment levels, in the order of the "fibonacci_levels" list
+                     If any of the arguments is a numpy.ndarray, array_backend broadcasts the start and end prices
+                     over the levels and returns an ndarray instead
 
     Example:
         >>> from caishen_dashboard.data_processing.technical_indicators import fibonacci_retractments
@@ -184,6 +351,9 @@ def fibonacci_retractments(start_price: float, end_price: float,
         >>> fibonacci_retractments(20.0, 10.0, [0.236,0.786])
         [12.36, 17.86]
     """
+    if _is_array(start_price) or _is_array(end_price) or _is_array(fibonacci_levels):
+        return array_backend.fibonacci_retractments(start_price, end_price, fibonacci_levels)
+
     # Error Checking
     if type(start_price) != float:
         raise TypeError("The start price is expected to be a float but it is " + str(start_price))
@@ -201,8 +371,9 @@ def fibonacci_retractments(start_price: float, end_price: float,
     return result
 
 
+@instrumented
 def SO(high_values: List[float], low_values: List[float], closing_values: List[float], K_lookback: int = 5,
-       D_lookback: int = 3) -> Tuple[List[float], List[float]]:
+       D_lookback: int = 3, out: Optional[Tuple[List[float], List[float]]] = None) -> Tuple[List[float], List[float]]:
     """Calculates stochastic oscillator for the provided stock.
 
     Args:
@@ -211,6 +382,8 @@ def SO(high_values: List[float], low_values: List[float], closing_values: List[f
         closing_values (float): The closing prices for the last N days.
         K_lookback (int, optional): lookback days for the last 5 days.
         D_lookback (int, optional): lookback days for the last 3 days.
+        out (Tuple[List[float], List[float]], optional): The lists the K and D scores are written to instead of new
+                                                         lists. Defaults to None.
     Raises:
         InvalidInputError: The length of the lists are not matching
         TypeError: closing_values must be list
@@ -220,6 +393,9 @@ def SO(high_values: List[float], low_values: List[float], closing_values: List[f
         TypeError: D_lookback must be int
     Returns:
         Tuple(float, float): K score & D score
+                             A window with no range (highest high equal to lowest low) has a K score of 50.0
+                             If any of the value lists is a numpy.ndarray, array_backend computes ndarrays
+                             aligned with the input instead, with NaN for the warm-up elements
     Example:
         >>> from caishen_dashboard.data_processing.technical_indicators import SO
         >>> SO([100.0, 101.0, 104.0, 105.0, 100.0, 110.0, 108.0, 97.0],
@@ -228,11 +404,11 @@ def SO(high_values: List[float], low_values: List[float], closing_values: List[f
         ([14.285714285714286, 66.66666666666667, 0.0, 12.5], [-1, -1, 26.984126984126988, 26.38888888888889])
     """
     # Error Checking
-    if type(closing_values) != list:
+    if not _is_sequence(closing_values):
         raise TypeError("The closing_values is expected to be a list")
-    if type(high_values) != list:
+    if not _is_sequence(high_values):
         raise TypeError("The high_values is expected to be a list")
-    if type(low_values) != list:
+    if not _is_sequence(low_values):
         raise TypeError("The low_values is expected to be a list")
     if (len(high_values) != len(low_values)) or (len(high_values) != len(closing_values)):
         raise InvalidInputError("The length of values are mismatching")
@@ -240,19 +416,27 @@ def SO(high_values: List[float], low_values: List[float], closing_values: List[f
         raise TypeError("The K_lookback is expected to be a int")
     if type(D_lookback) != int:
         raise TypeError("The D_lookback is expected to be a int")
-
-    K_list = []
-    for start, close in enumerate(closing_values[K_lookback - 1:]):
-        highest = max(high_values[start:start + K_lookback])
-        lowest = min(low_values[start:start + K_lookback])
-        K_score = 100.0 * (close - lowest) / (highest - lowest)
-        K_list.append(K_score)
-    D_list = SMA(K_list, D_lookback)
+    if _is_array(closing_values) or _is_array(high_values) or _is_array(low_values):
+        return array_backend.SO(high_values, low_values, closing_values, K_lookback, D_lookback, out)
+
+    K_out, D_out = unpack(out, 2)
+    K_list = _buffer(K_out, max(len(closing_values) - K_lookback + 1, 0))
+    for i, highest, lowest in zip(range(len(K_list)), rolling_max(high_values, K_lookback),
+                                  rolling_min(low_values, K_lookback)):
+        if highest == lowest:
+            # flat bars have no range to place the close in, so they are scored in the middle
+            K_score = 50.0
+        else:
+            K_score = 100.0 * (closing_values[i + K_lookback - 1] - lowest) / (highest - lowest)
+        K_list[i] = K_score
+    D_list = _SMA(K_list, D_lookback, out=D_out)
     return K_list, D_list
 
 
+@instrumented
 def MACD(values: List[float], MACD_lookback: Tuple[int, int] = (12, 26), MACD_smoothing: Tuple[float, float] = (2.0, 2.0),
-         signal_lookback: int = 9, signal_smoothing: float = 2.0) -> Tuple[List[float], List[float]]:
+         signal_lookback: int = 9, signal_smoothing: float = 2.0, out: Optional[Tuple[List[float], List[float]]] = None,
+         workspace: Optional[Workspace] = None) -> Tuple[List[float], List[float]]:
     """Calculates Moving Average Convergence Divergence for a stock
 
     MACD uses different SMAs to identify support and resistance levels. The MACD not only determines whether a trend is up
@@ -260,8 +444,13 @@ def MACD(values: List[float], MACD_lookback: Tuple[int, int] = (12, 26), MACD_sm
 
     Args:
         values (List[float]): list of closing stock prices
+                                A numpy.ndarray is computed by array_backend instead and returns ndarrays,
+                                with NaN instead of -1 for the warm-up elements
         MACD_lookback (Tuple[int, int], optional): the lookback values used for creating MACD line
         signal_lookback (int, optional): the lookback value used for signal line
+        out (Tuple[List[float], List[float]], optional): The lists the MACD and signal values are written to instead
+                                                         of new lists
+        workspace (Workspace, optional): Keeps the EMAs the MACD line is built from between calls
     Raises:
         TypeError: The signal lookback is expected to be integer
         TypeError: The MACD_lookback is expected to be a tuple
@@ -279,28 +468,38 @@ def MACD(values: List[float], MACD_lookback: Tuple[int, int] = (12, 26), MACD_sm
 0.1423200113378673, 0.11838744128603729, 0.1420905496552356, 0.17733876876491683, 0.23313404523052905])
     """
     # Error Checking
-    if type(values) != list:
+    if not _is_sequence(values):
         raise TypeError("The values is expected to be a list but it is " + str(values))
     if type(MACD_lookback) != tuple:
         raise TypeError("The MACD_lookback is expected to be a tuple but it is " + str(MACD_lookback))
     if type(signal_lookback) != int:
         raise TypeError("The signal lookback is expected to be integer but it is " + str(signal_lookback))
-
-    short_term = EMA(values, MACD_lookback[0], MACD_smoothing[0])
-    long_term = EMA(values, MACD_lookback[1], MACD_smoothing[1])
-    MACD_values = [x - y if y != -1 else -1 for x, y in zip(short_term, long_term)]
-    signal_values = [-1] * (MACD_lookback[1] - 1)
-    signal_values = signal_values + EMA(MACD_values[MACD_lookback[1] - 1:], signal_lookback, signal_smoothing)
+    if _is_array(values):
+        return array_backend.MACD(values, MACD_lookback, MACD_smoothing, signal_lookback, signal_smoothing, out,
+                                  workspace)
+
+    MACD_out, signal_out = unpack(out, 2)
+    short_term = _EMA(values, MACD_lookback[0], MACD_smoothing[0], out=scratch_list(workspace, "short_term"))
+    long_term = _EMA(values, MACD_lookback[1], MACD_smoothing[1], out=scratch_list(workspace, "long_term"))
+    MACD_values = _MACD_line(short_term, long_term, MACD_out)
+    signal_values = _signal_line(MACD_values, MACD_lookback[1], signal_lookback, signal_smoothing, signal_out,
+                                 workspace)
     return MACD_values, signal_values
 
 
-def RSI(values: List[float], lookback: int = 14) -> List[float]:
+@instrumented
+def RSI(values: List[float], lookback: int = 14, out: Optional[List[float]] = None,
+        workspace: Optional[Workspace] = None) -> List[float]:
     """Calculates Relative Strength Index for a stock
 
     The length of the provided list provides an implicit lookback period.
 
     Args:
         values (List[float]): list of closing stock prices
+                                A numpy.ndarray is computed by array_backend instead and returns an ndarray,
+                                with NaN instead of -1 for the warm-up elements
+        out (List[float], optional): A list the scores are written to instead of a new list
+        workspace (Workspace, optional): Keeps the gains, losses and their averages between calls
     Raises:
         TypeError: The values is expected to be a list
 
@@ -313,32 +512,105 @@ def RSI(values: List[float], lookback: int = 14) -> List[float]:
         [-1, -1, 0.0, 57.14285714285715, 28.57142857142857]
     """
     # Error Checking
-    if type(values) != list:
+    if not _is_sequence(values):
         raise TypeError("The values is expected to be a list but it is " + str(values))
-
-    gain = [0.0]
-    loss = [0.0]
+    if _is_array(values):
+        return array_backend.RSI(values, lookback, out, workspace)
+
+    gain, loss = _gains_losses(values, (scratch_list(workspace, "gain"), scratch_list(workspace, "loss")))
+    average_gain = _SMA(gain, lookback, out=scratch_list(workspace, "average_gain"))
+    average_loss = _SMA(loss, lookback, out=scratch_list(workspace, "average_loss"))
+    return _RSI_from_averages(average_gain, average_loss, out)
+
+
+# The building blocks of MACD and RSI below are shared with plan.IndicatorPlan, which evaluates them once for
+# every indicator that needs them. They dispatch to array_backend like the public functions.
+
+def _MACD_line(short_term: List[float], long_term: List[float], out: Optional[List[float]] = None) -> List[float]:
+    if _is_array(long_term):
+        return array_backend._MACD_line(short_term, long_term, out)
+    if out is None:
+        return [x - y if y != -1 else -1 for x, y in zip(short_term, long_term)]
+    resize(out, min(len(short_term), len(long_term)))
+    for i, (x, y) in enumerate(zip(short_term, long_term)):
+        out[i] = x - y if y != -1 else -1
+    return out
+
+
+def _signal_line(MACD_values: List[float], long_lookback: int, signal_lookback: int, signal_smoothing: float,
+                 out: Optional[List[float]] = None, workspace: Optional[Workspace] = None) -> List[float]:
+    if _is_array(MACD_values):
+        return array_backend._signal_line(MACD_values, long_lookback, signal_lookback, signal_smoothing, out)
+    if workspace is None:
+        tail = MACD_values[long_lookback - 1:]
+    else:
+        # the MACD values the signal line is averaged from are copied into the workspace instead of a new slice
+        tail = resize(workspace.list("MACD_tail"), max(len(MACD_values) - long_lookback + 1, 0))
+        for i in range(len(tail)):
+            tail[i] = MACD_values[i + long_lookback - 1]
+    average = _EMA(tail, signal_lookback, signal_smoothing, out=scratch_list(workspace, "signal_EMA"))
+    if out is None:
+        return [-1] * (long_lookback - 1) + average
+    resize(out, long_lookback - 1 + len(average))
+    for i in range(long_lookback - 1):
+        out[i] = -1
+    out[long_lookback - 1:] = average
+    return out
+
+
+def _gains_losses(values: List[float],
+                  out: Optional[Tuple[List[float], List[float]]] = None) -> Tuple[List[float], List[float]]:
+    if _is_array(values):
+        return array_backend._gains_losses(values, out)
+    gain, loss = (_buffer(buffer, len(values)) for buffer in unpack(out, 2))
+    gain[0] = 0.0
+    loss[0] = 0.0
 
     previous = values[0]
-    for current in values[1:]:
+    for i in range(1, len(values)):
+        current = values[i]
         change = current - previous
         if change >= 0:
-            gain.append(change)
-            loss.append(0.0)
+            gain[i] = change
+            loss[i] = 0.0
         else:
-            gain.append(0.0)
-            loss.append(abs(change))
+            gain[i] = 0.0
+            loss[i] = abs(change)
         previous = current
+    return gain, loss
+
 
-    average_gain = SMA(gain, lookback)
-    average_loss = SMA(loss, lookback)
-    output = []
-    for x, y in zip(average_gain, average_loss):
+def _RSI_from_averages(average_gain: List[float], average_loss: List[float],
+                       out: Optional[List[float]] = None) -> List[float]:
+    if _is_array(average_loss):
+        return array_backend._RSI_from_averages(average_gain, average_loss, out)
+    output = _buffer(out, min(len(average_gain), len(average_loss)))
+    for i, (x, y) in enumerate(zip(average_gain, average_loss)):
         if y == -1:
-            output.append(-1)
+            output[i] = -1
         elif y == 0:
-            output.append(0.0)
+            output[i] = 0.0
         else:
-            output.append(100 - 100 / (1 + x / y))
+            output[i] = 100 - 100 / (1 + x / y)
 
     return output
+
+
+def _buffer(out: Optional[List[float]], length: int) -> List[float]:
+    # the list an indicator writes its result to, padded with -1 for the warm-up elements
+    return [-1] * length if out is None else resize(out, length)
+
+
+def _is_array(values) -> bool:
+    return array_backend is not None and array_backend.is_array(values)
+
+
+def _is_sequence(values) -> bool:
+    # buffers like the columns of a StockHistory are read in place by the list implementations
+    return isinstance(values, (list, array, memoryview)) or _is_array(values)
+
+
+# The indicators without their instrumented wrapper. The composite indicators call these, so only the outer call is
+# recorded and the nested calls skip the wrapper also while instrumentation is disabled
+_SMA = SMA.__wrapped__
+_EMA = EMA.__wrapped__
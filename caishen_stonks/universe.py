@@ -0,0 +1,169 @@
+"""Indicators for a whole universe of tickers, computed on a pool of processes.
+
+The technical_indicators functions are pure Python, so a single process computes one ticker at a time. scan spreads the
+tickers over a process pool instead. The prices of all tickers are copied once into one shared memory block, which the
+workers map when they start, so a task only carries the positions of its tickers in the block. The tickers are
+handed out in small chunks, longest histories first, and an idle worker takes the next chunk, which keeps all workers
+busy until the end. Results are yielded as soon as their chunk is done.
+
+Every ticker is evaluated by an IndicatorPlan, so indicators sharing intermediate results compute them once.
+"""
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+import os
+
+from .history import StockHistory
+from .plan import IndicatorPlan
+
+# The indicators of the nightly job: (IndicatorPlan method, its keyword arguments)
+DEFAULT_INDICATORS = (("MACD", {}), ("RSI", {}), ("SO", {}), ("bollinger_bands", {}))
+# The default indicators of tickers with closing prices only, SO needs the high and low prices
+CLOSE_INDICATORS = tuple((method, arguments) for method, arguments in DEFAULT_INDICATORS if method != "SO")
+
+# Offsets of a ticker in the shared block: (close, high, low, length), -1 for a column that is missing
+_Layout = Tuple[int, int, int, int]
+
+# The close, high and low prices of a ticker, the latter two are optional
+_Columns = Tuple[Sequence[float], Optional[Sequence[float]], Optional[Sequence[float]]]
+
+# The plan of the tickers with high and low prices and, for the default indicators, the plan of the others
+_Plans = Tuple[IndicatorPlan, Optional[IndicatorPlan]]
+
+# State of a worker process, set up once by _initialize
+_worker: Dict[str, Any] = {}
+
+
+def scan(histories: Mapping[str, Union[StockHistory, Sequence[float]]],
+         indicators: Optional[Sequence[Tuple[str, Dict[str, Any]]]] = None, processes: Optional[int] = None,
+         chunk_size: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Computes indicators for every ticker, yielding the results as they are done
+
+    Args:
+        histories (Mapping[str, Union[StockHistory, Sequence[float]]]): The history of every ticker, or only its
+            closing prices
+        indicators (Sequence[Tuple[str, Dict[str, Any]]], optional): The indicators as (name of an IndicatorPlan
+            method, keyword arguments of the method). Defaults to DEFAULT_INDICATORS, or CLOSE_INDICATORS for the
+            tickers without high and low prices.
+        processes (int, optional): The number of worker processes. 0 or 1 computes everything in this process, which
+            is the easiest to debug. Defaults to the number of CPUs.
+        chunk_size (int, optional): The number of tickers per task. Defaults to about 8 tasks per process.
+
+    Raises:
+        AttributeError: An indicator is not an IndicatorPlan method
+        InvalidInputError: SO is requested for a ticker without high and low prices
+
+    Yields:
+        Tuple[str, Dict[str, Any]]: A ticker and its indicators, keyed by the names IndicatorPlan gives them. The
+        tickers are yielded in the order they are done.
+
+    Example:
+        >>> from caishen_stonks.universe import scan
+        >>> histories = {"AAPL": [1.0, 2.0, 3.0, 4.0], "MSFT": [4.0, 3.0, 2.0, 1.0]}
+        >>> sorted(scan(histories, [("SMA", {"lookback": 2})], processes=0))
+        [('AAPL', {'SMA(2)': [-1, 1.5, 2.5, 3.5]}), ('MSFT', {'SMA(2)': [-1, 3.5, 2.5, 1.5]})]
+    """
+    if indicators is not None:
+        indicators = tuple((method, dict(arguments)) for method, arguments in indicators)
+    plans = _build_plans(indicators)
+    processes = (os.cpu_count() or 1) if processes is None else processes
+    if processes <= 1 or len(histories) <= 1:
+        for ticker, history in histories.items():
+            yield ticker, _evaluate(plans, *_columns(history))
+        return
+
+    # longest histories first, so the last chunks are the short ones
+    order = sorted(histories, key=lambda ticker: -len(_columns(histories[ticker])[0]))
+    chunk_size = chunk_size or max(1, -(-len(order) // (processes * 8)))
+    shared, layouts = _share(histories, order)
+    try:
+        with ProcessPoolExecutor(processes, initializer=_initialize, initargs=(shared.name, indicators)) as pool:
+            chunks = iter([[(ticker, layouts[ticker]) for ticker in order[start:start + chunk_size]]
+                           for start in range(0, len(order), chunk_size)])
+            # a few chunks are queued per process, further ones are submitted as chunks finish
+            pending = {pool.submit(_scan_chunk, chunk) for chunk in islice(chunks, 2 * processes)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        pending.add(pool.submit(_scan_chunk, chunk))
+                    yield from future.result()
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def _build_plan(indicators: Tuple[Tuple[str, Dict[str, Any]], ...]) -> IndicatorPlan:
+    plan = IndicatorPlan()
+    for method, arguments in indicators:
+        getattr(plan, method)(**arguments)
+    return plan
+
+
+def _build_plans(indicators: Optional[Tuple[Tuple[str, Dict[str, Any]], ...]]) -> _Plans:
+    if indicators is None:
+        return _build_plan(DEFAULT_INDICATORS), _build_plan(CLOSE_INDICATORS)
+    return _build_plan(indicators), None
+
+
+def _evaluate(plans: _Plans, close: Sequence[float],
+              high: Optional[Sequence[float]], low: Optional[Sequence[float]]) -> Dict[str, Any]:
+    plan, close_plan = plans
+    if close_plan is not None and (high is None or low is None):
+        plan = close_plan
+    return plan.evaluate(close, high, low)
+
+
+def _columns(history: Union[StockHistory, Sequence[float]]) -> _Columns:
+    if isinstance(history, StockHistory):
+        return history.close, history.high, history.low
+    return history, None, None
+
+
+def _share(histories: Mapping[str, Union[StockHistory, Sequence[float]]],
+           order: List[str]) -> Tuple[SharedMemory, Dict[str, _Layout]]:
+    # every column of every ticker is copied into one block of doubles
+    layouts: Dict[str, _Layout] = {}
+    size = 0
+    for ticker in order:
+        close, high, low = _columns(histories[ticker])
+        length = len(close)
+        offsets = []
+        for column in (close, high, low):
+            offsets.append(-1 if column is None else size)
+            size += 0 if column is None else length
+        layouts[ticker] = (offsets[0], offsets[1], offsets[2], length)
+
+    shared = SharedMemory(create=True, size=max(8, size * 8))
+    prices = shared.buf.cast("d")
+    try:
+        for ticker in order:
+            layout = layouts[ticker]
+            for column, offset in zip(_columns(histories[ticker]), layout[:3]):
+                if column is not None:
+                    if not isinstance(column, memoryview):
+                        column = memoryview(array("d", column))
+                    prices[offset:offset + layout[3]] = column
+    finally:
+        prices.release()
+    return shared, layouts
+
+
+def _initialize(name: str, indicators: Optional[Tuple[Tuple[str, Dict[str, Any]], ...]]):
+    # the workers share the resource tracker of the parent process, which unlinks the block when the scan is over
+    shared = SharedMemory(name=name)
+    _worker["shared"] = shared
+    _worker["prices"] = shared.buf.cast("d")
+    _worker["plans"] = _build_plans(indicators)
+
+
+def _scan_chunk(chunk: List[Tuple[str, _Layout]]) -> List[Tuple[str, Dict[str, Any]]]:
+    prices = _worker["prices"]
+    results = []
+    for ticker, (close, high, low, length) in chunk:
+        columns = [None if offset < 0 else prices[offset:offset + length] for offset in (close, high, low)]
+        results.append((ticker, _evaluate(_worker["plans"], *columns)))
+    return results
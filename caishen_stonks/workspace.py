@@ -0,0 +1,87 @@
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Tuple
+from .errors import InvalidInputError
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+
+class Workspace:
+    """Scratch buffers that the technical indicators reuse for their intermediates across calls.
+
+    MACD keeps its short and long term EMAs here, and RSI its gains, losses and their averages. Passing the same
+    workspace, together with out buffers for the results, to every recomputation of an indicator means that only the
+    first call allocates its lists or arrays. The later ones resize and overwrite them in place.
+
+    The buffers are shared by every indicator the workspace is passed to and are overwritten by the next call, so a
+    workspace must not be used by two threads at once.
+
+    Example:
+        >>> from caishen_stonks.workspace import Workspace
+        >>> from caishen_stonks.technical_indicators import RSI
+        >>> workspace = Workspace()
+        >>> scores = []
+        >>> RSI([1.0, 1.2, 1.4, 1.1, 0.9], 3, out=scores, workspace=workspace) is scores
+        True
+        >>> scores
+        [-1, -1, 0.0, 57.14285714285715, 28.57142857142857]
+        >>> sorted(workspace.names)
+        ['average_gain', 'average_loss', 'gain', 'loss']
+    """
+
+    __slots__ = ("_buffers",)
+
+    def __init__(self):
+        self._buffers: Dict[str, Any] = {}
+
+    @property
+    def names(self) -> List[str]:
+        """The names of the buffers allocated so far"""
+        return list(self._buffers)
+
+    def list(self, name: str) -> List[float]:
+        """Returns the list buffer called "name", which the indicator resizes to the length it needs"""
+        buffer = self._buffers.get(name)
+        if type(buffer) is not list:
+            buffer = self._buffers[name] = []
+        return buffer
+
+    def array(self, name: str, shape: Tuple[int, ...]) -> "np.ndarray":
+        """Returns the float array buffer called "name" with the given shape, reallocating it when the shape changes"""
+        buffer = self._buffers.get(name)
+        if buffer is None or type(buffer) is list or buffer.shape != shape:
+            buffer = self._buffers[name] = np.empty(shape)
+        return buffer
+
+
+def resize(buffer: List[float], length: int) -> List[float]:
+    """Resizes the list "buffer" in place to "length" elements, padding it with -1"""
+    if type(buffer) is not list:
+        raise TypeError("The out buffer is expected to be a list, but it's type is " + str(type(buffer)))
+    if len(buffer) > length:
+        del buffer[length:]
+    elif len(buffer) < length:
+        buffer.extend(repeat(-1, length - len(buffer)))
+    return buffer
+
+
+def unpack(out: Optional[Tuple[Any, ...]], count: int) -> Tuple[Any, ...]:
+    """Returns the "count" out buffers of an indicator with several results, None for each if "out" is None"""
+    if out is None:
+        return (None,) * count
+    if len(out) != count:
+        raise InvalidInputError("The out buffers are expected to be " + str(count) + " buffers, but there are "
+                                + str(len(out)))
+    return tuple(out)
+
+
+def scratch_list(workspace: Optional[Workspace], name: str) -> Optional[List[float]]:
+    """Returns the list buffer called "name" of the workspace, or None to have a new list allocated"""
+    return None if workspace is None else workspace.list(name)
+
+
+def scratch_array(workspace: Optional[Workspace], name: str, shape: Tuple[int, ...]) -> Optional["np.ndarray"]:
+    """Returns the array buffer called "name" of the workspace, or None to have a new array allocated"""
+    return None if workspace is None else workspace.array(name, shape)
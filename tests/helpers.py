@@ -0,0 +1,13 @@
+import math
+import random
+
+
+def random_walk(length, seed, digits=None):
+    # daily closing prices with 1% volatility, rounded to "digits" decimals if it is given
+    generator = random.Random(seed)
+    price = 100.0
+    values = []
+    for _ in range(length):
+        price *= math.exp(generator.gauss(0.0, 0.01))
+        values.append(price if digits is None else round(price, digits))
+    return values
@@ -0,0 +1,152 @@
+from caishen_stonks import technical_indicators as TI
+from caishen_stonks.errors import InvalidInputError
+from caishen_stonks.workspace import Workspace
+from tests.helpers import random_walk
+import math
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def _as_expected(values):
+    return np.array([np.nan if x == -1 else x for x in values])
+
+
+@pytest.mark.parametrize("lookback", [1, 3, 20])
+def test_SMA_matches_list(lookback):
+    values = random_walk(500, lookback)
+    output = TI.SMA(np.array(values), lookback)
+    assert isinstance(output, np.ndarray)
+    np.testing.assert_allclose(output, _as_expected(TI.SMA(values, lookback)), rtol=1e-10)
+
+
+@pytest.mark.parametrize("lookback", [1, 4, 26, 200])
+def test_EMA_matches_list(lookback):
+    values = random_walk(5000, lookback)
+    output = TI.EMA(np.array(values), lookback, 2.0)
+    np.testing.assert_allclose(output, _as_expected(TI.EMA(values, lookback, 2.0)), rtol=1e-10)
+
+
+def test_EMA_calculations():
+    output = TI.EMA(np.array([1.0, 2.0, 3.0, 4.0, 5.0]), 4, 2.0)
+    np.testing.assert_allclose(output, [np.nan, np.nan, np.nan, 2.5, 3.5])
+
+
+def test_EMA_shorter_than_lookback():
+    output = TI.EMA(np.array([1.0, 2.0]), 4, 2.0)
+    assert output.shape == (2,)
+    assert np.isnan(output).all()
+
+
+@pytest.mark.parametrize("lookback", [2, 20])
+def test_bollinger_bands_matches_list(lookback):
+    values = random_walk(500, lookback)
+    output = TI.bollinger_bands(np.array(values), lookback)
+    for band, expected_band in zip(output, TI.bollinger_bands(values, lookback)):
+        np.testing.assert_allclose(band, _as_expected(expected_band), rtol=1e-10)
+
+
+def test_fibonacci_retractments_arrays():
+    output = TI.fibonacci_retractments(np.array([10.0, 20.0]), np.array([20.0, 10.0]), np.array([0.236, 0.764]))
+    np.testing.assert_allclose(output, [[17.64, 12.36], [12.36, 17.64]])
+
+
+def test_stochastic_oscillator_matches_list():
+    high_values = [100.0, 101.0, 104.0, 105.0, 100.0, 110.0, 108.0, 97.0]
+    low_values = [99.0, 100.0, 99.0, 102.0, 98.0, 105.0, 95.0, 94.0]
+    closing_values = [100.50, 100.50, 103.0, 104.0, 99.0, 106.0, 95.0, 96.0]
+    K_values, D_values = TI.SO(np.array(high_values), np.array(low_values), np.array(closing_values), 5, 3)
+    expected_K, expected_D = TI.SO(high_values, low_values, closing_values, 5, 3)
+    np.testing.assert_allclose(K_values, [np.nan] * 4 + expected_K)
+    np.testing.assert_allclose(D_values, [np.nan] * 4 + list(_as_expected(expected_D)))
+
+
+def test_stochastic_oscillator_flat_bars():
+    flat = np.full(6, 10.0)
+    K_values, D_values = TI.SO(flat, flat, flat, 3, 2)
+    np.testing.assert_allclose(K_values, [np.nan, np.nan, 50.0, 50.0, 50.0, 50.0])
+
+
+def test_MACD_matches_list():
+    values = random_walk(1000, 7)
+    output = TI.MACD(np.array(values))
+    for line, expected_line in zip(output, TI.MACD(values)):
+        np.testing.assert_allclose(line, _as_expected(expected_line), rtol=1e-9, atol=1e-12)
+
+
+def test_RSI_matches_list():
+    values = [1.0, 1.2, 1.4, 1.1, 0.9]
+    output = TI.RSI(np.array(values), 3)
+    np.testing.assert_allclose(output, [np.nan, np.nan, 0.0, 57.1428571, 28.5714286], rtol=1e-6)
+    values = random_walk(1000, 14)
+    np.testing.assert_allclose(TI.RSI(np.array(values), 14), _as_expected(TI.RSI(values, 14)), rtol=1e-9)
+
+
+def test_NaN_only_affects_its_windows():
+    values = random_walk(400, 3)
+    values[40] = values[300] = math.nan
+    high_values = [value * 1.01 for value in values]
+    low_values = [value * 0.99 for value in values]
+    output = TI.SMA(np.array(values), 20)
+    np.testing.assert_allclose(output, _as_expected(TI.SMA(values, 20)), rtol=1e-10)
+    assert np.isnan(output).sum() == 19 + 2 * 20
+    for band, expected_band in zip(TI.bollinger_bands(np.array(values), 20), TI.bollinger_bands(values, 20)):
+        np.testing.assert_allclose(band, _as_expected(expected_band), rtol=1e-10)
+    K_values, D_values = TI.SO(np.array(high_values), np.array(low_values), np.array(values), 14, 3)
+    expected_K, expected_D = TI.SO(high_values, low_values, values, 14, 3)
+    np.testing.assert_allclose(K_values, [np.nan] * 13 + expected_K, rtol=1e-10)
+    np.testing.assert_allclose(D_values, [np.nan] * 13 + list(_as_expected(expected_D)), rtol=1e-10)
+    assert np.isnan(D_values).sum() == 13 + 2 + 2 * 16
+    np.testing.assert_allclose(TI.SMA_multi(np.array(values), [5, 20])[1], output, rtol=1e-10)
+
+
+def test_two_dimensional_values():
+    with pytest.raises(Exception) as ex:
+        TI.SMA(np.ones((3, 2)), 2)
+    assert "The values array is expected to be one dimensional" in str(ex.value)
+
+
+def test_SMA_multi_matches_SMA():
+    values = np.array(random_walk(1000, 21))
+    lookbacks = [1, 5, 20, 250]
+    output = TI.SMA_multi(values, lookbacks)
+    assert output.shape == (4, 1000)
+    for row, lookback in zip(output, lookbacks):
+        np.testing.assert_allclose(row, TI.SMA(values, lookback), rtol=1e-12)
+
+
+def test_EMA_multi_matches_EMA():
+    values = np.array(random_walk(5000, 22))
+    lookbacks = [1, 5, 12, 26, 100]
+    output = TI.EMA_multi(values, lookbacks, 2.0)
+    assert output.shape == (5, 5000)
+    for row, lookback in zip(output, lookbacks):
+        np.testing.assert_allclose(row, TI.EMA(values, lookback, 2.0), rtol=1e-10)
+
+
+def test_EMA_multi_shorter_than_lookbacks():
+    output = TI.EMA_multi(np.array([1.0, 2.0, 3.0]), [2, 5], 2.0)
+    np.testing.assert_allclose(output, [[np.nan, 1.5, 2.5], [np.nan, np.nan, np.nan]])
+
+
+def test_out_arrays_are_written_in_place():
+    values = np.array(random_walk(500, 23))
+    high_values, low_values = values + 1.0, values - 1.5
+    workspace = Workspace()
+    SMA_out, RSI_out = np.zeros(500), np.zeros(500)
+    bands, scores, MACD_out = tuple(np.zeros(500) for _ in range(3)), (np.zeros(500), np.zeros(500)), \
+        (np.zeros(500), np.zeros(500))
+    for _ in range(2):
+        assert TI.SMA(values, 20, out=SMA_out) is SMA_out
+        np.testing.assert_array_equal(SMA_out, TI.SMA(values, 20))
+        np.testing.assert_array_equal(TI.bollinger_bands(values, 20, out=bands), TI.bollinger_bands(values, 20))
+        np.testing.assert_array_equal(TI.SO(high_values, low_values, values, out=scores),
+                                      TI.SO(high_values, low_values, values))
+        assert TI.MACD(values, out=MACD_out, workspace=workspace)[1] is MACD_out[1]
+        np.testing.assert_array_equal(MACD_out, TI.MACD(values))
+        np.testing.assert_array_equal(TI.RSI(values, out=RSI_out, workspace=workspace), TI.RSI(values))
+    buffers = {name: workspace.array(name, (500,)) for name in workspace.names}
+    TI.RSI(values, out=RSI_out, workspace=workspace)
+    assert all(workspace.array(name, (500,)) is buffer for name, buffer in buffers.items())
+    with pytest.raises(InvalidInputError):
+        TI.EMA(values, 12, out=np.zeros(499))
@@ -0,0 +1,102 @@
+from caishen_stonks import backtest
+from caishen_stonks import technical_indicators as TI
+from caishen_stonks.errors import InvalidInputError
+import numpy as np
+import pytest
+
+
+def _prices(bars=300, seed=5):
+    generator = np.random.default_rng(seed)
+    return 100.0 * np.exp(np.cumsum(generator.normal(0.0005, 0.015, bars)))
+
+
+def _loop_backtest(prices, position, cost):
+    # the per bar reference implementation
+    equity = [1.0 - abs(position[0]) * cost]
+    for bar in range(1, len(prices)):
+        change = abs(position[bar] - position[bar - 1])
+        equity.append(equity[-1] * (1.0 + position[bar - 1] * (prices[bar] / prices[bar - 1] - 1.0) - change * cost))
+    return equity
+
+
+def test_positions_hold_from_entry_until_exit():
+    entries = np.array([0, 1, 0, 1, 0, 0, 1, 1], dtype=bool)
+    exits = np.array([1, 0, 0, 0, 1, 0, 0, 1], dtype=bool)
+    assert backtest.positions(entries, exits).tolist() == [0, 1, 1, 1, 0, 0, 1, 0]
+    matrix = backtest.positions(np.column_stack([entries, exits]), np.column_stack([exits, entries]))
+    assert matrix[:, 0].tolist() == [0, 1, 1, 1, 0, 0, 1, 0]
+    assert matrix[:, 1].tolist() == [1, 0, 0, 0, 1, 1, 0, 0]
+
+
+def test_warm_up_never_trades():
+    prices = list(_prices(60))
+    fast, slow = TI.SMA(prices, 5), TI.SMA(prices, 20)
+    entries, exits = backtest.crossover_signals(fast, slow)
+    assert not entries[:20].any() and not exits[:20].any()
+    # the -1 sentinel of the lists and the NaN of the ndarrays give the same signals
+    array_entries, array_exits = backtest.crossover_signals(TI.SMA(np.array(prices), 5), TI.SMA(np.array(prices), 20))
+    assert (entries == array_entries).all() and (exits == array_exits).all()
+    entries, _ = backtest.threshold_signals(TI.RSI(prices, 14), 101.0, 200.0)
+    assert not entries[:13].any() and entries[13:].all()
+
+
+def test_equity_matches_a_loop_with_costs():
+    prices = _prices()
+    position = backtest.positions(*backtest.crossover_signals(TI.EMA(prices, 10), TI.EMA(prices, 30)))
+    result = backtest.backtest(prices, position, fee=0.001, slippage=0.0005)
+    assert result.equity[:, 0] == pytest.approx(_loop_backtest(prices, position, 0.0015))
+    assert result.trades[0] == np.count_nonzero(np.diff(position, prepend=0.0))
+    assert result.trades[0] > 2
+
+
+def test_metrics():
+    prices = 100.0 * 1.001 ** np.arange(253)
+    result = backtest.backtest(prices, np.ones(253))
+    assert result.cagr[0] == pytest.approx(1.001 ** 252 - 1.0)
+    assert result.max_drawdown[0] == 0.0
+    assert np.isnan(backtest.backtest(np.ones(10), np.ones(10)).sharpe[0])
+
+    prices = np.array([100.0, 120.0, 90.0, 110.0, 60.0, 80.0])
+    result = backtest.backtest(prices, np.ones(6), periods_per_year=5)
+    assert result.max_drawdown[0] == pytest.approx(0.5)
+    assert result.cagr[0] == pytest.approx(-0.2)
+    returns = prices[1:] / prices[:-1] - 1.0
+    assert result.sharpe[0] == pytest.approx(returns.mean() / returns.std(ddof=1) * np.sqrt(5))
+
+
+def test_crossover_sweep_matches_single_backtests():
+    prices = _prices()
+    result = backtest.crossover_sweep(prices, [5, 10, 50], [20, 50], average="EMA", fee=0.001)
+    assert result.parameters == [(5, 20), (5, 50), (10, 20), (10, 50)]
+    for index, (fast, slow) in enumerate(result.parameters):
+        position = backtest.positions(*backtest.crossover_signals(TI.EMA(list(prices), fast),
+                                                                  TI.EMA(list(prices), slow)))
+        single = backtest.backtest(prices, position, fee=0.001)
+        assert result.equity[:, index] == pytest.approx(single.equity[:, 0])
+        assert result.sharpe[index] == pytest.approx(single.sharpe[0])
+    parameters, sharpe = result.best()
+    assert sharpe == np.nanmax(result.sharpe)
+    assert result.best("max_drawdown")[1] == result.max_drawdown.min()
+
+
+def test_sweep_of_rsi_thresholds():
+    prices = _prices()
+    grid = [(14, 30.0, 70.0), (7, 20.0, 80.0)]
+    result = backtest.sweep(prices, lambda prices, lookback, low, high:
+                            backtest.threshold_signals(TI.RSI(prices, lookback), low, high), grid)
+    assert result.parameters == grid
+    position = backtest.positions(*backtest.threshold_signals(TI.RSI(list(prices), 7), 20.0, 80.0))
+    assert (result.positions[:, 1] == position).all()
+
+
+def test_invalid_input():
+    with pytest.raises(InvalidInputError):
+        backtest.backtest(np.ones(5), np.ones(4))
+    with pytest.raises(InvalidInputError):
+        backtest.backtest(np.ones(5), np.ones(5), fee=-0.1)
+    with pytest.raises(InvalidInputError):
+        backtest.positions(np.ones(3, dtype=bool), np.ones(4, dtype=bool))
+    with pytest.raises(InvalidInputError):
+        backtest.crossover_sweep(_prices(), [20], [10])
+    with pytest.raises(InvalidInputError):
+        backtest.crossover_sweep(_prices(), [5], [10], average="WMA")
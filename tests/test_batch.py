@@ -0,0 +1,90 @@
+from caishen_stonks import technical_indicators as TI
+import math
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+batch = pytest.importorskip("caishen_stonks.batch")
+
+
+def _price_matrix(bars, tickers, seed):
+    random.seed(seed)
+    columns = []
+    for _ in range(tickers):
+        price = random.uniform(10.0, 500.0)
+        column = []
+        for _ in range(bars):
+            price *= math.exp(random.gauss(0.0, 0.01))
+            column.append(price)
+        columns.append(column)
+    return np.array(columns).T
+
+
+def _with_gaps(prices):
+    prices = prices.copy()
+    prices[:30, 1] = np.nan     # listed later
+    prices[100:110, 2] = np.nan  # trading halt
+    prices[::7, 3] = np.nan     # sparse missing bars
+    prices[:, 4] = np.nan       # no data at all
+    return prices
+
+
+def _per_column(function, prices, *args):
+    # computes an indicator for each column on its available bars only, then spreads it back over the bars
+    outputs = None
+    for column in range(prices.shape[1]):
+        available = ~np.isnan(prices[:, column])
+        result = function(prices[available, column], *args) if available.sum() else None
+        result = result if isinstance(result, tuple) else (result,)
+        if outputs is None:
+            outputs = [np.full(prices.shape, np.nan) for _ in result]
+        for output, values in zip(outputs, result):
+            if values is not None:
+                output[available, column] = values
+    return outputs
+
+
+@pytest.mark.parametrize("name, args", [("SMA", (20,)), ("EMA", (12, 2.0)), ("bollinger_bands", (20,)),
+                                        ("MACD", ()), ("RSI", (14,))])
+def test_batch_matches_single_series(name, args):
+    prices = _with_gaps(_price_matrix(300, 5, 1))
+    output = getattr(batch, name)(prices, *args)
+    output = output if isinstance(output, tuple) else (output,)
+    expected = _per_column(getattr(TI, name), prices[:, :4], *args)
+    for values, expected_values in zip(output, expected):
+        assert values.shape == prices.shape
+        np.testing.assert_allclose(values[:, :4], expected_values, rtol=1e-9, atol=1e-12)
+        assert np.isnan(values[:, 4]).all()
+
+
+def test_batch_SO_matches_single_series():
+    closing_prices = _with_gaps(_price_matrix(200, 5, 2))[:, :4]
+    high_prices = closing_prices * 1.01
+    low_prices = closing_prices * 0.99
+    K_values, D_values = batch.SO(high_prices, low_prices, closing_prices, 5, 3)
+    for column in range(closing_prices.shape[1]):
+        available = ~np.isnan(closing_prices[:, column])
+        expected_K, expected_D = TI.SO(high_prices[available, column], low_prices[available, column],
+                                       closing_prices[available, column], 5, 3)
+        np.testing.assert_allclose(K_values[available, column], expected_K)
+        np.testing.assert_allclose(D_values[available, column], expected_D)
+        assert np.isnan(K_values[~available, column]).all()
+
+
+def test_batch_without_gaps_matches_single_series():
+    prices = _price_matrix(100, 3, 3)
+    output = batch.SMA(prices, 10)
+    for column in range(3):
+        np.testing.assert_allclose(output[:, column], TI.SMA(prices[:, column], 10))
+
+
+def test_batch_false_dimensions():
+    with pytest.raises(Exception) as ex:
+        batch.RSI(np.ones(10), 3)
+    assert "The prices are expected to be a two dimensional (bars x tickers) matrix" in str(ex.value)
+
+
+def test_batch_false_lookback():
+    with pytest.raises(Exception) as ex:
+        batch.SMA(np.ones((10, 2)), 2.5)
+    assert "The lookback is expected to be an int" in str(ex.value)
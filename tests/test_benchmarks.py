@@ -0,0 +1,40 @@
+import importlib.util
+import json
+import os
+
+_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "run_benchmarks.py")
+_spec = importlib.util.spec_from_file_location("run_benchmarks", _PATH)
+run_benchmarks = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(run_benchmarks)
+
+QUICK = ["--sizes", "50", "--repeat", "1", "--min-time", "0", "--fetch-tickers", "12"]
+
+
+def test_benchmarks_write_json(tmp_path):
+    output = tmp_path / "results.json"
+    assert run_benchmarks.main(QUICK + ["--output", str(output)]) == 0
+    results = json.loads(output.read_text())["results"]
+    assert results["list/50/SMA(5)"]["throughput"] > 0
+    assert results["list/50/SO(14, 3)"]["unit"] == "points/s"
+    assert results["fetch/12/StockHistoryClient.fetch"]["unit"] == "tickers/s"
+    assert "list/1/fibonacci_retractments" in results
+
+
+def test_benchmarks_fail_on_regression(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    assert run_benchmarks.main(QUICK + ["--filter", "list/50/RSI", "--save-baseline", str(baseline)]) == 0
+    report = json.loads(baseline.read_text())
+    for result in report["results"].values():
+        result["throughput"] *= 100
+    baseline.write_text(json.dumps(report))
+    assert run_benchmarks.main(QUICK + ["--filter", "list/50/RSI", "--baseline", str(baseline)]) == 1
+    assert run_benchmarks.main(QUICK + ["--filter", "list/50/RSI", "--baseline", str(baseline),
+                                        "--threshold", "1.0"]) == 0
+
+
+def test_regressions():
+    baseline = {"a": {"throughput": 100.0}, "b": {"throughput": 100.0}}
+    results = {"a": {"throughput": 85.0, "unit": "points/s"}, "b": {"throughput": 75.0, "unit": "points/s"},
+               "c": {"throughput": 1.0, "unit": "points/s"}}
+    failures = run_benchmarks.regressions(results, baseline, 0.2)
+    assert len(failures) == 1 and failures[0].startswith("b: 75 points/s is 25% below")
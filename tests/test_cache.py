@@ -0,0 +1,149 @@
+from caishen_stonks import technical_indicators as TI
+from caishen_stonks.cache import IndicatorCache
+from caishen_stonks.workspace import Workspace
+from tests.helpers import random_walk
+import pytest
+
+
+def test_cache_hits_for_same_series_and_parameters():
+    cache = IndicatorCache()
+    RSI = cache.wrap(TI.RSI)
+    values = random_walk(200, 1, 2)
+    first = RSI(values, 14)
+    second = RSI(list(values), lookback=14)
+    assert first == second == TI.RSI(values, 14)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    RSI(values, 7)
+    RSI(values[:-1] + [values[-1] + 0.01], 14)
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_cache_returns_copies():
+    cache = IndicatorCache()
+    lower, middle, upper = cache.call(TI.bollinger_bands, random_walk(50, 2, 2), 20)
+    middle[-1] = 0.0
+    assert cache.call(TI.bollinger_bands, random_walk(50, 2, 2), 20)[1][-1] != 0.0
+
+
+def test_cache_evicts_least_recently_used():
+    values = random_walk(100, 3, 2)
+    cache = IndicatorCache(max_bytes=3 * 3300)
+    for lookback in (5, 6, 7):
+        cache.call(TI.SMA, values, lookback)
+    cache.call(TI.SMA, values, 5)
+    cache.call(TI.SMA, values, 8)
+    assert cache.evictions == 1
+    assert cache.stats()["entries"] == 3
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+    # SMA(6) was the least recently used entry
+    hits = cache.hits
+    cache.call(TI.SMA, values, 5)
+    cache.call(TI.SMA, values, 6)
+    assert cache.hits == hits + 1
+
+
+def test_cache_skips_results_larger_than_the_bound():
+    cache = IndicatorCache(max_bytes=100)
+    cache.call(TI.SMA, random_walk(100, 4, 2), 5)
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("function, args", [
+    (TI.SMA, (20,)),
+    (TI.EMA, (12, 2.0)),
+    (TI.RSI, (14,)),
+    (TI.bollinger_bands, (20,)),
+    (TI.MACD, ((12, 26), (2.0, 2.0), 9, 2.0)),
+])
+def test_append_aware_cache_extends_results(function, args):
+    values = random_walk(300, 5, 2)
+    cache = IndicatorCache(append_aware=True)
+    assert cache.call(function, values[:200], *args) == function(values[:200], *args)
+    assert cache.call(function, values[:250], *args) == function(values[:250], *args)
+    assert cache.call(function, values, *args) == function(values, *args)
+    assert cache.extensions == 2
+
+
+def test_append_aware_cache_extends_SO():
+    close = random_walk(120, 6, 2)
+    high = [value + 0.5 for value in close]
+    low = [value - 0.5 for value in close]
+    cache = IndicatorCache(append_aware=True)
+    # too short to be extended: the batch function pads the D scores of short series differently
+    assert cache.call(TI.SO, high[:5], low[:5], close[:5], 5, 3) == TI.SO(high[:5], low[:5], close[:5], 5, 3)
+    assert cache.call(TI.SO, high[:80], low[:80], close[:80], 5, 3) == TI.SO(high[:80], low[:80], close[:80], 5, 3)
+    assert cache.call(TI.SO, high, low, close, 5, 3) == TI.SO(high, low, close, 5, 3)
+    assert cache.extensions == 1
+
+
+def test_append_aware_cache_ignores_modified_prefix():
+    values = random_walk(100, 7, 2)
+    cache = IndicatorCache(append_aware=True)
+    cache.call(TI.EMA, values[:50], 10)
+    changed = list(values)
+    changed[10] += 1.0
+    assert cache.call(TI.EMA, changed, 10) == TI.EMA(changed, 10)
+    assert cache.extensions == 0
+
+
+def test_append_aware_cache_forgets_evicted_and_cleared_prefixes():
+    values = random_walk(300, 8, 2)
+    cache = IndicatorCache(max_bytes=20000, append_aware=True)
+    cache.call(TI.SMA, values[:100], 20)
+    # the longer results evict the first one
+    cache.call(TI.EMA, values, 12)
+    cache.call(TI.EMA, values[:299], 26)
+    assert cache.evictions == 1
+    assert cache.call(TI.SMA, values[:150], 20) == TI.SMA(values[:150], 20)
+    assert cache.extensions == 0
+    cache.clear()
+    assert cache.call(TI.EMA, values[:280], 12) == TI.EMA(values[:280], 12)
+    assert cache.call(TI.EMA, values[:290], 12) == TI.EMA(values[:290], 12)
+    assert cache.extensions == 1
+
+
+def test_cache_with_numpy_arrays():
+    np = pytest.importorskip("numpy")
+    values = random_walk(100, 8, 2)
+    cache = IndicatorCache(append_aware=True)
+    as_list = cache.call(TI.SMA, values, 10)
+    as_array = cache.call(TI.SMA, np.array(values), 10)
+    assert isinstance(as_list, list) and isinstance(as_array, np.ndarray)
+    assert cache.misses == 2
+    np.testing.assert_array_equal(cache.call(TI.SMA, np.array(values), 10), as_array)
+    assert cache.hits == 1
+
+
+def test_cache_writes_into_out_buffers():
+    values = random_walk(60, 9, 2)
+    cache = IndicatorCache()
+    plain = cache.call(TI.SMA, values, 3)
+    buffer = []
+    assert cache.call(TI.SMA, values, 3, out=buffer) is buffer
+    assert buffer == plain == TI.SMA(values, 3)
+    other = [0.0] * 100
+    assert cache.call(TI.SMA, values, lookback=3, out=other) is other and other == plain
+    assert (cache.hits, cache.misses) == (2, 1)
+    # the out buffers neither change the key nor count towards the cached bytes
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 56 + 32 * 60
+
+    lines = ([], [])
+    workspace = Workspace()
+    assert cache.call(TI.MACD, values, out=lines, workspace=workspace)[0] is lines[0]
+    assert cache.call(TI.MACD, values, out=([], None))[0] == lines[0] and cache.hits == 3
+    assert lines == TI.MACD(values)
+    with pytest.raises(TypeError):
+        cache.call(TI.SMA, values, 3, out=(1, 2))
+
+
+def test_cache_writes_into_out_arrays():
+    np = pytest.importorskip("numpy")
+    values = np.array(random_walk(60, 10, 2))
+    cache = IndicatorCache()
+    buffer = np.empty(60)
+    for _ in range(2):
+        assert cache.call(TI.RSI, values, 14, out=buffer) is buffer
+        np.testing.assert_array_equal(buffer, TI.RSI(values, 14))
+    assert cache.hits == 1
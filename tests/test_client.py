@@ -0,0 +1,108 @@
+from caishen_stonks.client import StockHistoryClient
+from caishen_stonks.constants import DateRange, StockInterval
+from caishen_stonks.errors import InvalidInputError, StockDataFetchError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import json
+import os
+import re
+import threading
+import requests
+import requests_mock
+import pytest
+
+
+def _url():
+    return re.compile(f"https://{os.environ['RAPIDAPI_HOST']}/{os.environ['RAPIDAPI_ENDPOINT']}")
+
+
+def _spark(request, context):
+    symbols = request.qs["symbols"][0].upper().split(",")
+    return {symbol: {"symbol": symbol, "timestamp": [1588305600, 1590984000], "close": [79.485, 91.2]}
+            for symbol in symbols}
+
+
+def test_fetch_chunks_tickers_into_batches():
+    tickers = [f"T{index}" for index in range(25)]
+    with requests_mock.Mocker() as mock:
+        mock.get(_url(), json=_spark)
+        with StockHistoryClient(max_workers=4) as client:
+            history = client.fetch(tickers + ["T0"], DateRange.oneYear, StockInterval.oneDay)
+
+    assert sorted(history) == sorted(tickers)
+    assert history["T24"]["close"] == [79.485, 91.2]
+    batches = sorted(len(request.qs["symbols"][0].split(",")) for request in mock.request_history)
+    assert batches == [5, 10, 10]
+    assert all(request.qs["range"] == ["1y"] and request.qs["interval"] == ["1d"] for request in mock.request_history)
+    assert mock.request_history[0].headers["x-rapidapi-key"] == os.environ["RAPID_API_TOKEN"]
+
+
+def test_fetch_runs_batches_concurrently():
+    # requests_mock serializes requests, so this runs against a local HTTP server instead
+    barrier = threading.Barrier(3, timeout=5)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            # every batch waits for the other two, which only returns if they are in flight at the same time
+            barrier.wait()
+            symbols = parse_qs(urlparse(self.path).query)["symbols"][0].split(",")
+            body = json.dumps({symbol: {"symbol": symbol} for symbol in symbols}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with StockHistoryClient(max_workers=3, url=f"http://127.0.0.1:{server.server_port}/spark") as client:
+            history = client.fetch([f"T{index}" for index in range(30)], DateRange.oneYear, StockInterval.oneDay)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(history) == 30
+
+
+def test_fetch_retries_transient_failures():
+    with requests_mock.Mocker() as mock:
+        mock.get(_url(), [{"status_code": 503},
+                          {"exc": requests.exceptions.ConnectTimeout},
+                          {"status_code": 429, "headers": {"Retry-After": "0"}},
+                          {"json": _spark}])
+        history = StockHistoryClient(backoff=0.0).fetch(["AAPL"], DateRange.oneYear, StockInterval.oneMonth)
+    assert list(history) == ["AAPL"]
+    assert mock.call_count == 4
+
+
+def test_fetch_gives_up_after_retries():
+    with requests_mock.Mocker() as mock:
+        mock.get(_url(), status_code=500)
+        with pytest.raises(StockDataFetchError) as ex:
+            StockHistoryClient(retries=2, backoff=0.0).fetch(["AAPL"], DateRange.oneYear, StockInterval.oneMonth)
+    assert mock.call_count == 3
+    assert "after 3 attempts" in str(ex.value)
+
+
+def test_fetch_does_not_retry_client_errors():
+    with requests_mock.Mocker() as mock:
+        mock.get(_url(), status_code=403)
+        with pytest.raises(StockDataFetchError) as ex:
+            StockHistoryClient(backoff=0.0).fetch(["AAPL"], DateRange.oneYear, StockInterval.oneMonth)
+    assert mock.call_count == 1
+    assert "status 403" in str(ex.value)
+
+
+def test_fetch_validates_input():
+    client = StockHistoryClient()
+    with pytest.raises(TypeError):
+        client.fetch("AAPL", DateRange.oneYear, StockInterval.oneMonth)
+    with pytest.raises(InvalidInputError):
+        client.fetch([], DateRange.oneYear, StockInterval.oneMonth)
+    with pytest.raises(TypeError):
+        client.fetch(["AAPL"], "1y", StockInterval.oneMonth)
+    with pytest.raises(ValueError):
+        StockHistoryClient(max_workers=0)
@@ -0,0 +1,127 @@
+from caishen_stonks.downsample import ChartDownsampler, lttb, minmax_indices, ohlc_buckets
+from caishen_stonks import technical_indicators as TI
+from caishen_stonks.errors import InvalidInputError
+import math
+import numpy as np
+import pytest
+
+
+def _walk(length, seed=4):
+    generator = np.random.default_rng(seed)
+    return 100.0 * np.exp(np.cumsum(generator.normal(0.0, 0.01, length)))
+
+
+def _reference_lttb(x, y, threshold):
+    # the original algorithm, one point at a time
+    every = (len(x) - 2) / (threshold - 2)
+    selected = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        first = int(bucket * every) + 1
+        last = int((bucket + 1) * every) + 1
+        next_first, next_last = last, min(int((bucket + 2) * every) + 1, len(x))
+        cx = sum(x[next_first:next_last]) / (next_last - next_first)
+        cy = sum(y[next_first:next_last]) / (next_last - next_first)
+        areas = [abs((x[previous] - cx) * (y[point] - y[previous]) - (x[previous] - x[point]) * (cy - y[previous]))
+                 for point in range(first, last)]
+        previous = first + areas.index(max(areas))
+        selected.append(previous)
+    return selected + [len(x) - 1]
+
+
+def test_lttb_matches_the_reference():
+    y = _walk(150)
+    x = np.arange(150) * 60
+    assert lttb(x, y, 40).tolist() == _reference_lttb(list(x), list(y), 40)
+    assert lttb(x, y, 200).tolist() == list(range(150))
+
+
+def test_lttb_of_long_series_preselects_extremes():
+    y = _walk(100000)
+    y[54321] = 1000.0
+    selected = lttb(np.arange(100000), y, 500)
+    assert len(selected) == 500
+    assert selected[0] == 0 and selected[-1] == 99999
+    assert (np.diff(selected) > 0).all()
+    assert 54321 in selected
+
+
+def test_lttb_skips_missing_values():
+    y = _walk(100)
+    y[:10] = np.nan
+    y[50] = np.nan
+    selected = lttb(np.arange(100), y, 20)
+    assert selected[0] == 10 and 50 not in selected and len(selected) == 20
+
+
+def test_minmax_indices():
+    values = np.array([3.0, np.nan, 1.0, np.nan, np.nan, np.nan, 2.0, 7.0])
+    assert minmax_indices(values, 3).tolist() == [0, 2, 6, 7]
+    assert minmax_indices(values, 8).tolist() == [0, 2, 6, 7]
+
+
+def test_ohlc_buckets_keep_the_extremes():
+    close = _walk(103)
+    open_ = np.roll(close, 1)
+    high = np.maximum(open_, close) + 0.5
+    low = np.minimum(open_, close) - 0.5
+    open_[10] = np.nan
+    close[19] = np.nan
+    last, o, h, l, c = ohlc_buckets(np.arange(103), open_, high, low, close, 10)
+    assert len(last) == 10 and last[-1] == 102
+    for bucket, end in enumerate(last):
+        start = 0 if bucket == 0 else last[bucket - 1] + 1
+        assert h[bucket] == high[start:end + 1].max()
+        assert l[bucket] == low[start:end + 1].min()
+        opens = open_[start:end + 1][~np.isnan(open_[start:end + 1])]
+        closes = close[start:end + 1][~np.isnan(close[start:end + 1])]
+        assert (o[bucket], c[bucket]) == (opens[0], closes[-1])
+
+
+def test_overlays_are_aligned_with_the_prices():
+    close = list(_walk(5000))
+    x = list(range(1000, 6000))
+    sma = TI.SMA(close, 200)
+    lower, _, upper = TI.bollinger_bands(close, 20)
+    chart = ChartDownsampler(x, close, {"SMA(200)": sma, "upper": upper})
+    view = chart.view(300)
+    assert len(view["x"]) == len(view["close"]) == len(view["SMA(200)"]) == 300
+    for position, timestamp in enumerate(view["x"]):
+        bar = timestamp - 1000
+        assert view["close"][position] == close[bar]
+        assert view["SMA(200)"][position] == (None if bar < 199 else sma[bar])
+        assert view["upper"][position] == (None if bar < 19 else upper[bar])
+
+    zoomed = chart.view(100, start=3000, end=3499)
+    assert zoomed["x"][0] == 3000 and zoomed["x"][-1] == 3499 and len(zoomed["x"]) == 100
+    assert chart.view(1000, start=3000, end=3099)["x"] == list(range(3000, 3100))
+
+
+def test_candles():
+    close = _walk(1000)
+    high, low = close + 1.0, close - 1.0
+    chart = ChartDownsampler(np.arange(1000), close, {"SMA(5)": TI.SMA(close, 5)}, open=close, high=high, low=low)
+    view = chart.view(100)
+    assert set(view) == {"x", "open", "high", "low", "close", "SMA(5)"}
+    assert len(view["x"]) == 100
+    assert view["x"][0] == 9 and view["close"][0] == close[9] and view["open"][0] == close[0]
+    assert view["high"][0] == high[:10].max()
+    assert view["SMA(5)"][0] == pytest.approx(close[5:10].mean())
+    assert not any(math.isnan(value) for value in view["low"])
+
+
+def test_only_the_overlays_have_a_warm_up():
+    # a leading -1 is a price, e.g. a spread, but the warm-up of a list indicator
+    close = [-1.0, -1.0, 2.0, 3.0]
+    view = ChartDownsampler(range(4), close, {"SMA(3)": TI.SMA(close, 3)}, open=close, high=close, low=close).view(4)
+    assert view["close"] == view["open"] == close
+    assert view["SMA(3)"][:2] == [None, None] and view["SMA(3)"][3] == pytest.approx(4.0 / 3.0)
+
+
+def test_invalid_input():
+    with pytest.raises(InvalidInputError):
+        ChartDownsampler([1, 2, 3], [1.0, 2.0])
+    with pytest.raises(InvalidInputError):
+        lttb([1, 2], [1.0], 3)
+    with pytest.raises(ValueError):
+        lttb(range(10), _walk(10), 2)
@@ -0,0 +1,129 @@
+from caishen_stonks.history import StockHistory
+from caishen_stonks.errors import InvalidInputError
+from caishen_stonks import technical_indicators as TI
+from array import array
+import json
+import math
+import pytest
+
+RESPONSE = json.loads('{"AAPL":{"symbol":"AAPL","end":null,"start":null,"timestamp":[1588305600,1590984000,1593576000,1596254400,1598932800,1601524800,1604203200,1606798800,1609477200,1612155600,1614574800,1617249600,1617912003],"close":[79.485,91.2,106.26,129.04,115.81,108.86,119.05,132.69,131.96,121.26,122.15,127.9,130.36],"previousClose":null,"chartPreviousClose":66.518,"dataGranularity":300}}')  # noqa: E501
+
+
+def test_from_response():
+    history = StockHistory.from_response(RESPONSE)["AAPL"]
+    assert history.symbol == "AAPL"
+    assert len(history) == 13
+    assert history.timestamp.format == "q" and history.close.format == "d"
+    assert history.close.tolist() == RESPONSE["AAPL"]["close"]
+    assert history.high is None
+    assert history.nbytes == 2 * 13 * 8
+
+
+def test_missing_values_are_nan():
+    history = StockHistory("AAPL", [1, 2, 3], [1.0, None, 3.0], volume=[10, 20, None])
+    assert math.isnan(history.close[1]) and math.isnan(history.volume[2])
+
+
+def test_between_shares_buffers():
+    history = StockHistory.from_response(RESPONSE)["AAPL"]
+    sliced = history.between(1598932800, 1609477200)
+    assert sliced.timestamp.tolist() == [1598932800, 1601524800, 1604203200, 1606798800]
+    assert sliced.close.tolist() == [115.81, 108.86, 119.05, 132.69]
+    assert sliced.close.obj is history.close.obj
+    assert len(history.between(end=1588305600)) == 0
+    assert len(history.between(start=1600000000)) == 8
+    assert history[2:4].close.tolist() == [106.26, 129.04]
+    with pytest.raises(TypeError):
+        history[0]
+
+
+def test_columns_are_read_only():
+    history = StockHistory("AAPL", [1, 2], [1.0, 2.0])
+    with pytest.raises(TypeError):
+        history.close[0] = 5.0
+
+
+def test_arrays_are_not_copied():
+    close = array("d", [1.0, 2.0, 3.0])
+    history = StockHistory("AAPL", array("q", [1, 2, 3]), close)
+    assert history.close.obj is close
+
+
+def test_mismatching_columns():
+    with pytest.raises(InvalidInputError):
+        StockHistory("AAPL", [1, 2, 3], [1.0, 2.0])
+
+
+def test_columns_feed_technical_indicators():
+    history = StockHistory("AAPL", range(13), RESPONSE["AAPL"]["close"],
+                           high=[value + 1.0 for value in RESPONSE["AAPL"]["close"]],
+                           low=[value - 1.0 for value in RESPONSE["AAPL"]["close"]])
+    close = list(history.close)
+    assert TI.SMA(history.close, 3) == TI.SMA(close, 3)
+    assert TI.EMA(history.close, 3) == TI.EMA(close, 3)
+    assert TI.bollinger_bands(history.close, 3) == TI.bollinger_bands(close, 3)
+    assert TI.RSI(history.close, 3) == TI.RSI(close, 3)
+    assert TI.MACD(history.close, (3, 6), signal_lookback=3) == TI.MACD(close, (3, 6), signal_lookback=3)
+    assert TI.SO(history.high, history.low, history.close) == TI.SO(list(history.high), list(history.low), close)
+
+
+NULL_BAR = json.loads(json.dumps(RESPONSE))
+NULL_BAR["AAPL"].update(close=[None if i == 6 else value for i, value in enumerate(RESPONSE["AAPL"]["close"])],
+                        high=[value + 1.0 for value in RESPONSE["AAPL"]["close"]],
+                        low=[None if i == 6 else value - 1.0 for i, value in enumerate(RESPONSE["AAPL"]["close"])],
+                        volume=[None if i == 6 else 1000 for i in range(13)])
+
+
+def _nan_positions(values):
+    return [i for i, value in enumerate(values) if value != value]
+
+
+def test_null_bar_through_every_indicator():
+    history = StockHistory.from_response(NULL_BAR)["AAPL"]
+    # the windowed indicators only lose the windows containing the null bar
+    assert _nan_positions(TI.SMA(history.close, 3)) == [6, 7, 8]
+    for band in TI.bollinger_bands(history.close, 3):
+        assert _nan_positions(band) == [6, 7, 8]
+    K_values, D_values = TI.SO(history.high, history.low, history.close, 3, 2)
+    assert _nan_positions(K_values) == [4, 5, 6] and _nan_positions(D_values) == [4, 5, 6, 7]
+    # the recursive ones carry it forward, filled() fills the gap first
+    assert _nan_positions(TI.EMA(history.close, 3)) == list(range(6, 13))
+    filled = history.filled()
+    assert filled.close[6] == filled.close[5] and filled.low[6] == filled.low[5] and filled.volume[6] == 0.0
+    assert filled.high.obj is history.high.obj
+    outputs = [TI.SMA(filled.close, 3), TI.EMA(filled.close, 3), TI.RSI(filled.close, 3),
+               *TI.bollinger_bands(filled.close, 3), *TI.MACD(filled.close, (3, 6), signal_lookback=3),
+               *TI.SO(filled.high, filled.low, filled.close, 3, 2)]
+    assert all(_nan_positions(output) == [] for output in outputs)
+
+
+def test_null_bar_through_every_array_indicator():
+    np = pytest.importorskip("numpy")
+    history = StockHistory.from_response(NULL_BAR)["AAPL"]
+    close, high, low = (np.asarray(column) for column in (history.close, history.high, history.low))
+    assert _nan_positions(TI.SMA(close, 3)) == [0, 1, 6, 7, 8]
+    for band in TI.bollinger_bands(close, 3):
+        assert _nan_positions(band) == [0, 1, 6, 7, 8]
+    K_values, D_values = TI.SO(high, low, close, 3, 2)
+    assert _nan_positions(K_values) == [0, 1, 6, 7, 8] and _nan_positions(D_values) == [0, 1, 2, 6, 7, 8, 9]
+    filled = history.filled()
+    close, high, low = (np.asarray(column) for column in (filled.close, filled.high, filled.low))
+    outputs = [TI.EMA(close, 3), TI.RSI(close, 3), *TI.MACD(close, (3, 6), signal_lookback=3), *TI.SO(high, low, close)]
+    assert all(not np.isnan(output[8:]).any() for output in outputs)
+
+
+def test_filled_drops_leading_gaps():
+    history = StockHistory("AAPL", [1, 2, 3], [None, 1.0, 2.0], low=[0.5, None, 1.5], high=[1.5, 1.5, 2.5])
+    assert history.filled().timestamp.tolist() == [3]
+    assert len(StockHistory("AAPL", [1], [None]).filled()) == 0
+    complete = StockHistory.from_response(RESPONSE)["AAPL"]
+    assert complete.filled().close.obj is complete.close.obj
+
+
+def test_numpy_columns():
+    np = pytest.importorskip("numpy")
+    close = np.array(RESPONSE["AAPL"]["close"])
+    history = StockHistory("AAPL", np.arange(13), close)
+    assert np.shares_memory(np.asarray(history.close), close)
+    assert history.timestamp.format == "q"
+    np.testing.assert_array_equal(TI.SMA(np.asarray(history.close[2:]), 3), TI.SMA(close[2:], 3))
@@ -0,0 +1,76 @@
+from caishen_stonks import incremental
+from caishen_stonks import technical_indicators as TI
+from tests.helpers import random_walk
+import json
+import pytest
+
+
+@pytest.mark.parametrize("lookback", [1, 3, 20])
+def test_incremental_SMA_matches_batch(lookback):
+    values = random_walk(300, lookback, 2)
+    assert incremental.IncrementalSMA(lookback).extend(values) == TI.SMA(values, lookback)
+
+
+@pytest.mark.parametrize("lookback", [1, 4, 26])
+def test_incremental_EMA_matches_batch(lookback):
+    values = random_walk(300, lookback, 2)
+    assert incremental.IncrementalEMA(lookback, 2.0).extend(values) == TI.EMA(values, lookback, 2.0)
+
+
+def test_incremental_bollinger_bands_matches_batch():
+    values = random_walk(300, 5, 2)
+    output = incremental.IncrementalBollingerBands(20).extend(values)
+    assert tuple(list(band) for band in zip(*output)) == TI.bollinger_bands(values, 20)
+
+
+def test_incremental_SO_matches_batch():
+    closing_values = random_walk(300, 6, 2)
+    high_values = [x + 0.5 for x in closing_values]
+    low_values = [x - 0.5 for x in closing_values]
+    output = incremental.IncrementalSO(5, 3).extend(high_values, low_values, closing_values)
+    K_values, D_values = TI.SO(high_values, low_values, closing_values, 5, 3)
+    assert output[:4] == [(-1, -1)] * 4
+    assert [K for K, _ in output[4:]] == K_values
+    assert [D for _, D in output[4:]] == D_values
+
+
+def test_incremental_MACD_matches_batch():
+    values = random_walk(300, 7, 2)
+    output = incremental.IncrementalMACD().extend(values)
+    MACD_values, signal_values = TI.MACD(values)
+    assert [x for x, _ in output] == MACD_values
+    assert [y for _, y in output] == signal_values
+
+
+@pytest.mark.parametrize("values", [[1.0, 1.2, 1.4, 1.1, 0.9], random_walk(300, 8, 2)])
+def test_incremental_RSI_matches_batch(values):
+    assert incremental.IncrementalRSI(3).extend(values) == TI.RSI(values, 3)
+
+
+@pytest.mark.parametrize("factory", [lambda: incremental.IncrementalSMA(10),
+                                     lambda: incremental.IncrementalEMA(10, 2.0),
+                                     lambda: incremental.IncrementalBollingerBands(10),
+                                     lambda: incremental.IncrementalMACD((5, 10), signal_lookback=4),
+                                     lambda: incremental.IncrementalRSI(10)])
+def test_snapshot_restore(factory):
+    values = random_walk(100, 9, 2)
+    indicator = factory()
+    indicator.extend(values[:60])
+    restored = type(indicator).from_snapshot(json.loads(json.dumps(indicator.snapshot())))
+    assert restored.extend(values[60:]) == indicator.extend(values[60:])
+
+
+def test_SO_snapshot_restore():
+    values = random_walk(100, 10, 2)
+    indicator = incremental.IncrementalSO(5, 3)
+    indicator.extend(values[:50], values[:50], values[:50])
+    restored = incremental.IncrementalSO.from_snapshot(json.loads(json.dumps(indicator.snapshot())))
+    high_values = [x + 1.0 for x in values[50:]]
+    assert restored.extend(high_values, values[50:], values[50:]) == indicator.extend(high_values, values[50:],
+                                                                                      values[50:])
+
+
+def test_incremental_false_lookback():
+    with pytest.raises(Exception) as ex:
+        incremental.IncrementalSMA(0)
+    assert "The lookback value has to be a positive integer, but it is set to 0" in str(ex.value)
@@ -0,0 +1,93 @@
+from caishen_stonks import instrumentation
+from caishen_stonks import technical_indicators as TI
+from caishen_stonks.client import StockHistoryClient
+from caishen_stonks.constants import DateRange, StockInterval
+from caishen_stonks.pack import indicator_pack
+import math
+import requests_mock
+import pytest
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.REGISTRY.reset()
+    instrumentation.enable()
+    yield instrumentation.REGISTRY
+    instrumentation.disable()
+    instrumentation.REGISTRY.reset()
+
+
+def test_disabled_records_nothing():
+    instrumentation.REGISTRY.reset()
+    assert not instrumentation.is_enabled()
+    TI.SMA([1.0, 2.0, 3.0], 2)
+    assert instrumentation.REGISTRY.snapshot() == {}
+
+
+def test_calls_sizes_and_errors_are_recorded(enabled):
+    values = [float(value) for value in range(100)]
+    TI.SMA(values, 5)
+    TI.SMA(values[:10], 5)
+    TI.MACD(values)
+    with pytest.raises(TypeError):
+        TI.RSI("AAPL")
+    snapshot = enabled.snapshot()
+
+    assert snapshot["technical_indicators.SMA"]["calls"] == 2
+    assert snapshot["technical_indicators.SMA"]["items"] == 110
+    # the EMAs MACD is built from are part of its call
+    assert snapshot["technical_indicators.MACD"]["calls"] == 1
+    assert "technical_indicators.EMA" not in snapshot
+    assert snapshot["technical_indicators.RSI"]["errors"] == 1
+    quantiles = snapshot["technical_indicators.SMA"]["quantiles"]
+    assert 0 < quantiles[0.5] <= quantiles[0.99]
+    assert snapshot["technical_indicators.SMA"]["seconds"] >= quantiles[0.99]
+
+
+def test_sizes_of_keyword_arguments(enabled):
+    values = [float(value) for value in range(50)]
+    TI.SMA(values=values, lookback=2)
+    TI.EMA(values[:20], lookback=2)
+    snapshot = enabled.snapshot()
+    assert snapshot["technical_indicators.SMA"]["items"] == 50
+    assert snapshot["technical_indicators.EMA"]["items"] == 20
+
+
+def test_composite_indicators_are_recorded_once(enabled):
+    values = [100.0 + (i * 37 % 101) / 7.0 for i in range(100)]
+    TI.RSI(values, 14)
+    TI.SO(values, values, values)
+    TI.SMA_multi(values[:-1] + [math.nan], [5, 10])
+    indicator_pack(values[:30])
+    snapshot = enabled.snapshot()
+    assert {name: metric["calls"] for name, metric in snapshot.items()} == {
+        "technical_indicators.RSI": 1, "technical_indicators.SO": 1, "technical_indicators.SMA_multi": 1,
+        "pack.indicator_pack": 1}
+
+
+def test_fetch_records_bytes(enabled):
+    body = '{"AAPL": {"symbol": "AAPL", "close": [1.0]}}'
+    with requests_mock.Mocker() as mock:
+        mock.get(requests_mock.ANY, text=body)
+        StockHistoryClient().fetch(["AAPL"], DateRange.oneYear, StockInterval.oneDay)
+    snapshot = enabled.snapshot()
+    assert snapshot["client.StockHistoryClient.fetch"]["calls"] == 1
+    assert snapshot["client.StockHistoryClient.fetch"]["items"] == 1
+    assert snapshot["client.StockHistoryClient.fetch"]["fetched_bytes"] == len(body)
+    assert snapshot["stock.StockHistoryRequestBuilder.__init__"]["calls"] == 1
+
+
+def test_prometheus_format(enabled):
+    enabled.observe("technical_indicators.SMA", 0.25, 10)
+    enabled.observe("technical_indicators.SMA", 0.75, 30, error=True)
+    enabled.observe_bytes("client.StockHistoryClient.fetch", 1234)
+    lines = enabled.to_prometheus().splitlines()
+    assert "# TYPE caishen_calls_total counter" in lines
+    assert 'caishen_calls_total{function="technical_indicators.SMA"} 2' in lines
+    assert 'caishen_errors_total{function="technical_indicators.SMA"} 1' in lines
+    assert 'caishen_input_items_total{function="technical_indicators.SMA"} 40' in lines
+    assert 'caishen_latency_seconds{function="technical_indicators.SMA",quantile="0.5"} 0.75' in lines
+    assert 'caishen_latency_seconds_sum{function="technical_indicators.SMA"} 1.0' in lines
+    assert 'caishen_latency_seconds_count{function="technical_indicators.SMA"} 2' in lines
+    assert 'caishen_fetched_bytes_sum{function="client.StockHistoryClient.fetch"} 1234' in lines
+    assert 'caishen_calls_total{function="client.StockHistoryClient.fetch"} 0' not in lines
@@ -0,0 +1,172 @@
+from caishen_stonks.live import DEFAULT_INDICATORS, LiveHub, LiveIndicators
+from caishen_stonks.history import StockHistory
+from caishen_stonks import technical_indicators as TI
+from caishen_stonks.errors import InvalidInputError
+import math
+import random
+import pytest
+
+
+def _history(length=120, seed=2):
+    random.seed(seed)
+    close = [100.0]
+    for _ in range(length - 1):
+        close.append(close[-1] * math.exp(random.gauss(0.0, 0.01)))
+    return StockHistory("AAPL", [60 * bar for bar in range(length)], close,
+                        high=[value + 1.0 for value in close], low=[value - 1.0 for value in close])
+
+
+def _gaps(values):
+    return [None if value == -1 else value for value in values]
+
+
+def _expected(history):
+    close = list(history.close)
+    lower, middle, upper = TI.bollinger_bands(close, 20)
+    MACD, signal = TI.MACD(close)
+    return {"high": list(history.high), "low": list(history.low), "close": close,
+            "SMA(20)": _gaps(TI.SMA(close, 20)), "bollinger_bands(20) lower": _gaps(lower),
+            "bollinger_bands(20) middle": _gaps(middle), "bollinger_bands(20) upper": _gaps(upper),
+            "EMA(12, 2.0)": _gaps(TI.EMA(close, 12)), "EMA(26, 2.0)": _gaps(TI.EMA(close, 26)),
+            "MACD((12, 26), 9) MACD": _gaps(MACD), "MACD((12, 26), 9) signal": _gaps(signal),
+            "RSI(14)": _gaps(TI.RSI(close, 14))}
+
+
+def _assert_traces(traces, expected):
+    assert list(traces) == list(expected)
+    for name, values in expected.items():
+        assert traces[name] == pytest.approx(values, nan_ok=True), name
+
+
+def test_streaming_matches_the_indicator_functions():
+    history = _history()
+    state = LiveIndicators("AAPL")
+    position = 0
+    while position < len(history):
+        step = random.randint(1, 10)
+        assert state.update(history[position:position + step]) == position
+        position += step
+    _assert_traces(state.delta().traces, _expected(history))
+
+
+def test_replacing_the_bar_in_progress():
+    history = _history()
+    state = LiveIndicators("AAPL")
+    state.update(history[:60])
+    in_progress = StockHistory("AAPL", [history.timestamp[60]], [1000.0], high=[1001.0], low=[999.0])
+    state.update(in_progress)
+    version = state.version
+    # the final value of the bar and the next bars
+    assert state.update(history[60:80]) == 60
+    assert state.delta(61, version).start == 60
+    assert state.delta(61, state.version).start == 61
+    # bars older than the last one are skipped
+    assert state.update(history[:79]) == 80
+    state.update(history[79:])
+    _assert_traces(state.delta().traces, _expected(history))
+
+
+def _bars(history, positions, close=None):
+    # the bars of "history" at "positions", with the closing price "close" for all of them if it is given
+    prices = [history.close[position] if close is None else close for position in positions]
+    return StockHistory("AAPL", [history.timestamp[position] for position in positions], prices,
+                        high=[price + 1.0 for price in prices], low=[price - 1.0 for price in prices])
+
+
+def test_repeated_last_timestamp():
+    history = _history()
+    state = LiveIndicators("AAPL")
+    state.update(history[:60])
+    # intraday responses can repeat the timestamp of the bar in progress
+    state.update(_bars(history, [60, 60], 1000.0))
+    state.update(_bars(history, [59, 60, 60]))
+    state.update(history[60:])
+    _assert_traces(state.delta().traces, _expected(history))
+
+
+def test_older_last_bar_is_skipped():
+    history = _history()
+    state = LiveIndicators("AAPL")
+    state.update(history[:59])
+    state.update(_bars(history, [59, 60, 30]))
+    state.update(_bars(history, [60], 1000.0))
+    state.update(history[60:])
+    _assert_traces(state.delta().traces, _expected(history))
+
+
+def test_sessions_share_the_state_and_get_deltas():
+    history = _history()
+    hub = LiveHub()
+    first = hub.subscribe("AAPL")
+    hub.update(history[:50])
+    second = hub.subscribe("AAPL", list(DEFAULT_INDICATORS))
+    assert first.state is second.state
+    assert len(first.poll()) == 50
+    hub.update(history[50:52])
+    delta = first.poll()
+    assert (delta.start, delta.replaced, delta.x) == (50, 0, list(history.timestamp[50:52]))
+    data, indices, max_points = delta.extend_data(["close", "RSI(14)"], max_points=1000)
+    assert data["y"][0] == list(history.close[50:52])
+    assert indices == [0, 1] and max_points == 1000
+    assert len(second.poll()) == 52
+    assert len(first.poll()) == 0
+
+    hub.update(StockHistory("AAPL", [history.timestamp[51]], [1.0], high=[2.0], low=[0.5]))
+    delta = first.poll()
+    assert (delta.start, delta.replaced, delta.traces["close"]) == (51, 1, [1.0])
+    assert delta.extend_data(["close"]) == ({"x": [[]], "y": [[]]}, [0], None)
+    assert delta.replace_data(["close"]) == ({"x": [[history.timestamp[51]]], "y": [[1.0]]}, [0], 1)
+
+
+def test_bar_updated_in_place_and_new_bars():
+    history = _history()
+    hub = LiveHub()
+    session = hub.subscribe("AAPL", [("SMA", {"lookback": 3})])
+    hub.update(history[:20])
+    session.poll()
+    chart = {"x": list(history.timestamp[:20]), "close": list(history.close[:20]),
+             "SMA(3)": [None, None] + TI.SMA(list(history.close[:20]), 3)[2:]}
+    # the bar in progress is updated twice in place, then completed and followed by a new bar
+    for bars in ([(19, 500.0)], [(19, 501.0)], [(19, None), (20, None), (21, None)]):
+        close = [history.close[i] if value is None else value for i, value in bars]
+        hub.update(StockHistory("AAPL", [history.timestamp[i] for i, _ in bars], close,
+                                high=[value + 1.0 for value in close], low=[value - 1.0 for value in close]))
+        delta = session.poll()
+        replaced, indices, count = delta.replace_data(["close", "SMA(3)"])
+        assert count == delta.replaced == 1 and indices == [0, 1]
+        for name, values in zip(["close", "SMA(3)"], replaced["y"]):
+            chart[name][-count:] = values
+        extended, _, _ = delta.extend_data(["close", "SMA(3)"])
+        chart["x"] += extended["x"][0]
+        for name, values in zip(["close", "SMA(3)"], extended["y"]):
+            chart[name] += values
+    assert chart["x"] == list(history.timestamp[:22])
+    assert chart["close"] == list(history.close[:22])
+    assert chart["SMA(3)"][2:] == pytest.approx(TI.SMA(list(history.close[:22]), 3)[2:])
+
+
+def test_parameter_changes_recompute_from_the_stored_bars():
+    history = _history()
+    hub = LiveHub()
+    session = hub.subscribe("AAPL")
+    hub.update(history)
+    session.poll()
+    hub.reconfigure(session, [("SO", {"K_lookback": 5, "D_lookback": 3}), ("RSI", {"lookback": 7})])
+    delta = session.poll()
+    K, D = TI.SO(list(history.high), list(history.low), list(history.close), 5, 3)
+    assert delta.start == 0 and len(delta) == len(history)
+    # SO only returns the scores once K_lookback bars were seen, the chart has a gap before
+    assert delta.traces["SO(5, 3) K"] == pytest.approx([None] * 4 + K)
+    assert delta.traces["SO(5, 3) D"] == pytest.approx([None] * 4 + _gaps(D))
+    assert delta.traces["RSI(7)"] == pytest.approx(_gaps(TI.RSI(list(history.close), 7)))
+    # the state of the default indicators was dropped with its last session
+    assert len(hub._states) == 1
+
+
+def test_invalid_input():
+    with pytest.raises(InvalidInputError):
+        LiveIndicators("AAPL", [("fibonacci_retractments", {})])
+    with pytest.raises(InvalidInputError):
+        LiveIndicators("AAPL").update(StockHistory("MSFT", [0], [1.0]))
+    with pytest.raises(InvalidInputError):
+        LiveIndicators("AAPL", [("SO", {})]).update(StockHistory("AAPL", [0], [1.0]))
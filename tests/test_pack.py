@@ -0,0 +1,55 @@
+from caishen_stonks.pack import PACK, indicator_pack
+from caishen_stonks import technical_indicators as TI
+from caishen_stonks.errors import InvalidInputError
+from tests.helpers import random_walk
+from array import array
+import math
+import pytest
+
+
+def _separately(values):
+    return {"SMA(20)": TI.SMA(values, 20), "bollinger_bands(20)": TI.bollinger_bands(values, 20),
+            "EMA(12, 2.0)": TI.EMA(values, 12), "EMA(26, 2.0)": TI.EMA(values, 26), "MACD((12, 26), 9)": TI.MACD(values),
+            "RSI(14)": TI.RSI(values, 14)}
+
+
+@pytest.mark.parametrize("length", [34, 35, 100, 5000])
+def test_pack_equals_the_individual_functions(length):
+    values = random_walk(length, length)
+    # flat stretches have changes of 0.0
+    values[10:20] = [values[10]] * 10
+    values[25:32] = [values[25]] * 7
+    results = indicator_pack(values)
+    assert list(results) == list(PACK)
+    assert results == _separately(values)
+    assert indicator_pack(array("d", values)) == results
+
+
+def test_short_series():
+    values = random_walk(30, 1)
+    with pytest.raises(InvalidInputError):
+        indicator_pack(values[:20])
+    assert indicator_pack(values) == _separately(values)
+
+
+def test_pack_of_arrays():
+    np = pytest.importorskip("numpy")
+    values = np.array(random_walk(3000, 2))
+    results = indicator_pack(values)
+    for name, expected in _separately(values).items():
+        np.testing.assert_array_equal(results[name], expected, err_msg=name)
+    assert results["SMA(20)"] is not results["bollinger_bands(20)"][1]
+
+
+def test_invalid_input():
+    with pytest.raises(TypeError):
+        indicator_pack(100.0)
+    with pytest.raises(InvalidInputError):
+        indicator_pack([])
+
+
+@pytest.mark.parametrize("missing", [math.nan, math.inf])
+def test_pack_of_values_with_gaps(missing):
+    values = random_walk(200, 3)
+    values[60] = missing
+    assert repr(indicator_pack(values)) == repr(_separately(values))
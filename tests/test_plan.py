@@ -0,0 +1,89 @@
+from caishen_stonks import technical_indicators as TI
+from caishen_stonks.plan import IndicatorPlan
+from tests.helpers import random_walk
+import pytest
+
+
+def _dashboard_plan():
+    plan = IndicatorPlan()
+    names = {
+        "SMA": plan.SMA(20),
+        "EMA": plan.EMA(12),
+        "bollinger_bands": plan.bollinger_bands(20),
+        "MACD": plan.MACD((12, 26), signal_lookback=9),
+        "RSI": plan.RSI(14),
+    }
+    return plan, names
+
+
+def test_plan_matches_individual_functions():
+    values = random_walk(500, 1)
+    plan, names = _dashboard_plan()
+    results = plan.evaluate(values)
+    assert results[names["SMA"]] == TI.SMA(values, 20)
+    assert results[names["EMA"]] == TI.EMA(values, 12)
+    assert results[names["bollinger_bands"]] == TI.bollinger_bands(values, 20)
+    assert results[names["MACD"]] == TI.MACD(values, (12, 26), signal_lookback=9)
+    assert results[names["RSI"]] == TI.RSI(values, 14)
+
+
+def test_plan_evaluates_shared_computations_once(monkeypatch):
+    calls = {"SMA": 0, "EMA": 0, "bollinger_bands": 0}
+    for name in calls:
+        function = getattr(TI, name)
+
+        def counted(*args, _function=function, _name=name, **kwargs):
+            calls[_name] += 1
+            return _function(*args, **kwargs)
+        monkeypatch.setattr(TI, name, counted)
+
+    plan, _ = _dashboard_plan()
+    plan.evaluate(random_walk(200, 2))
+    # EMA12 and EMA26 for the MACD line, EMA(12) is shared with the MACD. The signal line averages the MACD line with
+    # the undecorated EMA
+    assert calls["EMA"] == 2
+    # the average gain and loss of RSI. SMA(20) is read from the bollinger bands
+    assert calls["SMA"] == 2
+    assert calls["bollinger_bands"] == 1
+
+
+def test_plan_SMA_declared_before_bands():
+    values = random_walk(100, 3)
+    plan = IndicatorPlan()
+    plan.SMA(10, name="sma")
+    plan.bollinger_bands(10, name="bands")
+    results = plan.evaluate(values)
+    assert results["sma"] == TI.SMA(values, 10)
+    results["sma"][-1] = 0.0
+    assert results["bands"][1][-1] != 0.0
+
+
+def test_plan_SO():
+    plan = IndicatorPlan()
+    name = plan.SO(5, 3)
+    high_values = [100.0, 101.0, 104.0, 105.0, 100.0, 110.0, 108.0, 97.0]
+    low_values = [99.0, 100.0, 99.0, 102.0, 98.0, 105.0, 95.0, 94.0]
+    closing_values = [100.50, 100.50, 103.0, 104.0, 99.0, 106.0, 95.0, 96.0]
+    results = plan.evaluate(closing_values, high_values, low_values)
+    assert results[name] == TI.SO(high_values, low_values, closing_values, 5, 3)
+    with pytest.raises(Exception) as ex:
+        plan.evaluate(closing_values)
+    assert "The high and low values are required to evaluate SO" in str(ex.value)
+
+
+def test_plan_duplicate_name():
+    plan = IndicatorPlan()
+    plan.SMA(10, name="average")
+    with pytest.raises(Exception) as ex:
+        plan.EMA(10, name="average")
+    assert "An indicator named average is already declared" in str(ex.value)
+
+
+def test_plan_arrays():
+    np = pytest.importorskip("numpy")
+    values = np.array(random_walk(300, 4))
+    plan, names = _dashboard_plan()
+    results = plan.evaluate(values)
+    np.testing.assert_array_equal(results[names["RSI"]], TI.RSI(values, 14))
+    for line, expected in zip(results[names["MACD"]], TI.MACD(values, (12, 26), signal_lookback=9)):
+        np.testing.assert_array_equal(line, expected)
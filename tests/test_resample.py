@@ -0,0 +1,146 @@
+from caishen_stonks.resample import Resampler, can_resample, resample
+from caishen_stonks.history import StockHistory
+from caishen_stonks.store import HistoryStore
+from caishen_stonks.constants import DateRange, StockInterval
+from caishen_stonks.errors import InvalidInputError
+import math
+import random
+import pytest
+
+MINUTE = 60
+DAY = 24 * 60 * 60
+# Monday 2021-03-01 14:30 UTC, the open in New York
+OPEN = 1614609000
+NEW_YORK = -5 * 60 * 60
+
+
+def _minutes(days=3, seed=1):
+    # one session of 390 minute bars per weekday
+    random.seed(seed)
+    timestamp, open_, high, low, close, volume = [], [], [], [], [], []
+    price = 100.0
+    for day in range(days):
+        for minute in range(390):
+            timestamp.append(OPEN + day * DAY + minute * MINUTE)
+            open_.append(price)
+            price += random.uniform(-0.5, 0.5)
+            high.append(max(open_[-1], price) + 0.1)
+            low.append(min(open_[-1], price) - 0.1)
+            close.append(price)
+            volume.append(float(random.randint(100, 1000)))
+    return StockHistory("AAPL", timestamp, close, open=open_, high=high, low=low, volume=volume)
+
+
+def _aggregate(history, first, last):
+    return {"open": history.open[first], "high": max(history.high[first:last]), "low": min(history.low[first:last]),
+            "close": history.close[last - 1], "volume": sum(history.volume[first:last])}
+
+
+def _bar(history, position):
+    return {field: getattr(history, field)[position] for field in ("open", "high", "low", "close", "volume")}
+
+
+def test_fifteen_minute_bars():
+    minutes = _minutes(days=1)
+    bars = resample(minutes, StockInterval.oneMinute, StockInterval.fifteenMinute)
+    assert len(bars) == 26
+    assert bars.timestamp[0] == OPEN and bars.timestamp[1] == OPEN + 15 * MINUTE
+    for position in range(26):
+        assert _bar(bars, position) == pytest.approx(_aggregate(minutes, 15 * position, 15 * position + 15))
+
+
+def test_daily_bars_follow_the_sessions():
+    minutes = _minutes(days=3)
+    # the last minute of the session is at 20:59 UTC, past midnight in a time zone 4 hours ahead
+    bars = resample(minutes, StockInterval.oneMinute, StockInterval.oneDay, utc_offset=NEW_YORK)
+    assert bars.timestamp.tolist() == [OPEN, OPEN + DAY, OPEN + 2 * DAY]
+    assert _bar(bars, 1) == pytest.approx(_aggregate(minutes, 390, 780))
+    shifted = resample(minutes, StockInterval.oneMinute, StockInterval.oneDay, utc_offset=4 * 60 * 60)
+    assert len(shifted) == 4
+
+
+def test_weekly_and_monthly_bars():
+    days = StockHistory("AAPL", [OPEN + day * DAY for day in range(40)], [float(day) for day in range(40)])
+    weeks = resample(days, StockInterval.oneDay, StockInterval.oneWeek)
+    # 2021-03-01 was a Monday
+    assert weeks.timestamp[1] == OPEN + 7 * DAY
+    assert weeks.close.tolist()[:2] == [6.0, 13.0]
+    assert weeks.open is None
+    months = resample(days, StockInterval.oneDay, StockInterval.oneMonth)
+    assert months.timestamp.tolist() == [OPEN, OPEN + 31 * DAY]
+    assert months.close.tolist() == [30.0, 39.0]
+
+
+def test_missing_values_are_skipped():
+    history = StockHistory("AAPL", [0, 60, 120], [1.0, None, 3.0], high=[None, 5.0, 2.0], volume=[1.0, None, 2.0])
+    bars = resample(history, StockInterval.oneMinute, StockInterval.fiveMinute)
+    assert (bars.close[0], bars.high[0], bars.volume[0]) == (3.0, 5.0, 3.0)
+    assert math.isnan(resample(StockHistory("AAPL", [0], [1.0], high=[None]), StockInterval.oneMinute,
+                               StockInterval.fiveMinute).high[0])
+
+
+def test_incremental_updates_match_resampling_at_once():
+    minutes = _minutes(days=2)
+    resampler = Resampler("AAPL", StockInterval.oneMinute, StockInterval.fiveMinute)
+    position = 0
+    while position < len(minutes):
+        step = random.randint(1, 12)
+        changed = resampler.update(minutes[position:position + step])
+        # only the last coarse bar before the update and the new ones are returned
+        assert len(changed) <= 1 + -(-step // 5)
+        position += step
+    expected = resample(minutes, StockInterval.oneMinute, StockInterval.fiveMinute)
+    history = resampler.history()
+    assert history.timestamp.tolist() == expected.timestamp.tolist()
+    for field in ("open", "high", "low", "close", "volume"):
+        assert getattr(history, field).tolist() == pytest.approx(getattr(expected, field).tolist())
+
+
+def test_revised_bars_change_the_last_coarse_bar():
+    resampler = Resampler("AAPL", StockInterval.oneMinute, StockInterval.fiveMinute)
+    resampler.update(StockHistory("AAPL", [0, 60, 120], [1.0, 9.0, 2.0], high=[1.0, 9.0, 2.0]))
+    assert resampler.resume_timestamp == 0
+    changed = resampler.update(StockHistory("AAPL", [60, 120, 180], [1.5, 2.5, 2.0], high=[1.5, 2.5, 2.0]))
+    assert changed.high.tolist() == [2.5]
+    assert changed.close.tolist() == [2.0]
+    changed = resampler.update(StockHistory("AAPL", [240, 300], [3.0, 4.0], high=[3.0, 4.0]))
+    assert changed.timestamp.tolist() == [0, 300]
+    # bars of complete coarse bars are skipped
+    assert resampler.update(StockHistory("AAPL", [0, 300], [100.0, 5.0], high=[100.0, 5.0])).close.tolist() == [5.0]
+    assert resampler.history().high.tolist() == [3.0, 5.0]
+
+
+def test_invalid_intervals():
+    assert can_resample(StockInterval.oneMinute, StockInterval.oneMonth)
+    assert not can_resample(StockInterval.fiveMinute, StockInterval.oneMinute)
+    assert not can_resample(StockInterval.oneDay, StockInterval.oneDay)
+    with pytest.raises(InvalidInputError):
+        Resampler("AAPL", StockInterval.oneWeek, StockInterval.oneMonth)
+    with pytest.raises(TypeError):
+        Resampler("AAPL", "1m", StockInterval.oneDay)
+    with pytest.raises(InvalidInputError):
+        Resampler("AAPL", StockInterval.oneMinute, StockInterval.oneDay).update(StockHistory("MSFT", [0], [1.0]))
+
+
+def test_store_serves_date_ranges_and_coarser_intervals(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    minutes = _minutes(days=3)
+    now = minutes.timestamp[-1] + MINUTE
+    store.write(minutes[:800], StockInterval.oneMinute)
+
+    assert len(store.load("AAPL", StockInterval.oneMinute, DateRange.oneDay, now=now)) == 20
+    days = store.load("AAPL", StockInterval.oneDay, now=now, utc_offset=NEW_YORK)
+    assert days.timestamp.tolist() == [OPEN, OPEN + DAY, OPEN + 2 * DAY]
+    assert days.close[-1] == minutes.close[799]
+    # the finer bars do not cover five days
+    assert store.load("AAPL", StockInterval.oneDay, DateRange.fiveDay, now=now) is None
+    assert store.load("MSFT", StockInterval.oneDay) is None
+
+    # newly stored bars are aggregated into the last day
+    store.write(minutes[799:], StockInterval.oneMinute)
+    days = store.load("AAPL", StockInterval.oneDay, now=now, utc_offset=NEW_YORK)
+    assert _bar(days, 2) == pytest.approx(_aggregate(minutes, 780, 1170))
+    assert len(store.load("AAPL", StockInterval.fifteenMinute, DateRange.oneDay, now=now)) == 26
+
+    store.write(resample(minutes, StockInterval.oneMinute, StockInterval.fiveMinute), StockInterval.fiveMinute)
+    assert len(store.load("AAPL", StockInterval.fiveMinute)) == 3 * 78
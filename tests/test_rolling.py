@@ -0,0 +1,157 @@
+from caishen_stonks import rolling
+from caishen_stonks import technical_indicators as TI
+import math
+import statistics
+import random
+import pytest
+
+
+def test_rolling_sum_calculations():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert list(rolling.rolling_sum(values, 3)) == [6.0, 9.0]
+
+
+def test_rolling_sum_window_longer_than_values():
+    values = [1.0, 2.0]
+    assert list(rolling.rolling_sum(values, 3)) == []
+
+
+def test_rolling_sum_false_window():
+    with pytest.raises(Exception) as ex:
+        list(rolling.rolling_sum([1.0, 2.0], 0))
+    assert "The window has to be a positive integer, but it is set to 0" in str(ex.value)
+
+
+def test_rolling_sum_does_not_drift():
+    random.seed(0)
+    values = [random.uniform(1e6, 1e6 + 1) for _ in range(50000)]
+    window = 200
+    output = list(rolling.rolling_sum(values, window))
+    for i in (0, 1000, 25000, len(output) - 1):
+        assert output[i] == pytest.approx(math.fsum(values[i:i + window]), rel=1e-15, abs=0)
+
+
+def test_SMA_matches_slice_sums():
+    random.seed(1)
+    values = [random.uniform(10.0, 200.0) for _ in range(1000)]
+    lookback = 20
+    expected = [-1] * (lookback - 1) + [sum(values[i:i + lookback]) / lookback
+                                        for i in range(len(values) - lookback + 1)]
+    output = TI.SMA(values, lookback)
+    assert output[:lookback - 1] == expected[:lookback - 1]
+    assert output == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("gap", [math.nan, math.inf])
+def test_non_finite_values_only_affect_their_windows(gap):
+    random.seed(5)
+    values = [random.uniform(1.0, 100.0) for _ in range(60)]
+    values[2] = values[30] = gap
+    window = 5
+    streamed_sums = rolling.RollingSum(window)
+    streamed_moments = rolling.RollingMeanStd(window)
+    sums = list(rolling.rolling_sum(values, window))
+    moments = list(rolling.rolling_mean_std(values, window))
+    # repr compares NaN values equal
+    assert repr([streamed_sums.push(x) for x in values][window - 1:]) == repr(sums)
+    assert repr([streamed_moments.push(x) for x in values][window - 1:]) == repr(moments)
+    for i, (total, (mean, stdev)) in enumerate(zip(sums, moments)):
+        window_values = values[i:i + window]
+        if all(math.isfinite(x) for x in window_values):
+            assert total == pytest.approx(sum(window_values))
+            assert mean == pytest.approx(statistics.fmean(window_values))
+            assert stdev == pytest.approx(statistics.pstdev(window_values))
+        else:
+            assert total == gap or math.isnan(total)
+            assert math.isnan(stdev)
+
+
+def test_rolling_mean_std_calculations():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert list(rolling.rolling_mean_std(values, 2)) == [(1.5, 0.5), (2.5, 0.5), (3.5, 0.5)]
+
+
+def test_rolling_mean_std_false_window():
+    with pytest.raises(Exception) as ex:
+        list(rolling.rolling_mean_std([1.0, 2.0], -2))
+    assert "The window has to be a positive integer, but it is set to -2" in str(ex.value)
+
+
+def _reference_bollinger_bands(values, lookback):
+    middle_band, upper_band, lower_band = [], [], []
+    for i in range(lookback - 1):
+        middle_band.append(-1)
+        upper_band.append(-1)
+        lower_band.append(-1)
+    for i in range(len(values) - lookback + 1):
+        average = sum(values[i:i + lookback]) / (1.0 * lookback)
+        stdev = statistics.pstdev(values[i:i + lookback])
+        middle_band.append(average)
+        upper_band.append(average + 2 * stdev)
+        lower_band.append(average - 2 * stdev)
+    return lower_band, middle_band, upper_band
+
+
+@pytest.mark.parametrize("lookback", [1, 2, 20, 200])
+def test_bollinger_bands_matches_reference(lookback):
+    random.seed(lookback)
+    price = 100.0
+    values = []
+    for _ in range(2000):
+        price *= math.exp(random.gauss(0.0, 0.01))
+        values.append(price)
+    output = TI.bollinger_bands(values, lookback)
+    expected = _reference_bollinger_bands(values, lookback)
+    for band, expected_band in zip(output, expected):
+        assert len(band) == len(expected_band)
+        assert band == pytest.approx(expected_band, rel=1e-9, abs=1e-9)
+
+
+def test_bollinger_bands_flat_series():
+    values = [5.0] * 50
+    lower_band, middle_band, upper_band = TI.bollinger_bands(values, 20)
+    assert lower_band[19:] == middle_band[19:] == upper_band[19:] == [5.0] * 31
+
+
+def test_rolling_max_min_calculations():
+    values = [1.0, 3.0, 2.0, 1.0, 0.0]
+    assert list(rolling.rolling_max(values, 2)) == [3.0, 3.0, 2.0, 1.0]
+    assert list(rolling.rolling_min(values, 2)) == [1.0, 2.0, 1.0, 0.0]
+
+
+@pytest.mark.parametrize("window", [1, 3, 14, 100])
+def test_rolling_max_min_matches_slices(window):
+    random.seed(window)
+    values = [random.choice([1.0, 2.0, 3.0]) + random.random() for _ in range(500)]
+    expected_max = [max(values[i:i + window]) for i in range(len(values) - window + 1)]
+    expected_min = [min(values[i:i + window]) for i in range(len(values) - window + 1)]
+    assert list(rolling.rolling_max(values, window)) == expected_max
+    assert list(rolling.rolling_min(values, window)) == expected_min
+
+
+def test_rolling_max_min_of_windows_with_nan():
+    values = [1.0, 3.0, math.nan, 2.0, 1.0, 0.0, 4.0]
+    streamed = rolling.RollingExtremum(2, maximum=False)
+    assert repr(list(rolling.rolling_max(values, 2))) == "[3.0, nan, nan, 2.0, 1.0, 4.0]"
+    assert repr(list(rolling.rolling_min(values, 3))) == "[nan, nan, nan, 0.0, 0.0]"
+    assert repr([streamed.push(x) for x in values][1:]) == "[1.0, nan, nan, 1.0, 0.0, 0.0]"
+
+
+def test_rolling_max_false_window():
+    with pytest.raises(Exception) as ex:
+        list(rolling.rolling_max([1.0, 2.0], 0))
+    assert "The window has to be a positive integer, but it is set to 0" in str(ex.value)
+
+
+def test_streaming_windows_match_generators():
+    random.seed(11)
+    values = [random.uniform(1.0, 100.0) for _ in range(500)]
+    window = 7
+    streamed_sums = rolling.RollingSum(window)
+    streamed_moments = rolling.RollingMeanStd(window)
+    streamed_max = rolling.RollingExtremum(window)
+    streamed_min = rolling.RollingExtremum(window, maximum=False)
+    assert [streamed_sums.push(x) for x in values][window - 1:] == list(rolling.rolling_sum(values, window))
+    assert [streamed_moments.push(x) for x in values][window - 1:] == list(rolling.rolling_mean_std(values, window))
+    assert [streamed_max.push(x) for x in values][window - 1:] == list(rolling.rolling_max(values, window))
+    assert [streamed_min.push(x) for x in values][window - 1:] == list(rolling.rolling_min(values, window))
@@ -0,0 +1,126 @@
+from caishen_stonks.scheduler import BACKGROUND, INTERACTIVE, MonthlyQuota, RequestScheduler, TokenBucket
+from caishen_stonks.client import StockHistoryClient
+from caishen_stonks.constants import DateRange, StockInterval
+from caishen_stonks.errors import InvalidInputError, StockDataFetchError
+from caishen_stonks.standin import StandInServer
+import pytest
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_adapts_its_rate():
+    clock = Clock()
+    bucket = TokenBucket(4.0, burst=2, clock=clock)
+    bucket.take()
+    bucket.take()
+    assert bucket.delay() == pytest.approx(0.25)
+    clock.now = 1.0
+    assert bucket.delay() == 0.0 and bucket.delay(reserve=1) == 0.0 and bucket.tokens == 2.0
+
+    bucket.throttle(3.0)
+    assert bucket.rate == 2.0 and bucket.delay() == pytest.approx(3.0)
+    clock.now = 4.0
+    assert bucket.delay() == pytest.approx(0.5)
+    clock.now = 4.5
+    assert bucket.delay() == 0.0 and bucket.delay(reserve=1) == pytest.approx(0.5)
+    for _ in range(100):
+        bucket.recover()
+    assert bucket.rate == 4.0
+    for _ in range(100):
+        bucket.throttle(0.0)
+    assert bucket.rate == 0.25
+    with pytest.raises(ValueError):
+        TokenBucket(0.0)
+
+
+def test_monthly_quota_resets_every_month():
+    # 2021-04-30 23:59 UTC
+    clock = Clock(1619827140.0)
+    quota = MonthlyQuota(3, used=1, clock=clock)
+    assert [quota.take() for _ in range(3)] == [True, True, False]
+    clock.now += 120
+    assert quota.remaining == 3 and quota.take()
+    with pytest.raises(ValueError):
+        MonthlyQuota(3, used=4)
+
+
+def test_single_ticker_requests_are_packed():
+    with StandInServer() as server, RequestScheduler(StockHistoryClient(url=server.url), requests_per_second=4.0,
+                                                     burst=1) as scheduler:
+        futures = [scheduler.submit([f"T{index}"], DateRange.oneYear, StockInterval.oneDay) for index in range(21)]
+        futures += [scheduler.submit(["T3"], DateRange.oneYear, StockInterval.oneDay),
+                    scheduler.submit(["T3"], DateRange.fiveDay, StockInterval.oneDay)]
+        results = [future.result(10) for future in futures]
+    assert all(list(result) == [f"T{index}"] for index, result in enumerate(results[:21]))
+    assert results[21] == results[3] and results[22]["T3"]["timestamp"] != results[3]["T3"]["timestamp"]
+    # the first ticker is sent alone, the other 20 in two batches and the other date range in one more
+    assert server.statistics == {200: 4}
+    assert scheduler.stats()["coalesced"] == 1
+
+
+def test_interactive_requests_go_first():
+    with StandInServer() as server, RequestScheduler(StockHistoryClient(url=server.url), requests_per_second=10.0,
+                                                     burst=1, max_in_flight=1) as scheduler:
+        order = []
+        background = [scheduler.submit([f"B{index}"], DateRange.fiveDay, interval, priority=BACKGROUND)
+                      for index, interval in enumerate([StockInterval.oneDay, StockInterval.oneWeek] * 3)]
+        interactive = scheduler.submit(["AAPL"], DateRange.oneYear, StockInterval.oneDay, priority=INTERACTIVE)
+        for future in background + [interactive]:
+            future.add_done_callback(lambda done: order.append(list(done.result())))
+        promoted = scheduler.submit(["B5"], DateRange.fiveDay, StockInterval.oneWeek)
+        assert set(promoted.result(10)) == {"B5"} and interactive.result(10)
+        for future in background:
+            future.result(10)
+    # at most the first background batch is sent before the interactive ones
+    assert order.index(["AAPL"]) <= 3 and order.index(["B5"]) <= 3
+    # the daily and weekly background tickers are packed into a batch each, unless the first one was sent alone
+    assert server.statistics[200] in (3, 4)
+
+
+def test_rate_limiting_backs_off_and_retries():
+    with StandInServer(rate_limit=2.0, burst=1) as server:
+        client = StockHistoryClient(url=server.url, retries=3, backoff=0.1)
+        with RequestScheduler(client, requests_per_second=50.0, burst=2) as scheduler:
+            first = scheduler.submit(["AAPL"], DateRange.oneYear, StockInterval.oneDay)
+            first.result(10)
+            second = scheduler.submit(["MSFT"], DateRange.oneDay, StockInterval.oneMinute)
+            assert list(second.result(10)) == ["MSFT"]
+            stats = scheduler.stats()
+    assert server.statistics[429] == stats["throttled"] >= 1 and stats["retries"] == stats["throttled"]
+    assert stats["rate"] < 50.0
+
+
+def test_failures_and_quota():
+    with StandInServer(error_rate=1.0) as server:
+        client = StockHistoryClient(url=server.url, retries=1, backoff=0.0)
+        with RequestScheduler(client, requests_per_second=100.0) as scheduler:
+            with pytest.raises(StockDataFetchError) as ex:
+                scheduler.fetch(["AAPL", "MSFT"], DateRange.oneYear, StockInterval.oneDay, timeout=10)
+    assert "after 2 attempts" in str(ex.value) and sum(server.statistics.values()) == 2
+
+    with StandInServer() as server, RequestScheduler(StockHistoryClient(url=server.url),
+                                                     requests_per_month=1) as scheduler:
+        assert scheduler.fetch(["AAPL"], DateRange.oneYear, StockInterval.oneDay, timeout=10)
+        with pytest.raises(StockDataFetchError) as ex:
+            scheduler.fetch(["AAPL"], DateRange.fiveDay, StockInterval.oneDay, timeout=10)
+        assert "quota" in str(ex.value) and scheduler.stats()["quota_remaining"] == 0
+    with pytest.raises(StockDataFetchError):
+        scheduler.submit(["AAPL"], DateRange.oneYear, StockInterval.oneDay)
+
+
+def test_submit_validates_input():
+    with RequestScheduler() as scheduler:
+        with pytest.raises(TypeError):
+            scheduler.submit("AAPL", DateRange.oneYear, StockInterval.oneDay)
+        with pytest.raises(InvalidInputError):
+            scheduler.submit([], DateRange.oneYear, StockInterval.oneDay)
+        with pytest.raises(ValueError):
+            scheduler.submit(["AAPL"], DateRange.oneYear, StockInterval.oneDay, priority=2)
+    with pytest.raises(ValueError):
+        RequestScheduler(burst=2, reserve=2)
@@ -0,0 +1,108 @@
+from caishen_stonks import batch
+from caishen_stonks import screener as S
+from caishen_stonks.errors import InvalidInputError
+import numpy as np
+import pytest
+
+
+def _prices(tickers=6, bars=120, seed=3):
+    generator = np.random.default_rng(seed)
+    return 100.0 * np.exp(np.cumsum(generator.normal(0.0, 0.02, (bars, tickers)), axis=0))
+
+
+def test_comparison_at_the_last_bar():
+    prices = _prices()
+    rsi = batch.RSI(prices, 14)[-1]
+    threshold = float(np.median(rsi))
+    matches = S.Screener([S.RSI(14) < threshold]).run(prices, list("ABCDEF"), rank_by=S.RSI(14))
+    expected = sorted((value, "ABCDEF"[column]) for column, value in enumerate(rsi) if value < threshold)
+    assert matches == [(ticker, value) for value, ticker in expected]
+
+
+def test_bands_crosses_and_ranking_descending():
+    prices = _prices(tickers=20)
+    line, signal = batch.MACD(prices)
+    lower = batch.bollinger_bands(prices, 20)[0]
+    conditions = [S.close > 0.9 * S.bollinger_bands(20).lower,
+                  S.crossed_above(S.MACD().line, S.MACD().signal, within=10)]
+    matches = S.Screener(conditions).run(prices, rank_by=S.close - S.SMA(5), ascending=False)
+
+    difference = line - signal
+    crossed = ((difference[-11:-1] <= 0) & (difference[-10:] > 0)).any(axis=0)
+    expected = np.flatnonzero((prices[-1] > 0.9 * lower[-1]) & crossed)
+    assert expected.size
+    assert sorted(int(ticker) for ticker, _ in matches) == list(expected)
+    scores = [score for _, score in matches]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == pytest.approx((prices[-1] - batch.SMA(prices, 5)[-1])[int(matches[0][0])])
+
+
+def test_only_referenced_indicators_are_computed_for_surviving_tickers(monkeypatch):
+    prices = _prices(tickers=8)
+    calls = []
+    for name in ("SMA", "EMA", "RSI", "MACD", "bollinger_bands"):
+        function = getattr(batch, name)
+        monkeypatch.setattr(batch, name, lambda values, *args, _name=name, _function=function:
+                            calls.append((_name, values.shape[1])) or _function(values, *args))
+    # the MACD condition is listed first, but the cheaper close comparison is evaluated first
+    keep = np.zeros(8, dtype=bool)
+    keep[[1, 4, 6]] = True
+    prices[-1] = np.where(keep, 1000.0, 1.0)
+    S.Screener([S.MACD().line > -1e9, S.close > 500.0, S.MACD().signal > -1e9]).run(prices)
+    assert calls == [("MACD", 3)]
+
+
+def test_no_survivors_stops_early(monkeypatch):
+    prices = _prices()
+    monkeypatch.setattr(batch, "RSI", lambda *args: pytest.fail("RSI should not be computed"))
+    assert S.Screener([S.close < 0.0, S.RSI() < 30]).run(prices) == []
+
+
+def test_combined_conditions_and_limit():
+    prices = _prices(tickers=10)
+    sma = batch.SMA(prices, 10)[-1]
+    ema = batch.EMA(prices, 10)[-1]
+    condition = (S.close > S.SMA(10)) | ~(S.EMA(10) < S.close)
+    expected = np.flatnonzero((prices[-1] > sma) | ~(ema < prices[-1]))
+    matches = S.Screener([condition]).run(prices)
+    assert [int(ticker) for ticker, _ in matches] == list(expected)
+    assert all(np.isnan(score) for _, score in matches)
+    assert len(S.Screener([condition]).run(prices, limit=2)) == min(2, expected.size)
+
+
+def test_stochastic_oscillator_needs_high_and_low():
+    prices = _prices()
+    with pytest.raises(InvalidInputError):
+        S.Screener([S.SO().K > 80]).run(prices)
+    K, D = batch.SO(prices + 1.0, prices - 1.0, prices)
+    matches = S.Screener([S.SO().K > S.SO().D]).run(prices, high_prices=prices + 1.0, low_prices=prices - 1.0)
+    assert [int(ticker) for ticker, _ in matches] == list(np.flatnonzero(K[-1] > D[-1]))
+
+
+def test_warm_up_never_matches():
+    prices = _prices(bars=10)
+    assert S.Screener([S.RSI(14) < 101]).run(prices) == []
+
+
+def test_invalid_input():
+    with pytest.raises(TypeError):
+        S.Screener([S.RSI(14)])
+    with pytest.raises(ValueError):
+        S.crossed_above(S.close, S.SMA(), within=0)
+    with pytest.raises(InvalidInputError):
+        S.Screener([S.close > 1.0]).run(_prices(), ["A", "B"])
+
+
+def test_incomplete_series_and_conditions_fail_on_creation():
+    class Half(S.Series):
+        def _keys(self):
+            return frozenset()
+
+    class Unmasked(S.Condition):
+        def _keys(self):
+            return frozenset()
+
+    with pytest.raises(TypeError):
+        Half()
+    with pytest.raises(TypeError):
+        Unmasked()
@@ -0,0 +1,129 @@
+from caishen_stonks.singleflight import SingleFlightClient
+from caishen_stonks.constants import DateRange, StockInterval
+from caishen_stonks.errors import InvalidInputError, StockDataFetchError
+import asyncio
+import threading
+import pytest
+
+
+class GatedClient:
+    """Fake client whose fetches block until the test opens the gate"""
+
+    def __init__(self, error=None):
+        self.gate = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.calls = []
+        self.error = error
+
+    def fetch(self, tickers, date_range, interval):
+        self.calls.append(sorted(tickers))
+        self.started.release()
+        assert self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {ticker: {"symbol": ticker, "range": date_range.value} for ticker in tickers if ticker != "NONE"}
+
+
+def _start(target, *args):
+    results = {}
+
+    def run():
+        try:
+            results["value"] = target(*args)
+        except Exception as error:
+            results["error"] = error
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, results
+
+
+def test_identical_fetches_are_coalesced():
+    client = GatedClient()
+    flight = SingleFlightClient(client)
+    first, first_result = _start(flight.fetch, ["AAPL", "MSFT"], DateRange.oneYear, StockInterval.oneDay)
+    assert client.started.acquire(timeout=5)
+    others = [_start(flight.fetch, ["MSFT", "AAPL"], DateRange.oneYear, StockInterval.oneDay) for _ in range(4)]
+    while flight.stats()["coalesced_calls"] < 4:
+        pass
+    client.gate.set()
+    for thread, _ in [(first, first_result)] + others:
+        thread.join(5)
+
+    assert client.calls == [["AAPL", "MSFT"]]
+    assert all(result["value"] == first_result["value"] for _, result in others)
+    assert flight.stats() == {"calls": 5, "coalesced_calls": 4, "coalesced_tickers": 8, "fetches": 1, "in_flight": 0}
+
+
+def test_overlapping_fetches_are_split():
+    client = GatedClient()
+    flight = SingleFlightClient(client)
+    first, _ = _start(flight.fetch, ["AAPL", "MSFT"], DateRange.oneYear, StockInterval.oneDay)
+    assert client.started.acquire(timeout=5)
+    second, second_result = _start(flight.fetch, ["MSFT", "GOOGL", "NONE"], DateRange.oneYear, StockInterval.oneDay)
+    assert client.started.acquire(timeout=5)
+    # a different date range is a different key
+    third, _ = _start(flight.fetch, ["AAPL"], DateRange.fiveDay, StockInterval.oneDay)
+    assert client.started.acquire(timeout=5)
+    client.gate.set()
+    for thread in (first, second, third):
+        thread.join(5)
+
+    assert client.calls == [["AAPL", "MSFT"], ["GOOGL", "NONE"], ["AAPL"]]
+    assert sorted(second_result["value"]) == ["GOOGL", "MSFT"]
+    assert flight.coalesced_tickers == 1
+
+    # nothing is in flight anymore, so the next call fetches again
+    flight.fetch(["AAPL", "MSFT"], DateRange.oneYear, StockInterval.oneDay)
+    assert len(client.calls) == 4
+
+
+def test_errors_reach_every_waiting_caller():
+    client = GatedClient(StockDataFetchError("rate limited"))
+    flight = SingleFlightClient(client)
+    first, first_result = _start(flight.fetch, ["AAPL"], DateRange.oneYear, StockInterval.oneDay)
+    assert client.started.acquire(timeout=5)
+    second, second_result = _start(flight.fetch, ["AAPL"], DateRange.oneYear, StockInterval.oneDay)
+    while flight.coalesced_calls < 1:
+        pass
+    client.gate.set()
+    first.join(5)
+    second.join(5)
+    assert isinstance(first_result["error"], StockDataFetchError)
+    assert second_result["error"] is first_result["error"]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_async_callers_share_fetches_with_threads():
+    client = GatedClient()
+    flight = SingleFlightClient(client)
+
+    async def main():
+        tasks = [asyncio.create_task(flight.fetch_async(["AAPL", "MSFT"], DateRange.oneYear, StockInterval.oneDay))
+                 for _ in range(3)]
+        while flight.calls < 3:
+            await asyncio.sleep(0.001)
+        thread, thread_result = _start(flight.fetch, ["MSFT"], DateRange.oneYear, StockInterval.oneDay)
+        while flight.calls < 4:
+            await asyncio.sleep(0.001)
+        client.gate.set()
+        results = await asyncio.gather(*tasks)
+        thread.join(5)
+        return results, thread_result["value"]
+
+    results, thread_value = asyncio.run(main())
+    assert client.calls == [["AAPL", "MSFT"]]
+    assert results[0] == results[1] == results[2] == {"AAPL": {"symbol": "AAPL", "range": "1y"},
+                                                      "MSFT": {"symbol": "MSFT", "range": "1y"}}
+    assert thread_value == {"MSFT": {"symbol": "MSFT", "range": "1y"}}
+    assert flight.coalesced_calls == 3
+
+
+def test_invalid_input():
+    flight = SingleFlightClient(GatedClient())
+    with pytest.raises(TypeError):
+        flight.fetch("AAPL", DateRange.oneYear, StockInterval.oneDay)
+    with pytest.raises(InvalidInputError):
+        flight.fetch([], DateRange.oneYear, StockInterval.oneDay)
+    with pytest.raises(TypeError):
+        flight.fetch(["AAPL"], "1y", StockInterval.oneDay)
@@ -0,0 +1,89 @@
+from caishen_stonks.standin import SESSION_OPEN, StandInServer, synthetic_history
+from caishen_stonks.client import StockHistoryClient
+from caishen_stonks.constants import DateRange, StockInterval
+from caishen_stonks.errors import StockDataFetchError
+from caishen_stonks.history import StockHistory
+import importlib.util
+import os
+import requests
+import pytest
+
+# Thursday 2021-04-08 20:00 UTC
+NOW = 1617912000
+DAY = 24 * 60 * 60
+
+_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "load_test.py")
+_spec = importlib.util.spec_from_file_location("load_test", _PATH)
+load_test = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(load_test)
+
+
+def test_series_follow_the_trading_sessions():
+    minutes = synthetic_history("AAPL", DateRange.fiveDay, StockInterval.oneMinute, NOW)
+    # Monday to Wednesday in full, Thursday until 20:00 and the last minutes of the Friday before
+    assert len(minutes["timestamp"]) == 3 * 390 + 331 + 0
+    assert all(SESSION_OPEN <= timestamp % DAY < SESSION_OPEN + 390 * 60 for timestamp in minutes["timestamp"])
+    assert all((timestamp // DAY + 3) % 7 < 5 for timestamp in minutes["timestamp"])
+    weeks = synthetic_history("AAPL", DateRange.oneYear, StockInterval.oneWeek, NOW)["timestamp"]
+    assert len(weeks) == 52 and all((timestamp // DAY + 3) % 7 == 0 for timestamp in weeks)
+    months = synthetic_history("AAPL", DateRange.oneYear, StockInterval.oneMonth, NOW)
+    assert months["timestamp"][0] == 1588343400 and len(months["close"]) == 12
+
+    days = synthetic_history("AAPL", DateRange.fiveYear, StockInterval.oneDay, NOW)
+    assert days == synthetic_history("AAPL", DateRange.fiveYear, StockInterval.oneDay, NOW)
+    assert days["close"] != synthetic_history("MSFT", DateRange.fiveYear, StockInterval.oneDay, NOW)["close"]
+    assert all(price > 0 for price in days["close"])
+
+
+def test_client_fetches_from_the_stand_in():
+    tickers = [f"T{index}" for index in range(23)]
+    with StandInServer(now=NOW) as server, StockHistoryClient(url=server.url) as client:
+        history = client.fetch(tickers, DateRange.oneYear, StockInterval.oneDay)
+    assert sorted(history) == sorted(tickers)
+    assert history["T7"] == synthetic_history("T7", DateRange.oneYear, StockInterval.oneDay, NOW)
+    assert len(StockHistory.from_response(history)["T3"]) == 261
+    assert server.statistics == {200: 3}
+
+
+def test_invalid_requests():
+    with StandInServer(token="secret") as server:
+        headers = {"x-rapidapi-key": "secret"}
+        query = {"symbols": "AAPL", "range": "1y", "interval": "1d"}
+        assert requests.get(server.url, params=query, headers=headers).status_code == 200
+        assert requests.get(server.url, params=query).status_code == 401
+        assert requests.get(server.url, params=dict(query, range="10y"), headers=headers).status_code == 400
+        assert requests.get(server.url, params=dict(query, symbols=",".join(["A"] * 11)),
+                            headers=headers).status_code == 400
+        assert requests.get(server.url.replace("spark", "chart"), params=query, headers=headers).status_code == 404
+
+
+def test_rate_limiting_and_failures():
+    with StandInServer(rate_limit=1.0, burst=2) as server:
+        query = {"symbols": "AAPL", "range": "1d", "interval": "1m"}
+        statuses = [requests.get(server.url, params=query) for _ in range(3)]
+        assert [response.status_code for response in statuses] == [200, 200, 429]
+        assert statuses[2].headers["Retry-After"] == "1"
+    with StandInServer(error_rate=1.0) as server, StockHistoryClient(url=server.url, retries=1, backoff=0.0) as client:
+        with pytest.raises(StockDataFetchError):
+            client.fetch(["AAPL"], DateRange.oneDay, StockInterval.oneDay)
+    assert sum(server.statistics.values()) == 2 and set(server.statistics) <= {500, 502, 503}
+    with pytest.raises(ValueError):
+        StandInServer(error_rate=1.5)
+
+
+@pytest.mark.parametrize("strategy", load_test.STRATEGIES)
+def test_load_test_reports_throughput_and_latency(tmp_path, strategy):
+    output = tmp_path / "load.json"
+    assert load_test.main(["--strategy", strategy, "--users", "3", "--fetches", "2", "--universe", "40",
+                           "--tickers-per-fetch", "12", "--latency", "0.001", "--output", str(output)]) == 0
+    report = load_test.json.loads(output.read_text())
+    assert report["fetches"] == 6 and report["failed_fetches"] == 0
+    assert report["throughput"]["tickers/s"] > 0
+    assert set(report["fetch_latency_ms"]) == {"p50", "p90", "p99", "mean", "max"}
+    assert report["server_statuses"]["200"] == report["requests"]
+
+
+def test_percentiles():
+    summary = load_test.percentiles([0.001 * value for value in range(1, 101)])
+    assert summary["p50"] == pytest.approx(50.0) and summary["p99"] == pytest.approx(99.0)
+    assert summary["max"] == pytest.approx(100.0)
@@ -0,0 +1,104 @@
+from caishen_stonks.store import HistoryStore, covering_date_range
+from caishen_stonks.history import StockHistory
+from caishen_stonks.constants import DateRange, StockInterval
+from caishen_stonks.errors import InvalidInputError
+import math
+import pytest
+
+DAY = 24 * 60 * 60
+START = 1600000000
+
+
+class FakeClient:
+    """Serves one bar per day from START to "now", the last one in progress"""
+
+    def __init__(self, now):
+        self.now = now
+        self.calls = []
+
+    def fetch(self, tickers, date_range, interval):
+        self.calls.append((tuple(tickers), date_range))
+        spans = {DateRange.oneDay: DAY, DateRange.fiveDay: 5 * DAY, DateRange.threeMonth: 90 * DAY,
+                 DateRange.oneYear: 365 * DAY, DateRange.fiveYear: 5 * 365 * DAY}
+        timestamps = [timestamp for timestamp in range(START, self.now + 1, DAY)
+                      if timestamp > self.now - spans[date_range]]
+        return {ticker: {"symbol": ticker, "timestamp": timestamps,
+                         "close": [self._price(ticker, timestamp) for timestamp in timestamps]}
+                for ticker in tickers}
+
+    def _price(self, ticker, timestamp):
+        # the bar of the current day changes until the day is over
+        in_progress = 0.5 if timestamp + DAY > self.now else 0.0
+        return len(ticker) + (timestamp - START) / DAY + in_progress
+
+
+def test_write_and_read(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    assert store.read("AAPL", StockInterval.oneDay) is None
+    store.write(StockHistory("AAPL", [1, 2, 3], [1.0, 2.0, 3.0], high=[1.5, 2.5, 3.5]), StockInterval.oneDay)
+    history = store.read("AAPL", StockInterval.oneDay)
+    assert history.timestamp.tolist() == [1, 2, 3]
+    assert history.close.tolist() == [1.0, 2.0, 3.0]
+    assert history.high.tolist() == [1.5, 2.5, 3.5]
+    assert history.low is None
+    assert store.read("AAPL", StockInterval.oneDay, start=2).close.tolist() == [2.0, 3.0]
+    assert store.read("AAPL", StockInterval.oneWeek) is None
+    assert store.last_timestamp("AAPL", StockInterval.oneDay) == 3
+    assert (tmp_path / "1d" / "AAPL" / "close").stat().st_size == 3 * 8
+
+
+def test_write_merges_overlapping_bars(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write(StockHistory("AAPL", [1, 2, 3], [1.0, 2.0, 3.0], high=[1.0, 2.0, 3.0]), StockInterval.oneDay)
+    before = store.read("AAPL", StockInterval.oneDay)
+    store.write(StockHistory("AAPL", [3, 4], [3.5, 4.0]), StockInterval.oneDay)
+    history = store.read("AAPL", StockInterval.oneDay)
+    assert history.timestamp.tolist() == [1, 2, 3, 4]
+    assert history.close.tolist() == [1.0, 2.0, 3.5, 4.0]
+    assert math.isnan(history.high[3])
+    # earlier reads stay valid
+    assert before.close.tolist()[:2] == [1.0, 2.0]
+
+    # a merged history shorter than the stored one replaces the files
+    store.write(StockHistory("AAPL", [2], [2.5]), StockInterval.oneDay)
+    assert store.read("AAPL", StockInterval.oneDay).close.tolist() == [1.0, 2.5]
+    assert len(before) == 3
+
+
+def test_covering_date_range():
+    assert covering_date_range(DAY) == DateRange.oneDay
+    assert covering_date_range(DAY + 1) == DateRange.fiveDay
+    assert covering_date_range(30 * DAY) == DateRange.threeMonth
+    assert covering_date_range(200 * DAY) == DateRange.oneYear
+    assert covering_date_range(3000 * DAY) == DateRange.fiveYear
+
+
+def test_refresh_fetches_only_the_gap(tmp_path):
+    now = START + 400 * DAY + 3600
+    client = FakeClient(now)
+    store = HistoryStore(str(tmp_path), client)
+    store.refresh(["AAPL", "MSFT"], StockInterval.oneDay, DateRange.oneYear, now=now)
+    assert client.calls == [(("AAPL", "MSFT"), DateRange.oneYear)]
+
+    # nothing is fetched while the last bar is recent
+    store.refresh(["AAPL"], StockInterval.oneDay, now=now)
+    assert len(client.calls) == 1
+
+    # three days later, the in-progress bar is fetched again with the three new ones
+    client.now = now + 3 * DAY
+    histories = store.refresh(["AAPL", "MSFT", "GOOGL"], StockInterval.oneDay, DateRange.oneYear, now=client.now)
+    assert client.calls[1:] == [(("AAPL", "MSFT"), DateRange.fiveDay), (("GOOGL",), DateRange.oneYear)]
+
+    expected = client.fetch(["AAPL"], DateRange.oneYear, StockInterval.oneDay)["AAPL"]
+    history = histories["AAPL"]
+    assert history.timestamp.tolist()[-len(expected["timestamp"]):] == expected["timestamp"]
+    assert history.close.tolist()[-len(expected["close"]):] == expected["close"]
+    assert list(history.timestamp) == sorted(set(history.timestamp))
+
+
+def test_invalid_keys(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    with pytest.raises(InvalidInputError):
+        store.read("../AAPL", StockInterval.oneDay)
+    with pytest.raises(TypeError):
+        store.read("AAPL", "1d")
@@ -1,4 +1,5 @@
 from caishen_stonks import technical_indicators as TI
+from caishen_stonks.workspace import Workspace
 import pytest
 
 
@@ -200,3 +201,97 @@ def test_RSI_success():
     values = [1.0, 1.2, 1.4, 1.1, 0.9]
     output = TI.RSI(values=values, lookback=3)
     assert [-1, -1, 0.0, 57.1429, 28.5714] == [round(x, 4) for x in output]
+
+
+def test_stochastic_oscillator_flat_bars():
+    high_values = [10.0, 10.0, 10.0, 10.0, 11.0]
+    low_values = [10.0, 10.0, 10.0, 10.0, 10.0]
+    closing_values = [10.0, 10.0, 10.0, 10.0, 10.5]
+    output = TI.SO(high_values, low_values, closing_values, K_lookback=3, D_lookback=2)
+    assert output[0] == [50.0, 50.0, 50.0]
+    assert output[1] == [-1, 50.0, 50.0]
+
+
+def test_SMA_multi_calculations():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert TI.SMA_multi(values, [2, 3]) == [[-1, 1.5, 2.5, 3.5], [-1, -1, 2.0, 3.0]]
+
+
+def test_SMA_multi_matches_SMA():
+    values = [100.0 + (i * 37 % 101) / 7.0 for i in range(500)]
+    lookbacks = [1, 5, 20, 200]
+    for lookback, output in zip(lookbacks, TI.SMA_multi(values, lookbacks)):
+        expected = TI.SMA(values, lookback)
+        assert output[:lookback - 1] == expected[:lookback - 1]
+        assert output == pytest.approx(expected, rel=1e-12)
+
+
+def test_SMA_multi_with_NaN():
+    values = [1.0, 2.0, float("nan"), 4.0, 5.0, 6.0]
+    assert repr(TI.SMA_multi(values, [2, 3])) == repr([TI.SMA(values, 2), TI.SMA(values, 3)])
+    assert TI.SMA_multi(values, [2])[0][-2:] == [4.5, 5.5]
+
+
+@pytest.mark.parametrize("lookback", [-1, 0])
+def test_SMA_multi_false_lookback(lookback):
+    with pytest.raises(ValueError) as ex:
+        TI.SMA_multi([1.0, 2.0], [2, lookback])
+    assert "The lookback value has to be a positive integer, but it is set to " + str(lookback) in str(ex.value)
+
+
+def test_EMA_multi_matches_EMA():
+    values = [100.0 + (i * 37 % 101) / 7.0 for i in range(500)]
+    lookbacks = [1, 5, 12, 26, 100]
+    assert TI.EMA_multi(values, lookbacks) == [TI.EMA(values, lookback) for lookback in lookbacks]
+
+
+def test_EMA_multi_false_lookback():
+    with pytest.raises(Exception) as ex:
+        TI.EMA_multi([1.0, 2.0], [2, 0])
+    assert "The lookback value has to be a positive integer, but it is set to 0" in str(ex.value)
+
+
+def test_out_buffers_are_reused():
+    values = [100.0 + (i * 37 % 101) / 7.0 for i in range(300)]
+    high_values = [value + 1.0 for value in values]
+    low_values = [value - 1.5 for value in values]
+    workspace = Workspace()
+    # stale contents of other lengths are overwritten
+    SMA_out, EMA_out, RSI_out = [5.0] * 400, [], [1.0]
+    bands, scores, MACD_out = ([], [], [7.0] * 10), ([], []), ([], [])
+    for length in (300, 120, 300):
+        assert TI.SMA(values[:length], 20, out=SMA_out) is SMA_out
+        assert SMA_out == TI.SMA(values[:length], 20)
+        assert TI.EMA(values[:length], 12, out=EMA_out) == TI.EMA(values[:length], 12)
+        assert TI.bollinger_bands(values[:length], 20, out=bands) == TI.bollinger_bands(values[:length], 20)
+        assert TI.SO(high_values[:length], low_values[:length], values[:length], out=scores) == \
+            TI.SO(high_values[:length], low_values[:length], values[:length])
+        output = TI.MACD(values[:length], out=MACD_out, workspace=workspace)
+        assert output[0] is MACD_out[0] and output[1] is MACD_out[1]
+        assert output == TI.MACD(values[:length])
+        assert TI.RSI(values[:length], 14, out=RSI_out, workspace=workspace) == TI.RSI(values[:length], 14)
+    assert sorted(workspace.names) == ["MACD_tail", "average_gain", "average_loss", "gain", "long_term", "loss",
+                                       "short_term", "signal_EMA"]
+
+
+def test_workspace_buffers_are_not_reallocated():
+    values = [100.0 + (i * 37 % 101) / 7.0 for i in range(100)]
+    workspace = Workspace()
+    TI.MACD(values, out=([], []), workspace=workspace)
+    TI.RSI(values, out=[], workspace=workspace)
+    buffers = {name: workspace.list(name) for name in workspace.names}
+    values.append(101.0)
+    TI.MACD(values, out=([], []), workspace=workspace)
+    TI.RSI(values, out=[], workspace=workspace)
+    assert all(workspace.list(name) is buffer for name, buffer in buffers.items())
+    # the signal line is averaged from the MACD values after the warm-up of the long term EMA
+    assert len(buffers["MACD_tail"]) == len(buffers["signal_EMA"]) == 101 - 25
+    assert len(buffers["gain"]) == len(buffers["long_term"]) == 101
+
+
+def test_out_buffers_false_type():
+    with pytest.raises(TypeError):
+        TI.SMA([1.0, 2.0, 3.0], 2, out=(1.0, 2.0))
+    with pytest.raises(Exception) as ex:
+        TI.bollinger_bands([1.0, 2.0, 3.0], 2, out=([], []))
+    assert "The out buffers are expected to be 3 buffers, but there are 2" in str(ex.value)
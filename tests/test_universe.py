@@ -0,0 +1,69 @@
+from caishen_stonks.universe import scan
+from caishen_stonks.history import StockHistory
+from caishen_stonks import technical_indicators as TI
+from caishen_stonks.errors import InvalidInputError
+from tests.helpers import random_walk
+import pytest
+
+
+def _universe(tickers):
+    histories = {}
+    for index in range(tickers):
+        close = random_walk(60 + 7 * index, index, 2)
+        histories[f"T{index}"] = StockHistory(f"T{index}", range(len(close)), close,
+                                              high=[value + 1.0 for value in close],
+                                              low=[value - 1.0 for value in close])
+    return histories
+
+
+def test_serial_scan_matches_indicators():
+    histories = _universe(3)
+    results = dict(scan(histories, processes=0))
+    close = list(histories["T2"].close)
+    high = list(histories["T2"].high)
+    low = list(histories["T2"].low)
+    assert results["T2"] == {"MACD((12, 26), 9)": TI.MACD(close), "RSI(14)": TI.RSI(close),
+                             "SO(5, 3)": TI.SO(high, low, close), "bollinger_bands(20)": TI.bollinger_bands(close)}
+
+
+def test_parallel_scan_matches_serial_scan():
+    histories = _universe(25)
+    serial = dict(scan(histories, processes=1))
+    parallel = scan(histories, processes=2, chunk_size=3)
+    assert iter(parallel) is parallel
+    parallel = dict(parallel)
+    assert parallel == serial
+    assert len(parallel) == 25
+
+
+def test_scan_of_closing_prices():
+    histories = {f"T{index}": random_walk(50, index, 2) for index in range(6)}
+    results = dict(scan(histories, [("SMA", {"lookback": 5}), ("EMA", {"lookback": 5})], processes=2))
+    assert results["T4"] == {"SMA(5)": TI.SMA(histories["T4"], 5), "EMA(5, 2.0)": TI.EMA(histories["T4"], 5)}
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_default_scan_of_closing_prices(processes):
+    histories = {f"T{index}": random_walk(50, index, 2) for index in range(3)}
+    histories["OHLC"] = _universe(1)["T0"]
+    results = dict(scan(histories, processes=processes))
+    close = histories["T1"]
+    assert results["T1"] == {"MACD((12, 26), 9)": TI.MACD(close), "RSI(14)": TI.RSI(close),
+                             "bollinger_bands(20)": TI.bollinger_bands(close)}
+    assert "SO(5, 3)" in results["OHLC"]
+    # SO requested explicitly still needs the high and low prices
+    with pytest.raises(InvalidInputError):
+        list(scan(histories, [("SO", {})], processes=0))
+
+
+def test_stopping_a_scan_early():
+    histories = _universe(10)
+    results = scan(histories, [("RSI", {})], processes=2, chunk_size=1)
+    ticker, indicators = next(results)
+    assert ticker in histories and "RSI(14)" in indicators
+    results.close()
+
+
+def test_unknown_indicator():
+    with pytest.raises(AttributeError):
+        list(scan(_universe(2), [("VWAP", {})], processes=0))